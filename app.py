@@ -1,24 +1,45 @@
-from flask import Flask, render_template, request, send_file, jsonify, redirect, session
-from bs4 import BeautifulSoup
+from flask import Flask, render_template, request, send_file, jsonify, redirect, session, has_request_context
+from bs4 import BeautifulSoup, SoupStrainer
 import os
 import io
 import re
 import sys
 import json
+import select
+import time
+import socket
+import threading
+import hashlib
+import heapq
+import itertools
+import gzip as gzip_module
+from collections import OrderedDict
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, CancelledError, TimeoutError as FutureTimeoutError
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # Add list_to_htm to path for importing update_htm functions
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'list_to_htm'))
 from update_htm import (
     parse_discount_value, generate_item_row, generate_section_header,
-    generate_js_vars_full, generate_js_vars_simple, generate_js_vars_createrows,
-    generate_js_if_blocks, generate_js_if_blocks_pdf, generate_js_if_blocks_whatsapp,
-    update_htm
+    build_item_records, iter_items_html,
+    iter_js_vars_full, iter_js_vars_simple, iter_js_vars_createrows,
+    iter_js_if_blocks, iter_js_if_blocks_pdf, iter_js_if_blocks_whatsapp,
+    generate_compact_items_script, compact_js_parts,
+    build_item_chunks, item_chunk_parts, generate_virtual_items_script,
+    update_htm, load_list_template, render_list_template, write_list_template,
+    load_shared_list_template, render_list_meta_script, parse_virtual_rows
 )
 
 # Import the search functionality
 sys.path.insert(0, os.path.dirname(__file__))
+import metrics
+import profiling
 try:
-    from search_medicines import MedicineSearcher
+    from search_medicines import MedicineSearcher, LIST_INDEX_VERSION
 except ImportError as e:
     print(f"Error importing search_medicines: {e}")
     MedicineSearcher = None
@@ -26,120 +47,511 @@ except ImportError as e:
 def decompress_if_needed(data):
     """Auto-detect and decompress gzip data, return original bytes if not compressed."""
     try:
-        return gzip_module.decompress(data)
+        decompressed = gzip_module.decompress(data)
     except (OSError, Exception):
+        metrics.inc(UPLOAD_BYTES, len(data), encoding='identity')
         return data
+    metrics.inc(UPLOAD_BYTES, len(data), encoding='gzip')
+    metrics.inc(UPLOAD_DECOMPRESSED_BYTES, len(decompressed))
+    return decompressed
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.secret_key = 'medicinesearch_supersecret_key'  # Needed for sessions
 
+# ============ METRICS ============
+# Timings, byte counts and cache hits are recorded with metrics.py and served
+# at /metrics (see the end of this file) for Prometheus to scrape.
+
+REQUEST_SECONDS = 'medlist_http_request_seconds'
+REQUEST_BYTES = 'medlist_http_request_bytes_total'
+UPLOAD_BYTES = 'medlist_upload_bytes_total'
+UPLOAD_DECOMPRESSED_BYTES = 'medlist_upload_decompressed_bytes_total'
+GENERATE_SECONDS = 'medlist_generate_stage_seconds'
+CACHE_REQUESTS = 'medlist_cache_requests_total'
+CPU_QUEUE_SECONDS = 'medlist_cpu_queue_wait_seconds'
+
+metrics.histogram(REQUEST_SECONDS, 'Time until the response was ready, by route, method and status')
+metrics.counter(REQUEST_BYTES, 'Request body bytes received, by route')
+metrics.counter(UPLOAD_BYTES, 'Uploaded list file bytes as received, by encoding (gzip or identity)')
+metrics.counter(UPLOAD_DECOMPRESSED_BYTES, 'Bytes of gzip-compressed uploads after decompression')
+metrics.histogram(GENERATE_SECONDS, 'Offer list generation time, by stage (prepare, render, compress) and mode')
+metrics.counter(CACHE_REQUESTS, 'Cache lookups, by cache and result (hit or miss)')
+metrics.histogram(CPU_QUEUE_SECONDS, 'Time CPU jobs waited for a worker')
+
+@app.before_request
+def start_request_timer():
+    request.environ['medlist.start'] = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = request.environ.get('medlist.start')
+    if start is not None:
+        # The URL rule, not the path, so tokens and asset names don't make new series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe(REQUEST_SECONDS, time.perf_counter() - start,
+                        route=route, method=request.method, status=response.status_code)
+        if request.content_length:
+            metrics.inc(REQUEST_BYTES, request.content_length, route=route)
+    return response
+
+def timings_requested():
+    """True if the request asks for the timings object (timings=1 or true in the query, form or JSON body)."""
+    value = request.args.get('timings') or request.form.get('timings')
+    if value is None and request.is_json:
+        data = request.get_json(silent=True)
+        value = data.get('timings') if isinstance(data, dict) else None
+    return str(value).lower() in ('1', 'true')
+
+def timed_json(payload, timer):
+    """jsonify payload with timer's stages as Server-Timing header.
+
+    Callers that ask for it (timings_requested) also get them as
+    payload['timings']; that copy is taken before serialization, so the
+    serialize stage is only in the header.
+    """
+    if timings_requested():
+        payload['timings'] = timer.as_dict()
+    with timer.stage('serialize'):
+        response = jsonify(payload)
+    response.headers['Server-Timing'] = timer.header()
+    return response
+
+# ============ PROFILING ============
+# With MEDLIST_PROFILE_DIR set, a request to one of these routes with an
+# X-Medlist-Profile header or profile query flag (1, cprofile or sample) is
+# profiled and saved with its parameters (see profiling.py). The response
+# names the file in X-Medlist-Profile-File.
+
+PROFILED_ENDPOINTS = ('upload_file', 'search_medicines', 'generate_html', 'combine_lists', 'diff_lists')
+
+def profile_mode():
+    """Profiling mode asked for by the request, or None."""
+    value = (request.headers.get('X-Medlist-Profile') or request.args.get('profile') or '').lower()
+    if value in ('', '0', 'false'):
+        return None
+    return value if value in profiling.MODES else 'cprofile'
+
+def file_fingerprint(name, size, digest):
+    return {'name': name, 'bytes': size, 'sha256': digest}
+
+def profile_request_params():
+    """Parameters of the current request for the profile's .json file.
+
+    Uploads are recorded by name, size and hash, so the same list can be
+    found again without the profile carrying customer data.
+    """
+    files = []
+    for field, file in request.files.items(multi=True):
+        data = file.stream.read()
+        file.stream.seek(0)
+        files.append(dict(file_fingerprint(file.filename, len(data), hashlib.sha256(data).hexdigest()), field=field))
+    params = {
+        'method': request.method,
+        'path': request.path,
+        'query': request.args.to_dict(flat=False),
+        'form': request.form.to_dict(flat=False),
+        'files': files,
+        'user_agent': request.headers.get('User-Agent')
+    }
+    data = request.get_json(silent=True) if request.is_json else None
+    if data is not None:
+        params['json'] = data
+        # A search reads the files uploaded to its session earlier
+        session_data = uploaded_files_storage.get(data.get('session_id', 'default')) if isinstance(data, dict) else None
+        if session_data:
+            session_files = []
+            for path in session_data['files']:
+                try:
+                    with open(path, 'rb') as f:
+                        content = f.read()
+                except OSError:
+                    continue
+                session_files.append(file_fingerprint(os.path.basename(path), len(content), hashlib.sha256(content).hexdigest()))
+            params['session_files'] = session_files
+    return params
+
+@app.before_request
+def start_request_profile():
+    if not profiling.enabled() or request.endpoint not in PROFILED_ENDPOINTS:
+        return
+    mode = profile_mode()
+    if mode is None:
+        return
+    profile = profiling.RequestProfile(mode)
+    if profile.start():
+        request.environ['medlist.profile'] = profile
+    else:
+        print("Profiling skipped: another request is being profiled")
+
+@app.after_request
+def write_request_profile(response):
+    profile = request.environ.pop('medlist.profile', None)
+    if profile is not None:
+        profile.stop()
+        try:
+            params = dict(profile_request_params(), status=response.status_code)
+            response.headers['X-Medlist-Profile-File'] = profile.write(request.url_rule.rule, params)
+        except Exception as e:
+            print(f"Error writing profile: {e}")
+    return response
+
+@app.teardown_request
+def stop_request_profile(exc):
+    # Requests that raised never reach after_request
+    profile = request.environ.pop('medlist.profile', None)
+    if profile is not None:
+        profile.stop()
+
 # Store processed results temporarily
 processed_results = {}
+# Requests run on several threads; inserts and evictions of processed_results hold this
+processed_results_lock = threading.Lock()
+
+# Converted lists stay downloadable by token; only the most recent ones are kept
+MAX_STORED_RESULTS = 20
+# Lists with more rows than this are not echoed back as text_output in /upload
+TEXT_INLINE_LIMIT = 5000
+
+def store_processed_result(data):
+    """Keep a converted list for /download and return its download token."""
+    import secrets
+    token = secrets.token_urlsafe(12)
+    with processed_results_lock:
+        processed_results[token] = data
+        processed_results['latest'] = data
+        stored = [key for key in processed_results if key not in ('latest', 'html_latest')]
+        for key in stored[:-MAX_STORED_RESULTS]:
+            del processed_results[key]
+    return token
+
+def encode_chunks(chunks, chunk_size=64 * 1024):
+    """Encode a stream of text chunks as UTF-8, batched into blocks of about chunk_size bytes."""
+    pending = []
+    pending_size = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= chunk_size:
+            yield b''.join(pending)
+            pending = []
+            pending_size = 0
+    if pending:
+        yield b''.join(pending)
+
+def attachment_disposition(filename):
+    """Content-Disposition value for a download, with a UTF-8 fallback name."""
+    from urllib.parse import quote
+    filename = filename.replace('"', '').replace('\r', '').replace('\n', '')
+    try:
+        filename.encode('ascii')
+        return f'attachment; filename="{filename}"'
+    except UnicodeEncodeError:
+        ascii_name = filename.encode('ascii', 'ignore').decode('ascii') or 'download'
+        return f'attachment; filename="{ascii_name}"; filename*=UTF-8\'\'{quote(filename)}'
+
+# ============ CPU WORKER POOL ============
+# Parsing and HTML generation are CPU heavy. They run on a small shared pool so a
+# big upload can't occupy every request thread; extra jobs wait in a bounded queue
+# and anything beyond that is turned away with a 503 instead of piling up.
+
+CPU_WORKERS = int(os.environ.get('CPU_WORKERS', 2))
+CPU_QUEUE_LIMIT = int(os.environ.get('CPU_QUEUE_LIMIT', 8))  # jobs allowed to wait for a worker
+CPU_JOB_TIMEOUT = float(os.environ.get('CPU_JOB_TIMEOUT', 25))  # seconds (Vercel maxDuration is 30)
+CPU_RETRY_AFTER = 5  # seconds suggested to clients when the pool is full
+
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix='cpu-job')
+cpu_slots = threading.BoundedSemaphore(CPU_WORKERS + CPU_QUEUE_LIMIT)
+
+class PoolBusyError(Exception):
+    """Raised when the CPU pool queue is full."""
+
+class JobTimeoutError(Exception):
+    """Raised when a CPU job does not finish within CPU_JOB_TIMEOUT."""
+
+class ClientGoneError(Exception):
+    """Raised when the client disconnected while its job was pending."""
+
+def client_disconnected():
+    """Best-effort check whether the client of the current request has hung up.
+
+    Only works when the server exposes the connection socket (the werkzeug dev
+    server does); otherwise the client is assumed to still be there.
+    """
+    sock = request.environ.get('werkzeug.socket')
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        # A readable socket with nothing to peek at means the peer closed it
+        return sock.recv(1, socket.MSG_PEEK) == b''
+    except (OSError, ValueError):
+        return False
+
+def submit_cpu_job(fn, *args, **kwargs):
+    """Queue fn on the CPU pool and return its future, or raise PoolBusyError."""
+    if not cpu_slots.acquire(blocking=False):
+        raise PoolBusyError()
+    submitted = time.perf_counter()
+    # A profiled request's job is profiled on the worker thread too
+    profile = request.environ.get('medlist.profile') if has_request_context() else None
+
+    def job():
+        metrics.observe(CPU_QUEUE_SECONDS, time.perf_counter() - submitted)
+        if profile is None:
+            return fn(*args, **kwargs)
+        with profile.thread():
+            return fn(*args, **kwargs)
 
-def process_htm_content(html_content, decrease_value=1, stock_format=False, new_format=False):
-    """Process HTM content and extract medicine names with discount rates."""
-    soup = BeautifulSoup(html_content, "html.parser")
-    results = []
-
+    try:
+        future = cpu_executor.submit(job)
+    except Exception:
+        cpu_slots.release()
+        raise
+    # Runs when the job finishes or is cancelled, freeing its queue slot
+    future.add_done_callback(lambda f: cpu_slots.release())
+    return future
+
+def run_cpu_job(fn, *args, **kwargs):
+    """Run fn on the CPU pool and wait for the result on the request thread.
+
+    Raises PoolBusyError if the queue is full, JobTimeoutError after
+    CPU_JOB_TIMEOUT seconds and ClientGoneError if the client hangs up first.
+    Jobs still waiting in the queue are cancelled in the last two cases.
+    """
+    future = submit_cpu_job(fn, *args, **kwargs)
+    deadline = time.monotonic() + CPU_JOB_TIMEOUT
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            future.cancel()
+            raise JobTimeoutError()
+        try:
+            return future.result(timeout=min(remaining, 0.5))
+        except FutureTimeoutError:
+            if client_disconnected():
+                future.cancel()
+                raise ClientGoneError()
+
+@app.errorhandler(PoolBusyError)
+def handle_pool_busy(e):
+    response = jsonify({'error': 'Server is busy processing other lists. Please try again in a few seconds.', 'busy': True})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(CPU_RETRY_AFTER)
+    return response
+
+@app.errorhandler(JobTimeoutError)
+def handle_job_timeout(e):
+    return jsonify({'error': 'Processing took too long. Please try a smaller file.'}), 504
+
+@app.errorhandler(ClientGoneError)
+def handle_client_gone(e):
+    # Nobody is listening any more; 499 is the conventional "client closed request"
+    return '', 499
+
+# Row layouts understood by the converter:
+#   default - <tr class="item">, name in td[1], discount in td[3] (bonus in td[4])
+#   stock   - <tr class="item">, same as default but the name is in td[2]
+#   new     - <tr class="item-row"> with data-disc/data-bonus attributes (new_pattern.HTM)
+LIST_FORMATS = ('default', 'stock', 'new')
+
+FORMAT_SNIFF_ROWS = 5  # rows inspected to tell the default and stock layouts apart
+
+_item_row_re = re.compile(r'<tr\s[^>]*class\s*=\s*["\']?(item-row|item)["\'\s>]', re.IGNORECASE)
+_sniff_row_re = re.compile(r'<tr\s[^>]*class\s*=\s*["\']?item["\'\s>].*?</tr>', re.IGNORECASE | re.DOTALL)
+_sniff_td_re = re.compile(r'<td[^>]*>(.*?)</td>', re.IGNORECASE | re.DOTALL)
+_tag_re = re.compile(r'<[^>]+>')
+# Starts the row data of virtual lists, see update_htm.generate_virtual_items_script
+VIRTUAL_ROWS_MARKER = 'var LIST_ROWS = '
+
+def detect_list_format(html_content):
+    """Guess the row layout of an HTM list without building a DOM.
+
+    Finds the first item row, then looks at the first few rows: in the default
+    layout td[2] is the quantity input (no text), in the stock layout it holds
+    the medicine name.
+    """
+    if VIRTUAL_ROWS_MARKER in html_content:
+        # A virtual list: the only row markup is inside its scripts, and its
+        # LIST_ROWS data is in the default layout
+        return 'default'
+    first_row = _item_row_re.search(html_content)
+    if first_row is None:
+        return 'default'
+    if first_row.group(1).lower() == 'item-row':
+        return 'new'
+
+    stock_votes = 0
+    rows = 0
+    for row in _sniff_row_re.finditer(html_content, first_row.start()):
+        cells = [_tag_re.sub('', td).strip() for td in _sniff_td_re.findall(row.group(0))]
+        if len(cells) < 4:
+            continue
+        rows += 1
+        if any(c.isalpha() for c in cells[2]):
+            stock_votes += 1
+        if rows >= FORMAT_SNIFF_ROWS:
+            break
+
+    return 'stock' if rows and stock_votes * 2 > rows else 'default'
+
+def resolve_list_format(html_content, stock_format=False, new_format=False, list_format=None):
+    """Work out the row layout from the explicit format, the legacy flags or the content."""
+    if list_format in LIST_FORMATS:
+        return list_format
     if new_format:
-        # New format: <tr class="item-row"> with data-disc/data-bonus attributes .main
-        items = soup.find_all("tr", class_="item-row")
-        for item in items:
-            columns = item.find_all("td")
-            if len(columns) < 2:
-                continue
+        return 'new'
+    if stock_format:
+        return 'stock'
+    if list_format == 'auto':
+        return detect_list_format(html_content)
+    return 'default'
+
+def extract_new_format_row(item, decrease_value):
+    """Name and discount of a <tr class="item-row"> (data-disc/data-bonus attributes)."""
+    columns = item.find_all("td")
+    if len(columns) < 2:
+        return None
+
+    # Name is in td.cell-name (td[1])
+    name_td = item.find("td", class_="cell-name")
+    medicine_name = (name_td.text.strip() if name_td else columns[1].text.strip()).title()
+
+    # Prefer data-disc attribute; fall back to data-bonus if disc is 0
+    disc_attr = item.get("data-disc", "").strip()
+    bonus_attr = item.get("data-bonus", "").strip()
 
-            # Name is in td.cell-name (td[1])
-            name_td = item.find("td", class_="cell-name")
-            medicine_name = (name_td.text.strip() if name_td else columns[1].text.strip()).title()
-
-            # Prefer data-disc attribute; fall back to data-bonus if disc is 0
-            disc_attr = item.get("data-disc", "").strip()
-            bonus_attr = item.get("data-bonus", "").strip()
-
-            try:
-                disc_num = float(disc_attr) if disc_attr else 0.0
-            except ValueError:
-                disc_num = 0.0
-
-            if disc_num > 0:
-                disc_num -= decrease_value
-                disc_num = max(disc_num, 0)
-                discount_rate = f"{disc_num:.2f}%"
-            elif bonus_attr:
-                discount_rate = bonus_attr
-            else:
-                discount_rate = "0.00%"
+    try:
+        disc_num = float(disc_attr) if disc_attr else 0.0
+    except ValueError:
+        disc_num = 0.0
+
+    if disc_num > 0:
+        disc_num -= decrease_value
+        disc_num = max(disc_num, 0)
+        discount_rate = f"{disc_num:.2f}%"
+    elif bonus_attr:
+        discount_rate = bonus_attr
+    else:
+        discount_rate = "0.00%"
+
+    return {'name': medicine_name, 'discount': discount_rate}
+
+def extract_item_row(item, decrease_value, name_index):
+    """Name and discount of a default/stock <tr class="item">."""
+    columns = item.find_all("td")
+    if len(columns) < 4:
+        return None
+    bonus = columns[4].text.strip() if len(columns) >= 5 else None
+    return extract_row_texts(columns[name_index].text.strip(), columns[3].text.strip(), bonus, decrease_value)
+
+def extract_row_texts(name, discount, bonus, decrease_value):
+    """Name and discount from the name, offer and bonus (None if missing) cell texts of a row."""
+    # Apply title case to the medicine name
+    medicine_name = name.title()
+    discount_rate = discount
+
+    # Check if discount is 0.00% and get bonus rate if available
+    if discount_rate == "0.00%" and bonus is not None:
+        discount_rate = bonus
+
+    # Extract numeric part and any additional separators
+    original_discount = discount_rate
+    percent_pos = original_discount.find('%')
+
+    if percent_pos != -1:
+        # Has a percentage - extract numeric part and any separators after %
+        num_part = original_discount[:percent_pos+1]  # Include the %
+        separators = original_discount[percent_pos+1:]  # Everything after %
+
+        try:
+            rate_value = float(num_part.strip('%'))
+            rate_value -= decrease_value
+            rate_value = max(rate_value, 0)
+            discount_rate = f"{rate_value:.2f}%" + separators
+        except ValueError:
+            # If conversion fails, keep the original
+            discount_rate = original_discount
+    else:
+        # No percentage found, treat as special case (like TP, NET, etc.)
+        try:
+            # Check if it's a numeric value without %
+            rate_value = float(original_discount)
+            rate_value -= decrease_value
+            rate_value = max(rate_value, 0)
+            discount_rate = f"{rate_value:.2f}"  # No % since original had none
+        except ValueError:
+            # Keep original value if it's not numeric
+            discount_rate = original_discount
+
+    return {
+        'name': medicine_name,
+        'discount': discount_rate
+    }
 
-            results.append({'name': medicine_name, 'discount': discount_rate})
+def process_htm_content(html_content, decrease_value=1, stock_format=False, new_format=False, list_format=None):
+    """Process HTM content and extract medicine names with discount rates.
+
+    The layout comes from list_format ('default', 'stock', 'new' or 'auto' to
+    sniff it) or, for older callers, the stock_format/new_format flags. The
+    document is parsed once and only the rows of that layout are built.
+    Virtual lists have no item rows; their rows are read from LIST_ROWS.
+    """
+    # Virtual lists made by /generate-html keep their rows in a script, always
+    # in the default layout
+    virtual_rows = parse_virtual_rows(html_content) if VIRTUAL_ROWS_MARKER in html_content else None
+    if virtual_rows is not None:
+        return [extract_row_texts(name.strip(), offer, bonus, decrease_value) for name, offer, bonus in virtual_rows]
+
+    list_format = resolve_list_format(html_content, stock_format, new_format, list_format)
+    row_class = "item-row" if list_format == 'new' else "item"
+
+    # Only build the item rows; the rest of the page (head, the big generated
+    # <script> blocks, modals) is tokenized but never turned into a tree
+    soup = BeautifulSoup(html_content, "html.parser", parse_only=SoupStrainer("tr", class_=row_class))
+    rows = soup.find_all("tr", class_=row_class)
+    results = []
 
+    if list_format == 'new':
+        extract = lambda item: extract_new_format_row(item, decrease_value)
     else:
-        # Default / stock format: <tr class="item">
-        items = soup.find_all("tr", class_="item")
         # Column index for medicine name differs based on file format
-        # Stock format: columns[2], Default format: columns[1]
-        name_index = 2 if stock_format else 1
-
-        for item in items:
-            columns = item.find_all("td")
-            if len(columns) >= 4:
-                # Extract medicine name and apply title case
-                medicine_name = columns[name_index].text.strip().title()
-                discount_rate = columns[3].text.strip()
-
-                # Check if discount is 0.00% and get bonus rate if available
-                if discount_rate == "0.00%" and len(columns) >= 5:
-                    discount_rate = columns[4].text.strip()
-
-                # Extract numeric part and any additional separators
-                original_discount = discount_rate
-                percent_pos = original_discount.find('%')
-
-                if percent_pos != -1:
-                    # Has a percentage - extract numeric part and any separators after %
-                    num_part = original_discount[:percent_pos+1]  # Include the %
-                    separators = original_discount[percent_pos+1:]  # Everything after %
-
-                    try:
-                        rate_value = float(num_part.strip('%'))
-                        rate_value -= decrease_value
-                        rate_value = max(rate_value, 0)
-                        discount_rate = f"{rate_value:.2f}%" + separators
-                    except ValueError:
-                        # If conversion fails, keep the original
-                        discount_rate = original_discount
-                else:
-                    # No percentage found, treat as special case (like TP, NET, etc.)
-                    try:
-                        # Check if it's a numeric value without %
-                        rate_value = float(original_discount)
-                        rate_value -= decrease_value
-                        rate_value = max(rate_value, 0)
-                        discount_rate = f"{rate_value:.2f}"  # No % since original had none
-                    except ValueError:
-                        # Keep original value if it's not numeric
-                        discount_rate = original_discount
-
-                results.append({
-                    'name': medicine_name,
-                    'discount': discount_rate
-                })
+        name_index = 2 if list_format == 'stock' else 1
+        extract = lambda item: extract_item_row(item, decrease_value, name_index)
+
+    for item in rows:
+        row = extract(item)
+        if row is not None:
+            results.append(row)
 
     return results
 
-def generate_text_output(results, separator=','):
-    """Generate text file content from results."""
-    lines = []
-    for item in results:
+def convert_htm_content(html_content, decrease_value=1, separator=',', list_format='auto'):
+    """Process HTM content and build its text output (the /upload job).
+
+    Returns (results, text_output, list_format) with the layout actually used.
+    """
+    list_format = resolve_list_format(html_content, list_format=list_format)
+    results = process_htm_content(html_content, decrease_value, list_format=list_format)
+    return results, generate_text_output(results, separator), list_format
+
+def iter_text_output(results, separator=','):
+    """Yield the text file content for results chunk by chunk (one line each)."""
+    for i, item in enumerate(results):
         # Check if the discount already contains a separator, if so don't add another
         discount = item['discount']
         if separator and not discount.endswith(separator):
             output_line = f"{item['name']}----- {discount}{separator}"
         else:
             output_line = f"{item['name']}----- {discount}"
-        lines.append(output_line)
-    return '\n'.join(lines)
+        yield output_line if i == 0 else '\n' + output_line
+
+def generate_text_output(results, separator=','):
+    """Generate text file content from results."""
+    return ''.join(iter_text_output(results, separator))
 
 @app.route('/')
 def index():
@@ -150,6 +562,37 @@ def share():
     # Handle share target from PWA
     return redirect('/?shared=true')
 
+def get_conversion_options(form):
+    """Read decrease_value, separator and the list layout from an upload form."""
+    # Get decrease value from form (default to 0 if not provided)
+    try:
+        decrease_value = float(form.get('decrease_value', 0))
+    except ValueError:
+        decrease_value = 0
+
+    # Get separator from form (default to comma)
+    separator = form.get('separator', ',')
+
+    # Explicit layout if given, then the stock/new format checkboxes,
+    # otherwise sniff the layout from the file itself
+    list_format = form.get('list_format', 'auto').lower()
+    if list_format not in LIST_FORMATS:
+        if form.get('new_format', 'false').lower() == 'true':
+            list_format = 'new'
+        elif form.get('stock_format', 'false').lower() == 'true':
+            list_format = 'stock'
+        else:
+            list_format = 'auto'
+
+    return decrease_value, separator, list_format
+
+def decode_upload(data):
+    """Decode uploaded file bytes as UTF-8, falling back to latin-1."""
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
@@ -162,67 +605,334 @@ def upload_file():
     if not file.filename.lower().endswith(('.htm', '.html')):
         return jsonify({'error': 'Please upload an HTM or HTML file'}), 400
 
-    # Get decrease value from form (default to 1 if not provided)
-    try:
-        decrease_value = float(request.form.get('decrease_value', 0))
-    except ValueError:
-        decrease_value = 0
-
-    # Get separator from form (default to comma)
-    separator = request.form.get('separator', ',')
+    decrease_value, separator, list_format = get_conversion_options(request.form)
+    timer = metrics.RequestTimings()
 
-    # Get stock format checkbox (default to False)
-    stock_format = request.form.get('stock_format', 'false').lower() == 'true'
+    with timer.stage('read', file.filename):
+        data = file.read()
+    with timer.stage('decode'):
+        html_content = decode_upload(data)
 
-    # Get new format checkbox (default to False)
-    new_format = request.form.get('new_format', 'false').lower() == 'true'
+    with timer.stage('detect'):
+        list_format = resolve_list_format(html_content, list_format=list_format)
+    # Timed inside the job, so waiting for a worker isn't counted as parsing
+    results = run_cpu_job(timer.wrap('parse', process_htm_content), html_content, decrease_value, list_format=list_format)
+    timer.details['files'] = [{'file': file.filename, 'format': list_format, 'bytes': len(data), 'rows': len(results)}]
 
-    try:
-        html_content = file.read().decode('utf-8')
-    except UnicodeDecodeError:
-        file.seek(0)
-        html_content = file.read().decode('latin-1')
-
-    results = process_htm_content(html_content, decrease_value, stock_format, new_format)
-    text_output = generate_text_output(results, separator)
-
-    # Store for download
+    # Only the rows are kept; the text is rebuilt on the fly when downloaded
     filename_base = os.path.splitext(file.filename)[0]
     output_filename = f"{filename_base}_name_with_%.txt"
-    processed_results['latest'] = {
-        'text': text_output,
+    token = store_processed_result({
         'filename': output_filename,
-        'results': results
-    }
+        'results': results,
+        'separator': separator
+    })
 
-    return jsonify({
+    response = {
         'success': True,
         'results': results,
-        'text_output': text_output,
         'filename': output_filename,
         'count': len(results),
-        'decrease_value': decrease_value
-    })
+        'decrease_value': decrease_value,
+        'list_format': list_format,
+        'download_token': token,
+        'download_url': f'/download?token={token}'
+    }
+
+    # Large lists (or callers that ask for it) get counts and a download token only
+    omit_text = request.form.get('omit_text', 'false').lower() == 'true'
+    if omit_text or len(results) > TEXT_INLINE_LIMIT:
+        response['results'] = []
+        response['text_omitted'] = True
+    else:
+        with timer.stage('text'):
+            response['text_output'] = generate_text_output(results, separator)
+
+    return timed_json(response, timer)
 
 @app.route('/download')
 def download_file():
-    if 'latest' not in processed_results:
+    data = processed_results.get(request.args.get('token', 'latest'))
+    if data is None:
         return "No file to download", 404
 
-    data = processed_results['latest']
-    buffer = io.BytesIO()
-    buffer.write(data['text'].encode('utf-8'))
-    buffer.seek(0)
+    body = encode_chunks(iter_text_output(data['results'], data['separator']))
+    response = app.response_class(body, mimetype='text/plain')
+    response.headers['Content-Disposition'] = attachment_disposition(data['filename'])
+    return response
+
+# ============ BATCH CONVERSION ============
+# Staff convert a few dozen distributor lists every morning. /upload-batch takes
+# a ZIP and/or several HTM files, converts them in parallel and streams back a
+# ZIP with one _name_with_%.txt per list as soon as each one is done.
+
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 2))
+BATCH_MAX_FILES = 100
+# Uncompressed HTM bytes in one batch, ZIP contents included
+BATCH_MAX_BYTES = 128 * 1024 * 1024
+
+# Set to False once worker processes couldn't be started; batches then use threads
+batch_processes_available = True
+
+def start_batch_pool(file_count):
+    """Start a process pool for one batch, or return None to use the CPU thread pool.
+
+    Processes give real parallelism for BeautifulSoup parsing; hosts that can't
+    start them (Vercel's runtime has no multiprocessing support) use threads.
+    Every batch gets its own pool, so a conversion that hangs is killed with
+    its batch's pool without touching the jobs of other batches.
+    """
+    global batch_processes_available
+    if not batch_processes_available:
+        return None
+    try:
+        import multiprocessing
+        return multiprocessing.get_context('spawn').Pool(min(BATCH_WORKERS, file_count))
+    except (ImportError, OSError, NotImplementedError) as e:
+        print(f"Process pool unavailable, batch conversion uses threads: {e}")
+        batch_processes_available = False
+        return None
+
+def submit_batch_job(pool, *args):
+    """Run convert_htm_file(*args) on a batch pool and return a Future for its result."""
+    from concurrent.futures import Future, InvalidStateError
+
+    future = Future()
+
+    def settle(set_outcome, value):
+        # The future may have been cancelled when the batch ended
+        try:
+            set_outcome(value)
+        except InvalidStateError:
+            pass
+
+    pool.apply_async(convert_htm_file, args,
+                     callback=lambda result: settle(future.set_result, result),
+                     error_callback=lambda error: settle(future.set_exception, error))
+    return future
+
+def release_when_done(futures, release):
+    """Call release once every future in futures has finished or was cancelled."""
+    pending = [future for future in futures if not future.done()]
+    if not pending:
+        release()
+        return
+    remaining = [len(pending)]
+    lock = threading.Lock()
+
+    def finished(future):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            release()
+
+    for future in pending:
+        future.add_done_callback(finished)
+
+def convert_htm_file(filename, data, decrease_value=1, separator=',', list_format='auto'):
+    """Convert one uploaded HTM file for a batch and time it."""
+    started = time.perf_counter()
+    results, text_output, list_format = convert_htm_content(decode_upload(data), decrease_value, separator, list_format)
+    output_filename = f"{os.path.splitext(os.path.basename(filename))[0]}_name_with_%.txt"
+    return {
+        'file': filename,
+        'output': output_filename,
+        'count': len(results),
+        'list_format': list_format,
+        'seconds': round(time.perf_counter() - started, 4),
+        'text': text_output
+    }
 
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=data['filename'],
-        mimetype='text/plain'
-    )
+def collect_batch_files(files):
+    """Return ([(filename, bytes)], error) for every HTM file uploaded directly or inside ZIPs.
+
+    ZIP members are checked against BATCH_MAX_BYTES by their declared size
+    before anything is extracted; zipfile never inflates a member past that size.
+    """
+    import zipfile
+    collected = []
+    total = 0
+    too_large = f'The lists in this batch are larger than {BATCH_MAX_BYTES // (1024 * 1024)}MB uncompressed'
+    for file in files:
+        if file.filename == '':
+            continue
+        name = file.filename.lower()
+        if name.endswith('.zip'):
+            try:
+                with zipfile.ZipFile(file.stream) as archive:
+                    members = [info for info in archive.infolist()
+                               if not info.is_dir() and info.filename.lower().endswith(('.htm', '.html'))]
+                    total += sum(info.file_size for info in members)
+                    if total > BATCH_MAX_BYTES:
+                        return [], too_large
+                    for info in members:
+                        collected.append((info.filename, archive.read(info)))
+            except zipfile.BadZipFile:
+                continue
+        elif name.endswith(('.htm', '.html')):
+            data = file.read()
+            total += len(data)
+            if total > BATCH_MAX_BYTES:
+                return [], too_large
+            collected.append((file.filename, data))
+    return collected, None
+
+class ZipChunkBuffer:
+    """Write-only file object that hands out what a streaming ZipFile wrote."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def iter_batch_results(pool, futures, batch_files, options):
+    """Yield (filename, future) for batch jobs as they finish, future None if it timed out.
+
+    Process pool jobs are all submitted by the route. On the CPU thread pool
+    the batch holds a single queue slot, so its files are submitted one at a
+    time and other requests' jobs are never stuck behind a whole batch. If no
+    job finishes within CPU_JOB_TIMEOUT the rest of the batch is given up.
+    """
+    from concurrent.futures import wait, FIRST_COMPLETED
+
+    if pool is None:
+        for index, (filename, data) in enumerate(batch_files):
+            future = cpu_executor.submit(convert_htm_file, filename, data, *options)
+            futures[future] = filename
+            if not wait([future], timeout=CPU_JOB_TIMEOUT).done:
+                future.cancel()
+                for filename, data in batch_files[index:]:
+                    yield filename, None
+                return
+            yield filename, future
+        return
+
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=CPU_JOB_TIMEOUT, return_when=FIRST_COMPLETED)
+        if not done:
+            # A worker is stuck (or died and its job is lost); kill this batch's workers
+            pool.terminate()
+            for future in pending:
+                future.cancel()
+                yield futures[future], None
+            return
+        for future in done:
+            yield futures[future], future
+
+def stream_batch_zip(results):
+    """Yield a ZIP of converted lists, adding each entry as its job completes."""
+    import zipfile
+
+    buffer = ZipChunkBuffer()
+    report = []
+    used_names = set()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for filename, future in results:
+            if future is None:
+                report.append({'file': filename, 'error': f'Conversion took longer than {CPU_JOB_TIMEOUT:g} seconds'})
+                continue
+            try:
+                converted = future.result()
+            except CancelledError:
+                report.append({'file': filename, 'error': 'Conversion was cancelled before it finished'})
+                continue
+            except Exception as e:
+                report.append({'file': filename, 'error': str(e) or type(e).__name__})
+                continue
+
+            # Two lists with the same base name must not overwrite each other
+            output_name = converted['output']
+            base, ext = os.path.splitext(output_name)
+            n = 1
+            while output_name in used_names:
+                n += 1
+                output_name = f"{base}({n}){ext}"
+            used_names.add(output_name)
+
+            archive.writestr(output_name, converted.pop('text').encode('utf-8'))
+            converted['output'] = output_name
+            report.append(converted)
+            yield buffer.take()
+
+        archive.writestr('batch_report.json', json.dumps({
+            'files': report,
+            'converted': sum(1 for r in report if 'error' not in r),
+            'failed': sum(1 for r in report if 'error' in r)
+        }, indent=2))
+    yield buffer.take()
+
+@app.route('/upload-batch', methods=['POST'])
+def upload_batch():
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({'error': 'No files uploaded'}), 400
+
+    options = get_conversion_options(request.form)
+
+    batch_files, error = collect_batch_files(files)
+    if error:
+        return jsonify({'error': error}), 413
+    if not batch_files:
+        return jsonify({'error': 'No HTM or HTML files found in the upload'}), 400
+    if len(batch_files) > BATCH_MAX_FILES:
+        return jsonify({'error': f'Too many files in one batch (max {BATCH_MAX_FILES})'}), 400
+
+    # The whole batch takes one place in the CPU queue; it is freed when the stream
+    # ends and no conversion of the batch is running any more
+    if not cpu_slots.acquire(blocking=False):
+        raise PoolBusyError()
+
+    futures = {}
+    pool = None
+    try:
+        pool = start_batch_pool(len(batch_files))
+        if pool is not None:
+            for filename, data in batch_files:
+                futures[submit_batch_job(pool, filename, data, *options)] = filename
+    except Exception:
+        if pool is not None:
+            pool.terminate()
+        cpu_slots.release()
+        raise
+
+    def finish_batch():
+        # Stream finished or the client went away: drop anything not started yet
+        # and kill this batch's workers
+        if pool is not None:
+            pool.terminate()
+        for future in futures:
+            future.cancel()
+        # A thread job that timed out keeps its worker busy until it returns,
+        # so the slot stays taken until then
+        release_when_done(list(futures), cpu_slots.release)
+
+    results = iter_batch_results(pool, futures, batch_files, options)
+    response = app.response_class(stream_batch_zip(results), mimetype='application/zip')
+    response.call_on_close(finish_batch)
+    response.headers['Content-Disposition'] = 'attachment; filename="converted_lists.zip"'
+    response.headers['X-Batch-Files'] = str(len(batch_files))
+    return response
 
 # ============ MAKE HTML FILE FUNCTIONALITY ============
 
+LIST_TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), 'list_to_htm', 'list.HTM')
+
+# Compile the offer list template at startup so the first generation doesn't pay for it
+if os.path.exists(LIST_TEMPLATE_PATH):
+    load_list_template(LIST_TEMPLATE_PATH)
+
 def parse_text_content(text_content):
     """Parse text content (data.txt format) and return list of (item_name, discount_or_bonus)"""
     items = []
@@ -242,170 +952,313 @@ def parse_text_content(text_content):
             items.append((item_name, value))
     return items
 
-def generate_html_from_template(data_items, template_path, list_no="000001", list_date=None, title="S.S.D PHARMA", whatsapp_number="923337068868"):
-    """Generate HTML file from template and data items"""
+def prepare_html_from_template(data_items, template_path, list_no="000001", list_date=None, title="S.S.D PHARMA", whatsapp_number="923337068868", compact=False, incremental=None, virtual=False, asset_base=None):
+    """Return (segments, parts, error) for generating an offer list.
+
+    The item rows and JS code in parts are generator functions, see
+    update_htm.iter_list_template, so the list can be joined into a string
+    or written out chunk by chunk.
+
+    incremental is an optional dict kept between calls: its 'state' holds the
+    items rendered last time (see update_htm.build_item_chunks), and only
+    changed items are rendered again. It is updated with the new state.
+
+    virtual=True emits no item rows at all; the page draws the visible ones
+    from a data script (see update_htm.generate_virtual_items_script).
+
+    When asset_base is given (the server URL, '' for relative links), the
+    list loads the template's CSS and scripts from /static/lists/ instead of
+    inlining them; this implies compact (see update_htm.compile_shared_list_template).
+    """
     import datetime
     if list_date is None:
         list_date = datetime.datetime.now().strftime("%d/%m/%Y")
 
-    with open(template_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    shared = asset_base is not None
+    # Compiled once per template file, see update_htm.load_list_template
+    if shared:
+        compact = True
+        segments = load_shared_list_template(template_path, virtual)[0]
+    else:
+        segments = load_list_template(template_path)
+    if segments is None:
+        return None, None, "ERROR: Could not find tbody section in template"
 
     total_count = len(data_items)
 
-    # Replace title everywhere
-    content = content.replace('S.S.D PHARMA', title)
+    # Sort items alphabetically by name
+    sorted_items = sorted(data_items, key=lambda x: x[0].upper() if x[0] else "")
 
-    # Replace WhatsApp number everywhere
-    content = content.replace('923337068868', whatsapp_number)
-    content = content.replace('%2B923337068868', '%2B' + whatsapp_number)
+    parts = {
+        'title': title,
+        'whatsapp_number': whatsapp_number,
+        'list_no': list_no,
+        'list_date': list_date,
+        'total_count': str(total_count),
+    }
+    if shared:
+        parts['asset_base'] = asset_base
+        parts['list_meta'] = render_list_meta_script(title, list_no, list_date, total_count)
+
+    if virtual:
+        # No rows are rendered here, so there is nothing to reuse between calls
+        parts.update(compact_js_parts(virtual=True))
+        parts['items_html'] = generate_virtual_items_script(sorted_items, inline_runtime=not shared)
+        return segments, parts, None
+
+    if incremental is not None:
+        # Only items that changed since the previous state are parsed and rendered
+        state = build_item_chunks(sorted_items, incremental.get('state'), compact)
+        incremental['state'] = state
+        parts.update(item_chunk_parts(state))
+        return segments, parts, None
+
+    # Parse every value once; all generators below share the records
+    records = build_item_records(sorted_items)
+
+    if compact:
+        parts.update(compact_js_parts())
+        parts['items_html'] = lambda: itertools.chain(iter_items_html(records), [generate_compact_items_script(records)])
+    else:
+        parts.update({
+            'items_html': partial(iter_items_html, records),
+            'js_vars_full': partial(iter_js_vars_full, records),
+            'js_vars_simple': partial(iter_js_vars_simple, records),
+            'js_vars_createrows': partial(iter_js_vars_createrows, records),
+            'js_if_blocks_printf': partial(iter_js_if_blocks, records, 'mywindow'),
+            'js_if_blocks_myfun': partial(iter_js_if_blocks, records, 'myWindow'),
+            'js_if_whatsapp': partial(iter_js_if_blocks_whatsapp, records),
+            'js_if_blocks_pdf': partial(iter_js_if_blocks_pdf, records)
+        })
+
+    return segments, parts, None
+
+def generation_mode(compact, virtual, asset_base):
+    """Name the generation options for metrics: full, compact or virtual, plus -shared."""
+    mode = 'virtual' if virtual else 'compact' if compact else 'full'
+    return mode + '-shared' if asset_base is not None else mode
+
+def generate_html_from_template(data_items, template_path, list_no="000001", list_date=None, title="S.S.D PHARMA", whatsapp_number="923337068868", compact=False, incremental=None, virtual=False, asset_base=None):
+    """Generate HTML file from template and data items
+
+    With compact=True the item data is emitted once as a JSON array and the
+    Printf/myfun/mywht/createRows functions loop over it instead of having
+    code for every item.
+    """
+    mode = generation_mode(compact, virtual, asset_base)
+    with metrics.timed(GENERATE_SECONDS, stage='prepare', mode=mode):
+        segments, parts, error = prepare_html_from_template(data_items, template_path, list_no, list_date, title, whatsapp_number, compact, incremental, virtual, asset_base)
+    if error:
+        return None, error
 
-    # 1. Replace "Code" header with "Sr#"
-    content = re.sub(
-        r'(<td style="text-align: center; border-radius: 16px 0px 0px 0px;">)(Code|Sr#)(</td>)',
-        r'\1Sr#\3',
-        content
-    )
+    with metrics.timed(GENERATE_SECONDS, stage='render', mode=mode):
+        return render_list_template(segments, parts), None
 
-    # 2. Update tbody
-    tbody_start = content.find('<tbody id="myTable">')
-    tbody_end = content.find('</tbody>')
+def write_html_from_template(out, data_items, template_path, list_no="000001", list_date=None, title="S.S.D PHARMA", whatsapp_number="923337068868", compact=False, incremental=None, virtual=False, asset_base=None):
+    """Like generate_html_from_template, but writes the list to the text file object out.
 
-    if tbody_start == -1 or tbody_end == -1:
-        return None, "ERROR: Could not find tbody section in template"
+    Returns an error message, or None on success.
+    """
+    mode = generation_mode(compact, virtual, asset_base)
+    with metrics.timed(GENERATE_SECONDS, stage='prepare', mode=mode):
+        segments, parts, error = prepare_html_from_template(data_items, template_path, list_no, list_date, title, whatsapp_number, compact, incremental, virtual, asset_base)
+    if error:
+        return error
+
+    with metrics.timed(GENERATE_SECONDS, stage='render', mode=mode):
+        write_list_template(segments, parts, out)
+    return None
+
+# ============ GENERATED HTML CACHE ============
+# Generating the same list twice gives the same bytes, so generated lists are
+# kept in an LRU cache keyed by a hash of everything that goes into them.
+# Entries also keep gzip (and brotli, when installed) copies so downloads
+# don't compress again, and an ETag so repeat requests can get a 304.
+
+HTML_CACHE_MAX_BYTES = int(os.environ.get('HTML_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# {key: entry}, least recently used first
+html_cache = OrderedDict()
+html_cache_bytes = 0
+html_cache_lock = threading.Lock()
+
+# {(list_type, compact): {'state': ...}}, the rendered items of the last list
+# of each type, see prepare_html_from_template
+html_item_chunks = {}
+
+def html_cache_key(data_items, template_path, list_no, list_date, title, whatsapp_number, compact, virtual=False, asset_base=None):
+    """Hash the parsed items, list settings and template version into a cache key."""
+    # Rows are sorted before generation, so the input order doesn't matter
+    items = sorted(data_items, key=lambda x: x[0].upper() if x[0] else "")
+    template_version = os.path.getmtime(template_path)
+    payload = json.dumps([items, list_no, list_date, title, whatsapp_number, bool(compact), bool(virtual), asset_base, template_version],
+                         ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def build_html_entry(key, data_items, template_path, list_no, list_date, title, whatsapp_number, compact, incremental=None, virtual=False, asset_base=None, timer=None):
+    """Generate a list and return (cache entry, error).
+
+    timer (a metrics.RequestTimings) gets generate and compress stages.
+    """
+    start = time.perf_counter()
+    html_content, error = generate_html_from_template(data_items, template_path, list_no, list_date, title, whatsapp_number, compact, incremental, virtual, asset_base)
+    if error:
+        return None, error
+    if timer is not None:
+        timer.add('generate', time.perf_counter() - start, generation_mode(compact, virtual, asset_base))
+
+    content = html_content.encode('utf-8')
+    start = time.perf_counter()
+    with metrics.timed(GENERATE_SECONDS, stage='compress', mode=generation_mode(compact, virtual, asset_base)):
+        variants = {'gzip': gzip_module.compress(content, compresslevel=6)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(content, quality=5)
+    if timer is not None:
+        timer.add('compress', time.perf_counter() - start, f'{len(content)} bytes')
+    entry = {
+        'key': key,
+        # Same key means same bytes, so the key doubles as a strong ETag
+        'etag': key[:32],
+        'content': content,
+        'variants': variants,
+        'size': len(content) + sum(len(data) for data in variants.values())
+    }
+    return entry, None
+
+def html_cache_get(key):
+    """Return the cached entry for key (marking it recently used), or None."""
+    with html_cache_lock:
+        entry = html_cache.get(key)
+        if entry is not None:
+            html_cache.move_to_end(key)
+        return entry
+
+def html_cache_put(entry):
+    """Add an entry, evicting the least recently used ones past HTML_CACHE_MAX_BYTES."""
+    global html_cache_bytes
+    if entry['size'] > HTML_CACHE_MAX_BYTES:
+        return
+    with html_cache_lock:
+        old = html_cache.pop(entry['key'], None)
+        if old is not None:
+            html_cache_bytes -= old['size']
+        html_cache[entry['key']] = entry
+        html_cache_bytes += entry['size']
+        while html_cache_bytes > HTML_CACHE_MAX_BYTES:
+            _, evicted = html_cache.popitem(last=False)
+            html_cache_bytes -= evicted['size']
+
+def accepts_encoding(encoding):
+    """True if the request's Accept-Encoding allows encoding."""
+    qualities = {}
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        name, *params = [value.strip() for value in part.split(';')]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name.lower()] = quality
+    # An exact entry wins over '*', so "*, br;q=0" refuses br and "*;q=0, gzip" allows gzip
+    quality = qualities.get(encoding, qualities.get('*', 0.0))
+    return quality > 0
+
+def html_entry_response(entry, filename=None):
+    """Serve a cached list in the best encoding the client accepts, answering 304 when unchanged."""
+    # Each encoding is a different representation, so it gets its own ETag
+    for encoding in ('br', 'gzip'):
+        if encoding in entry['variants'] and accepts_encoding(encoding):
+            response = app.response_class(entry['variants'][encoding], mimetype='text/html')
+            response.headers['Content-Encoding'] = encoding
+            response.set_etag(f"{entry['etag']}-{encoding}")
+            break
+    else:
+        response = app.response_class(entry['content'], mimetype='text/html')
+        response.set_etag(entry['etag'])
+    response.headers['Vary'] = 'Accept-Encoding'
+    # A new generation replaces the list behind these URLs, so always revalidate
+    response.headers['Cache-Control'] = 'no-cache'
+    if filename:
+        response.headers['Content-Disposition'] = attachment_disposition(filename)
+    return response.make_conditional(request)
 
-    # Sort items alphabetically by name
-    sorted_items = sorted(data_items, key=lambda x: x[0].upper() if x[0] else "")
+@app.route('/make-html')
+def make_html_page():
+    return render_template('make_html.html')
 
-    items_html = ""
-    current_letter = ""
-    for i, (item_name, value) in enumerate(sorted_items, 1):
-        first_letter = item_name[0].upper() if item_name else "?"
-        if first_letter != current_letter:
-            current_letter = first_letter
-            items_html += generate_section_header(current_letter)
-        items_html += generate_item_row(i, item_name, value)
-
-    items_html += f'''<tr class="heading2"> <td style=" text-align: CENTER; border-radius: 0px 0px 16px 16px; padding-left: 10px;" colspan="5" >Total Products :
-  {total_count}
-</td></tr>
-'''
-
-    content = content[:tbody_start + len('<tbody id="myTable">')] + items_html + content[tbody_end:]
-
-    # 3. Update list number and date
-    content = re.sub(r'<b>List No : </b>\s*\d+', f'<b>List No : </b>\n{list_no}', content)
-    content = re.sub(r'<b>List Date </b> :\s*[\d/]+', f'<b>List Date </b> :\n{list_date}', content)
-
-    # Update global list number variable for PDF generator
-    content = re.sub(r'var LISTNO_GLOBAL = "[^"]*";', f'var LISTNO_GLOBAL = "{list_no}";', content)
-
-    # Update global WhatsApp number variable
-    content = re.sub(r'var WHATSAPP_GLOBAL = "[^"]*";', f'var WHATSAPP_GLOBAL = "{whatsapp_number}";', content)
-
-    # 4. Update hidden inputs for rows count
-    content = re.sub(r'id="rows" value="\d+"', f'id="rows" value="{total_count}"', content)
-
-    # 5. Generate new JS content
-    js_vars_full = generate_js_vars_full(sorted_items)
-    js_vars_simple = generate_js_vars_simple(sorted_items)
-    js_if_blocks_printf = generate_js_if_blocks(sorted_items, 'mywindow')
-    js_if_blocks_myfun = generate_js_if_blocks(sorted_items, 'myWindow')
-    js_if_whatsapp = generate_js_if_blocks_whatsapp(sorted_items)
-
-    # 6. Update Printf function
-    content = re.sub(
-        r'(function Printf\(\)\{\nvar ITDATE = ")[^"]*(";\nvar LSTNO = ")[^"]*(")',
-        r'\g<1>' + list_date + r'\g<2>' + list_no + r'\g<3>',
-        content
-    )
-    content = re.sub(
-        r'(function Printf\(\)\{\nvar ITDATE = "[^"]*";\nvar LSTNO = "[^"]*";\nvar custname = document\.getElementById\("cstname"\)\.value;\nvar serial = 0;\n)'
-        r'.*?'
-        r'(\n\n\n var mywindow = window\.open)',
-        r'\1' + js_vars_full + r'\2',
-        content,
-        flags=re.DOTALL
-    )
+def get_generation_options(form):
+    """Read the offer list options of /generate-html and /combine-lists."""
+    list_type = form.get('list_type', 'M')
+    if list_type not in ('M', 'C'):
+        list_type = 'M'
+    options = {
+        'list_no': form.get('list_no', '000001'),
+        'list_date': form.get('list_date', None),
+        'title': form.get('title', 'S.S.D PHARMA'),
+        # Remove any non-digit characters from WhatsApp number
+        'whatsapp_number': ''.join(filter(str.isdigit, form.get('whatsapp_number', '923337068868'))),
+        'compact': form.get('compact', 'false').lower() == 'true',
+        'virtual': form.get('virtual', 'false').lower() == 'true',
+        'asset_base': None,
+        'list_type': list_type
+    }
 
-    content = re.sub(
-        r"if\(namevar1==0 \)\{\n\}\nelse \{\n\nvar serial = \(serial\+1\);\n mywindow\.document\.write\('<tr class=\"item\">.*?"
-        r"( mywindow\.document\.write\('<tr class=\"heading2\"> <td)",
-        js_if_blocks_printf + r'\1',
-        content,
-        flags=re.DOTALL,
-        count=1
-    )
+    if options['list_date'] is None:
+        # Resolve the default date here so it is part of the cache key
+        import datetime
+        options['list_date'] = datetime.datetime.now().strftime("%d/%m/%Y")
 
-    # 7. Update mywht function
-    content = re.sub(
-        r'(function mywht\(\)\{\nvar ITDATE = ")[^"]*(";\nvar LSTNO = ")[^"]*(")',
-        r'\g<1>' + list_date + r'\g<2>' + list_no + r'\g<3>',
-        content
-    )
-    content = re.sub(
-        r'(function mywht\(\)\{.*?var serial = 0;\n)'
-        r'.*?'
-        r'(\nvar url="https://wa\.me)',
-        r'\1' + js_vars_simple + '\n' + js_if_whatsapp + r'\2',
-        content,
-        flags=re.DOTALL
-    )
+    if form.get('shared_assets', 'false').lower() == 'true':
+        # Shared assets need the compact scripts. The links are absolute, so
+        # a downloaded list still loads them from this server
+        options['compact'] = True
+        options['asset_base'] = request.host_url.rstrip('/')
+    return options
 
-    # 8. Update myfun function
-    content = re.sub(
-        r'(function myfun\(\)\{\nvar ITDATE = ")[^"]*(";\nvar LSTNO = ")[^"]*(")',
-        r'\g<1>' + list_date + r'\g<2>' + list_no + r'\g<3>',
-        content
-    )
-    content = re.sub(
-        r'(function myfun\(\)\{\nvar ITDATE = "[^"]*";\nvar LSTNO = "[^"]*";\nvar custname = document\.getElementById\("cstname"\)\.value;\nvar serial = 0;\n)'
-        r'.*?'
-        r'(\nmyWindow=window\.open)',
-        r'\1' + js_vars_full + r'\2',
-        content,
-        flags=re.DOTALL
-    )
+def generate_and_store_html(data_items, options, timer):
+    """Generate the list for data_items (or take it from the cache) and keep it for /preview-html and /download-html.
 
-    content = re.sub(
-        r"if\(namevar1==0 \)\{\n\}\nelse \{\n\nvar serial = \(serial\+1\);\n myWindow\.document\.write\('<tr class=\"item\">.*?"
-        r"( myWindow\.document\.write\('<tr class=\"heading2\"> <td)",
-        js_if_blocks_myfun + r'\1',
-        content,
-        flags=re.DOTALL,
-        count=1
-    )
+    Returns (output filename, cached, error).
+    """
+    template_path = LIST_TEMPLATE_PATH
 
-    # 9. Update createRows function (PDF generation)
-    js_vars_createrows = generate_js_vars_createrows(sorted_items)
-    js_if_blocks_pdf = generate_js_if_blocks_pdf(sorted_items)
-
-    content = re.sub(
-        r'(function createRows\(count\) \{\n  const rows = \[\];\n\n)'
-        r'.*?'
-        r'(var serial = 0;)',
-        r'\1' + js_vars_createrows + r'\2',
-        content,
-        flags=re.DOTALL
-    )
+    if not os.path.exists(template_path):
+        return None, False, 'Template file not found'
 
-    content = re.sub(
-        r"if\(namevar1==0 \)\{\n\}\nelse \{\n\nvar serial = \(serial\+1\);\nrows\.push.*?"
-        r"(\nvar totitem=)",
-        js_if_blocks_pdf + r'\1',
-        content,
-        flags=re.DOTALL,
-        count=1
-    )
+    list_no, list_date, title = options['list_no'], options['list_date'], options['title']
+    whatsapp_number, compact, virtual = options['whatsapp_number'], options['compact'], options['virtual']
+    asset_base, list_type = options['asset_base'], options['list_type']
 
-    # 10. Update simpleOrder function item count
-    content = re.sub(r'for \(let i = 1; i <= \d+; i\+\+\)', f'for (let i = 1; i <= {total_count}; i++)', content)
+    # Generate HTML, unless the same list was generated before
+    with timer.stage('cache_key'):
+        key = html_cache_key(data_items, template_path, list_no, list_date, title, whatsapp_number, compact, virtual, asset_base)
+    entry = html_cache_get(key)
+    cached = entry is not None
+    metrics.inc(CACHE_REQUESTS, cache='html', result='hit' if cached else 'miss')
+    if not cached:
+        # Only items that changed since the last list of this type are rendered again
+        incremental = html_item_chunks.setdefault((list_type, compact), {})
+        entry, error = run_cpu_job(build_html_entry, key, data_items, template_path, list_no, list_date, title, whatsapp_number, compact, incremental, virtual, asset_base, timer)
 
-    return content, None
+        if error:
+            return None, False, error
 
-@app.route('/make-html')
-def make_html_page():
-    return render_template('make_html.html')
+        html_cache_put(entry)
+
+    # Store for download
+    output_filename = f"offer_list_{list_type}{list_no}.htm"
+    with processed_results_lock:
+        processed_results['html_latest'] = {
+            'entry': entry,
+            'filename': output_filename,
+            'count': len(data_items)
+        }
+    timer.details['cached'] = cached
+    return output_filename, cached, None
 
 @app.route('/generate-html', methods=['POST'])
 def generate_html():
@@ -420,54 +1273,303 @@ def generate_html():
         return jsonify({'error': 'Please upload a text file (.txt)'}), 400
 
     # Get form parameters
-    list_no = request.form.get('list_no', '000001')
-    list_date = request.form.get('list_date', None)
-    title = request.form.get('title', 'S.S.D PHARMA')
-    whatsapp_number = request.form.get('whatsapp_number', '923337068868')
-    list_type = request.form.get('list_type', 'M')
-    if list_type not in ('M', 'C'):
-        list_type = 'M'
-    # Remove any non-digit characters from WhatsApp number
-    whatsapp_number = ''.join(filter(str.isdigit, whatsapp_number))
+    options = get_generation_options(request.form)
+    timer = metrics.RequestTimings()
 
-    try:
-        text_content = file.read().decode('utf-8')
-    except UnicodeDecodeError:
-        file.seek(0)
-        text_content = file.read().decode('latin-1')
+    with timer.stage('read', file.filename):
+        data = file.read()
+        text_content = decode_upload(data)
 
     # Parse text content
-    data_items = parse_text_content(text_content)
+    with timer.stage('parse'):
+        data_items = parse_text_content(text_content)
 
     if not data_items:
         return jsonify({'error': 'No valid items found in the file. Format should be: item_name----- discount%'}), 400
 
-    # Get template path
-    template_path = os.path.join(os.path.dirname(__file__), 'list_to_htm', 'list.HTM')
+    output_filename, cached, error = generate_and_store_html(data_items, options, timer)
+    if error:
+        return jsonify({'error': error}), 500
+
+    timer.details['files'] = [{'file': file.filename, 'bytes': len(data), 'rows': len(data_items)}]
+    return timed_json({
+        'success': True,
+        'filename': output_filename,
+        'count': len(data_items),
+        'cached': cached,
+        'message': f'Generated HTML with {len(data_items)} items'
+    }, timer)
+
+# ============ COMBINING LISTS ============
+# Several converted lists (item_name----- value lines) become one offer list.
+# Each list is parsed once and sorted by canonical name (already sorted lists
+# cost one pass), the sorted lists are k-way merged, and items that appear in
+# more than one list are reduced to one entry by the keep policy:
+#   best   the highest discount (ties and lists without one: the first list)
+#   first  the entry of the first list that has the item
+#   last   the entry of the last list that has the item
+
+COMBINE_POLICIES = ('best', 'first', 'last')
+
+def canonical_item_name(name):
+    """Name used to find the same item in different lists: case and spacing are ignored."""
+    return ' '.join(name.upper().split())
+
+def item_discount(value):
+    """Discount percent of a list value for the best policy; -1 for net prices and values without one."""
+    if 'net' in value.lower():
+        # "140 NET" is a price, not 140%
+        return -1.0
+    discount, _ = parse_discount_value(value)
+    return discount if discount > 0 else -1.0
+
+def merge_list_items(item_lists, keep='best'):
+    """Merge lists of (item_name, value) into one list sorted by canonical name, one entry per item.
+
+    Returns (items, duplicates) with the number of entries dropped.
+    """
+    runs = []
+    for source, items in enumerate(item_lists):
+        # (canonical name, source, position) is unique, so heapq.merge never compares past it
+        run = [(canonical_item_name(name), source, position, name, value)
+               for position, (name, value) in enumerate(items) if name.strip()]
+        # Timsort finds the sorted runs of a (mostly) sorted list in one pass
+        run.sort()
+        runs.append(run)
+
+    merged = []
+    duplicates = 0
+    for _, group in itertools.groupby(heapq.merge(*runs), key=lambda entry: entry[0]):
+        entry = next(group)
+        for other in group:
+            duplicates += 1
+            if keep == 'last' or (keep == 'best' and item_discount(other[4]) > item_discount(entry[4])):
+                entry = other
+        merged.append((entry[3], entry[4]))
+    return merged, duplicates
+
+@app.route('/combine-lists', methods=['POST'])
+def combine_lists():
+    """Combine text lists into one offer list.
+
+    Lists come as uploaded text files in files and/or as text in lists fields.
+    keep picks the entry of items found in several lists (COMBINE_POLICIES).
+    The combined list goes straight to the generator and is served by
+    /preview-html and /download-html like a /generate-html list; output=text
+    returns the combined item_name----- value lines instead.
+    """
+    keep = request.form.get('keep', 'best').lower()
+    if keep not in COMBINE_POLICIES:
+        return jsonify({'error': f"keep must be one of {', '.join(COMBINE_POLICIES)}"}), 400
+    output = request.form.get('output', 'html').lower()
+    timer = metrics.RequestTimings()
+
+    sources = []
+    for file in request.files.getlist('files'):
+        if file.filename == '':
+            continue
+        with timer.stage('read', file.filename):
+            sources.append((file.filename, decode_upload(decompress_if_needed(file.read()))))
+    for number, text in enumerate(request.form.getlist('lists'), 1):
+        sources.append((f'list {number}', text))
+
+    if not sources:
+        return jsonify({'error': 'No lists to combine'}), 400
 
-    if not os.path.exists(template_path):
-        return jsonify({'error': 'Template file not found'}), 500
+    # Each list is parsed once
+    with timer.stage('parse', f'{len(sources)} lists'):
+        item_lists = [parse_text_content(text) for _, text in sources]
+    timer.details['files'] = [{'file': name, 'bytes': len(text), 'rows': len(items)}
+                              for (name, text), items in zip(sources, item_lists)]
+
+    with timer.stage('merge', keep):
+        data_items, duplicates = merge_list_items(item_lists, keep)
+
+    if not data_items:
+        return jsonify({'error': 'No valid items found in the lists. Format should be: item_name----- discount%'}), 400
 
-    # Generate HTML
-    html_content, error = generate_html_from_template(data_items, template_path, list_no, list_date, title, whatsapp_number)
+    response = {
+        'success': True,
+        'lists': len(sources),
+        'input_count': sum(len(items) for items in item_lists),
+        'count': len(data_items),
+        'duplicates': duplicates,
+        'keep': keep
+    }
 
+    if output == 'text':
+        response['text_output'] = '\n'.join(f'{name}----- {value}' for name, value in data_items)
+        return timed_json(response, timer)
+
+    output_filename, cached, error = generate_and_store_html(data_items, get_generation_options(request.form), timer)
     if error:
         return jsonify({'error': error}), 500
 
-    # Store for download
-    output_filename = f"offer_list_{list_type}{list_no}.htm"
-    processed_results['html_latest'] = {
-        'content': html_content,
+    response.update({
         'filename': output_filename,
-        'count': len(data_items)
+        'cached': cached,
+        'message': f'Combined {len(sources)} lists into {len(data_items)} items ({duplicates} duplicates removed)'
+    })
+    return timed_json(response, timer)
+
+# ============ DIFFING LISTS ============
+# "What changed since yesterday's list": two versions of a list (HTM or text)
+# are parsed with the usual parsers, the old one is put in a dict by canonical
+# name, and one pass over the new one finds added and changed items; what is
+# left of the dict was removed. Values are compared by discount and bonus, so
+# "12%," and "12.00%" are the same offer.
+
+DIFF_CSV_FIELDS = ('change', 'name', 'old_value', 'new_value', 'old_discount', 'new_discount')
+
+def parse_list_file(filename, data):
+    """Return the (item_name, value) pairs of an uploaded HTM or text list."""
+    text = decode_upload(decompress_if_needed(data))
+    if filename.lower().endswith(('.htm', '.html')):
+        # No decrease, the values are compared as the distributor wrote them
+        return [(row['name'], row['discount']) for row in process_htm_content(text, 0, list_format='auto')]
+    return parse_text_content(text)
+
+def list_value_key(value):
+    """Comparable form of a list value: (discount, bonus/extra text without commas and spaces)."""
+    discount, extra = parse_discount_value(value.strip().rstrip(','))
+    return discount, ''.join(extra.upper().replace(',', '').split())
+
+def diff_list_items(old_items, new_items):
+    """Return the changes from old_items to new_items, (item_name, value) lists.
+
+    {'added': [...], 'removed': [...], 'changed': [...], 'unchanged': n,
+    'duplicates': {'old': n, 'new': n}}; added and changed are in the order of
+    the new list, removed in the order of the old one. Only the first entry of
+    an item repeated within a list counts.
+    """
+    old = {}
+    old_duplicates = 0
+    for name, value in old_items:
+        key = canonical_item_name(name)
+        if not key:
+            continue
+        if key in old:
+            old_duplicates += 1
+        else:
+            old[key] = (name, value)
+
+    added, changed = [], []
+    seen = set()
+    unchanged = new_duplicates = 0
+    for name, value in new_items:
+        key = canonical_item_name(name)
+        if not key:
+            continue
+        if key in seen:
+            new_duplicates += 1
+            continue
+        seen.add(key)
+        if key not in old:
+            added.append({'name': name, 'value': value})
+            continue
+        old_value = old[key][1]
+        if list_value_key(old_value) == list_value_key(value):
+            unchanged += 1
+            continue
+        old_discount, new_discount = item_discount(old_value), item_discount(value)
+        changed.append({
+            'name': name,
+            'old_value': old_value,
+            'new_value': value,
+            'old_discount': old_discount if old_discount >= 0 else None,
+            'new_discount': new_discount if new_discount >= 0 else None
+        })
+
+    removed = [{'name': name, 'value': value} for key, (name, value) in old.items() if key not in seen]
+    return {
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'unchanged': unchanged,
+        'duplicates': {'old': old_duplicates, 'new': new_duplicates}
     }
 
-    return jsonify({
-        'success': True,
-        'filename': output_filename,
-        'count': len(data_items),
-        'message': f'Generated HTML with {len(data_items)} items'
-    })
+def iter_diff_json(head, diff):
+    """Yield the diff as one JSON object, an entry at a time."""
+    yield json.dumps(head, ensure_ascii=False)[:-1]
+    for kind in ('added', 'removed', 'changed'):
+        yield f', "{kind}": ['
+        for i, entry in enumerate(diff[kind]):
+            yield (', ' if i else '') + json.dumps(entry, ensure_ascii=False)
+        yield ']'
+    yield '}'
+
+def iter_diff_csv(diff):
+    """Yield the diff as CSV lines (DIFF_CSV_FIELDS)."""
+    import csv
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(DIFF_CSV_FIELDS)
+    rows = itertools.chain(
+        (('added', e['name'], '', e['value'], '', '') for e in diff['added']),
+        (('removed', e['name'], e['value'], '', '', '') for e in diff['removed']),
+        (('changed', e['name'], e['old_value'], e['new_value'],
+          '' if e['old_discount'] is None else e['old_discount'],
+          '' if e['new_discount'] is None else e['new_discount']) for e in diff['changed'])
+    )
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+@app.route('/diff-lists', methods=['POST'])
+def diff_lists():
+    """Compare two versions of a list: old and new are HTM or text files.
+
+    Returns added, removed and changed items as JSON, or as CSV with
+    format=csv (form field or query string).
+    """
+    files = {}
+    for field in ('old', 'new'):
+        file = request.files.get(field)
+        if file is None or file.filename == '':
+            return jsonify({'error': 'Please upload the old and the new list'}), 400
+        if not file.filename.lower().endswith(('.htm', '.html', '.txt', '.text', '.md')):
+            return jsonify({'error': 'Lists must be HTM or text files'}), 400
+        files[field] = file
+    output = (request.form.get('format') or request.args.get('format') or 'json').lower()
+    timer = metrics.RequestTimings()
+
+    items = {}
+    for field, file in files.items():
+        with timer.stage(f'read-{field}', file.filename):
+            data = file.read()
+        items[field] = run_cpu_job(timer.wrap(f'parse-{field}', parse_list_file), file.filename, data)
+    timer.details['files'] = [{'file': files[field].filename, 'rows': len(items[field])} for field in files]
+
+    with timer.stage('diff'):
+        diff = diff_list_items(items['old'], items['new'])
+
+    if output == 'csv':
+        name = os.path.splitext(files['new'].filename)[0]
+        response = app.response_class(encode_chunks(iter_diff_csv(diff)), mimetype='text/csv')
+        response.headers['Content-Disposition'] = attachment_disposition(f'{name}_changes.csv')
+    else:
+        head = {
+            'success': True,
+            'old': {'file': files['old'].filename, 'count': len(items['old'])},
+            'new': {'file': files['new'].filename, 'count': len(items['new'])},
+            'summary': {
+                'added': len(diff['added']),
+                'removed': len(diff['removed']),
+                'changed': len(diff['changed']),
+                'unchanged': diff['unchanged'],
+                'duplicates': diff['duplicates']
+            }
+        }
+        if timings_requested():
+            head['timings'] = timer.as_dict()
+        response = app.response_class(encode_chunks(iter_diff_json(head, diff)), mimetype='application/json')
+    # Written before the body is streamed, so there is no serialize stage
+    response.headers['Server-Timing'] = timer.header()
+    return response
 
 @app.route('/download-html')
 def download_html():
@@ -475,16 +1577,7 @@ def download_html():
         return "No file to download", 404
 
     data = processed_results['html_latest']
-    buffer = io.BytesIO()
-    buffer.write(data['content'].encode('utf-8'))
-    buffer.seek(0)
-
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=data['filename'],
-        mimetype='text/html'
-    )
+    return html_entry_response(data['entry'], data['filename'])
 
 @app.route('/preview-html')
 def preview_html():
@@ -492,7 +1585,85 @@ def preview_html():
         return "No HTML generated yet. Please generate HTML first.", 404
 
     data = processed_results['html_latest']
-    return data['content']
+    return html_entry_response(data['entry'])
+
+# ============ SHARED LIST ASSETS ============
+# Lists generated with shared assets link to the template's CSS and scripts
+# under /static/lists/ (see update_htm.compile_shared_list_template). The file
+# names carry a hash of the content, so a name never changes meaning and the
+# files can be cached for good; assets.json lists them for sw.js to precache.
+
+def shared_list_assets():
+    """Return {file name: text} of the shared assets of compact and virtual lists."""
+    assets = {}
+    if os.path.exists(LIST_TEMPLATE_PATH):
+        for virtual in (False, True):
+            assets.update(load_shared_list_template(LIST_TEMPLATE_PATH, virtual)[1])
+    return assets
+
+@app.route('/static/lists/assets.json')
+def shared_assets_manifest():
+    response = jsonify({'assets': [f'/static/lists/{name}' for name in sorted(shared_list_assets())]})
+    # Changes whenever list.HTM does
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/static/lists/<name>')
+def shared_asset(name):
+    text = shared_list_assets().get(name)
+    if text is None:
+        return "Asset not found", 404
+    mimetype = 'text/css' if name.endswith('.css') else 'text/javascript'
+    response = app.response_class(text, mimetype=mimetype)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# ============ SERVICE WORKER ============
+# sw.js precaches the app's pages and static files. Its PRECACHE_VERSION is
+# filled in here with a hash of those files, so the browser sees a changed
+# worker, installs it and refreshes the precache whenever one of them changes.
+
+SERVICE_WORKER_PATH = os.path.join(app.static_folder, 'sw.js')
+
+# Files behind the URLs in PRECACHE_URLS of sw.js
+PRECACHE_FILES = [
+    # template_folder is relative to the app, not to the working directory
+    os.path.join(app.root_path, app.template_folder, name) for name in ('index.html', 'search.html', 'make_html.html')
+] + [
+    os.path.join(app.static_folder, name) for name in ('manifest.json', 'icon-192.png', 'icon-512.png', 'search_worker.js')
+]
+
+# (mtimes, source with the version filled in)
+_service_worker_cache = None
+
+def precache_version():
+    """Hash the precached files and the shared list asset names."""
+    digest = hashlib.sha256()
+    for path in PRECACHE_FILES:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    for name in sorted(shared_list_assets()):
+        digest.update(name.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+@app.route('/static/sw.js')
+def service_worker():
+    global _service_worker_cache
+    watched = [SERVICE_WORKER_PATH, LIST_TEMPLATE_PATH] + PRECACHE_FILES
+    mtimes = [os.path.getmtime(path) if os.path.exists(path) else None for path in watched]
+    if _service_worker_cache is None or _service_worker_cache[0] != mtimes:
+        with open(SERVICE_WORKER_PATH, 'r', encoding='utf-8') as f:
+            source = f.read()
+        source = source.replace("const PRECACHE_VERSION = 'dev';", f"const PRECACHE_VERSION = '{precache_version()}';", 1)
+        _service_worker_cache = (mtimes, source)
+
+    response = app.response_class(_service_worker_cache[1], mimetype='text/javascript')
+    # The browser compares the worker byte for byte on every check
+    response.headers['Cache-Control'] = 'no-cache'
+    # Served from /static but handles the whole site, so it is registered with scope '/'
+    response.headers['Service-Worker-Allowed'] = '/'
+    return response
 
 # ============ SEARCH MEDICINES FUNCTIONALITY ============
 
@@ -503,8 +1674,7 @@ def search_page():
 import atexit
 import shutil
 import tempfile
-import gzip as gzip_module
-import time
+import multiprocessing
 
 SESSION_TTL = 300  # 5 minutes in seconds
 
@@ -520,6 +1690,12 @@ def purge_expired_sessions():
 
 def cleanup_uploads():
     """Clean up uploaded files when the application stops"""
+    # Batch workers are spawned processes that import this module too; they
+    # must not delete the server's uploads when their pool shuts down. This is
+    # checked here, at exit, because it isn't known yet while a spawned worker
+    # imports the main module.
+    if multiprocessing.parent_process() is not None:
+        return
     upload_dir = os.path.join(tempfile.gettempdir(), 'medicine_uploads')
     if os.path.exists(upload_dir):
         # Clean all files in the uploads directory
@@ -543,6 +1719,8 @@ def upload_lists():
 
     files = request.files.getlist('files')
     file_paths = []
+    timer = metrics.RequestTimings()
+    timed_files = timer.details['files'] = []
 
     for file in files:
         if file.filename == '':
@@ -558,10 +1736,16 @@ def upload_lists():
         os.makedirs(upload_dir, exist_ok=True)
         filepath = os.path.join(upload_dir, filename)
 
-        file_data = decompress_if_needed(file.read())
-        with open(filepath, 'wb') as f:
-            f.write(file_data)
+        number = len(file_paths) + 1
+        with timer.stage(f'read-{number}', filename):
+            raw = file.read()
+        with timer.stage(f'decompress-{number}', filename):
+            file_data = decompress_if_needed(raw)
+        with timer.stage(f'write-{number}', filename):
+            with open(filepath, 'wb') as f:
+                f.write(file_data)
         file_paths.append(filepath)
+        timed_files.append({'file': filename, 'bytes': len(raw), 'decompressed_bytes': len(file_data)})
 
     session_id = request.form.get('session_id', 'default')
 
@@ -576,13 +1760,13 @@ def upload_lists():
     uploaded_files_storage[session_id]['expires_at'] = time.time() + SESSION_TTL
 
     total_files_for_session = len(uploaded_files_storage[session_id]['files'])
-    return jsonify({
+    return timed_json({
         'success': True,
         'message': f'Uploaded {len(file_paths)} files, total files in session: {total_files_for_session}',
         'file_paths': uploaded_files_storage[session_id]['files'],
         'session_id': session_id,
         'expires_in': SESSION_TTL
-    })
+    }, timer)
 
 @app.route('/search-medicines', methods=['POST'])
 def search_medicines():
@@ -610,15 +1794,93 @@ def search_medicines():
 
     # Perform the search
     searcher = MedicineSearcher()
-    results = searcher.search_medicines(file_paths, search_terms)
+    timer = metrics.RequestTimings()
+    results = run_cpu_job(searcher.search_medicines, file_paths, search_terms, timer)
 
-    return jsonify({
+    return timed_json({
         'success': True,
         'results': results,
         'total_files': len(file_paths),
         'total_matches': sum(len(result['matches']) for result in results)
+    }, timer)
+
+def build_list_indexes(files):
+    """Parse (path, file name) pairs into search indexes, skipping files that fail."""
+    searcher = MedicineSearcher()
+    indexes = []
+    for path, name in files:
+        try:
+            indexes.append(searcher.build_list_index(path, name))
+        except Exception as e:
+            print(f"Error indexing file {name}: {str(e)}")
+    return indexes
+
+@app.route('/list-index', methods=['POST'])
+def list_index():
+    """Parse uploaded lists into compact indexes for offline search.
+
+    Nothing is kept on the server: the search page stores the indexes in
+    IndexedDB and searches them in static/search_worker.js.
+    """
+    if 'files' not in request.files:
+        return jsonify({'error': 'No files uploaded'}), 400
+
+    if MedicineSearcher is None:
+        return jsonify({'error': 'Search functionality not available, unable to import required modules'}), 500
+
+    upload_dir = os.path.join(tempfile.gettempdir(), 'medicine_uploads')
+    os.makedirs(upload_dir, exist_ok=True)
+    # The parsers need a file with the right extension
+    work_dir = tempfile.mkdtemp(dir=upload_dir)
+    try:
+        files = []
+        for file in request.files.getlist('files'):
+            if file.filename == '' or not file.filename.lower().endswith(('.htm', '.html', '.txt', '.text', '.pdf')):
+                continue
+            name = os.path.basename(file.filename)
+            filepath = os.path.join(work_dir, f'{len(files)}_{name}')
+            with open(filepath, 'wb') as f:
+                f.write(decompress_if_needed(file.read()))
+            files.append((filepath, name))
+
+        indexes = run_cpu_job(build_list_indexes, files)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return jsonify({
+        'success': True,
+        'version': LIST_INDEX_VERSION,
+        'lists': indexes,
+        'total_items': sum(len(index['items']) for index in indexes)
     })
 
+# ============ METRICS ENDPOINT ============
+
+def search_session_gauges():
+    """Return {labels: value} for uploaded search files: sessions, files and bytes on disk."""
+    sessions = list(uploaded_files_storage.values())
+    paths = [path for data in sessions for path in data['files']]
+    return {
+        metrics.labels(kind='sessions'): len(sessions),
+        metrics.labels(kind='files'): len(paths),
+        metrics.labels(kind='bytes'): sum(os.path.getsize(path) for path in paths if os.path.exists(path)),
+    }
+
+def cache_hit_ratio(cache):
+    hits = metrics.value(CACHE_REQUESTS, cache=cache, result='hit')
+    misses = metrics.value(CACHE_REQUESTS, cache=cache, result='miss')
+    return hits / (hits + misses) if hits + misses else 0
+
+metrics.gauge('medlist_html_cache_bytes', 'Bytes held by the generated list cache', lambda: html_cache_bytes)
+metrics.gauge('medlist_html_cache_entries', 'Lists held by the generated list cache', lambda: len(html_cache))
+metrics.gauge('medlist_html_cache_hit_ratio', 'Share of /generate-html requests served from the cache', lambda: cache_hit_ratio('html'))
+metrics.gauge('medlist_search_sessions', 'Search upload sessions, their files and bytes on disk', search_session_gauges)
+metrics.gauge('medlist_stored_results', 'Converted lists and generated HTML kept for download', lambda: len(processed_results))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return app.response_class(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 if __name__ == '__main__':
     # host='0.0.0.0' allows access from other devices on same network
     app.run(debug=True, host='0.0.0.0', port=5001)
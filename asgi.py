@@ -0,0 +1,154 @@
+"""ASGI entry point for app.py, for traffic with many slow uploads.
+
+    pip install uvicorn
+    uvicorn asgi:application --host 0.0.0.0 --port 5001
+
+Under a WSGI server every request holds a worker thread from its first byte,
+so a phone uploading lists over a slow connection ties one up for the whole
+transfer. Here the request body is received on the event loop first (kept in
+memory up to SPOOL_MAX_MEMORY, written to a temp file beyond that on the I/O
+executor) and the Flask app is only called once it is complete, on
+ASGI_WSGI_THREADS threads. CPU-heavy parsing still runs on app.py's CPU pool,
+so routes, responses and limits are exactly those of the WSGI app.
+"""
+import os
+import sys
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app
+
+# Request bodies up to this size stay in memory
+SPOOL_MAX_MEMORY = 1024 * 1024
+# Threads running Flask views once their request has arrived
+ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 8))
+
+wsgi_executor = ThreadPoolExecutor(max_workers=ASGI_WSGI_THREADS, thread_name_prefix='asgi-wsgi')
+# Spooled body writes and closes, so the event loop never waits for the disk
+io_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='asgi-io')
+
+async def receive_body(receive, limit):
+    """Read the request body into a spooled temp file and return (file, size).
+
+    Stops reading past limit; the app then answers 413 as it would under WSGI.
+    """
+    loop = asyncio.get_running_loop()
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    size = 0
+    more = True
+    while more:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            await loop.run_in_executor(io_executor, body.close)
+            return None, size
+        chunk = message.get('body', b'')
+        more = message.get('more_body', False)
+        if limit is not None and size + len(chunk) > limit:
+            # Drop the body, a Content-Length past the limit is enough for the 413
+            await loop.run_in_executor(io_executor, body.close)
+            return tempfile.SpooledTemporaryFile(max_size=0), size + len(chunk)
+        if size + len(chunk) > SPOOL_MAX_MEMORY:
+            await loop.run_in_executor(io_executor, body.write, chunk)
+        else:
+            body.write(chunk)
+        size += len(chunk)
+    body.seek(0)
+    return body, size
+
+def build_environ(scope, body, size):
+    """Return the WSGI environ for an ASGI http scope and its received body."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        # WSGI strings are bytes decoded as latin-1
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(size),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            # The size actually received, also for chunked bodies; a bigger
+            # declared length is kept so the app can refuse it
+            environ['CONTENT_LENGTH'] = str(max(size, int(value))) if value.isdigit() else str(size)
+            continue
+        key = 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+def run_wsgi(environ, send, loop):
+    """Call the Flask app on a worker thread and pass its response to send on the loop."""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    def send_message(message):
+        # Waits for the loop, so a slow client slows the app's streaming down
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    result = flask_app(environ, start_response)
+    started = False
+    try:
+        for chunk in result:
+            if not chunk:
+                continue
+            if not started:
+                send_message({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+                started = True
+            send_message({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        if not started:
+            send_message({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+        send_message({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            wsgi_executor.shutdown(wait=False)
+            io_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        # No websockets
+        return
+
+    body, size = await receive_body(receive, flask_app.config.get('MAX_CONTENT_LENGTH'))
+    if body is None:
+        # The client went away before its request was complete
+        return
+
+    loop = asyncio.get_running_loop()
+    environ = build_environ(scope, body, size)
+    try:
+        await loop.run_in_executor(wsgi_executor, run_wsgi, environ, send, loop)
+    finally:
+        await loop.run_in_executor(io_executor, body.close)
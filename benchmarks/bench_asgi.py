@@ -0,0 +1,206 @@
+"""Side by side: WSGI and ASGI (asgi.py) serving while slow uploads are running.
+
+For each mode the app is started in a subprocess with the same number of
+request threads (--threads), then for --duration seconds
+
+    --slow clients upload a gzipped list to /upload-lists at --rate KB/s each,
+               like phones on a weak connection, one upload after the other
+    --fast clients send small /search-medicines requests back to back
+
+and the throughput and p50/p95/p99 latency of the fast requests, the finished
+uploads and the server's peak RSS are printed for both modes.
+
+    python benchmarks/bench_asgi.py --slow 8 --fast 4 --threads 4
+
+Modes: wsgi runs gunicorn with gthread workers (--threads per worker, like a
+production WSGI setup; werkzeug's threaded server if gunicorn is missing,
+which starts a thread per connection), asgi runs uvicorn asgi:application
+with ASGI_WSGI_THREADS=--threads. Linux only (gunicorn, /proc).
+"""
+import os
+import sys
+import json
+import time
+import gzip
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+import importlib.util
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.normpath(os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, ROOT)
+import corpus
+from load_test import free_port, peak_rss, encode_multipart, percentile
+
+MODES = ('wsgi', 'asgi')
+
+def server_command(mode, port, threads):
+    """Return (command, description) that serves the app in mode on port."""
+    if mode == 'asgi':
+        return ([sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1',
+                 '--port', str(port), '--log-level', 'warning'], f'uvicorn, {threads} app threads')
+    if importlib.util.find_spec('gunicorn'):
+        return ([sys.executable, '-m', 'gunicorn', '-k', 'gthread', '-w', '1', '--threads', str(threads),
+                 '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'], f'gunicorn gthread, {threads} threads')
+    code = ('import app; from werkzeug.serving import run_simple; '
+            f'run_simple("127.0.0.1", {port}, app.app, threaded=True)')
+    return [sys.executable, '-c', code], 'werkzeug, a thread per connection'
+
+def start_server(mode, port, threads):
+    command, description = server_command(mode, port, threads)
+    env = dict(os.environ, ASGI_WSGI_THREADS=str(threads))
+    log = tempfile.TemporaryFile()
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=log)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if server.poll() is not None:
+            log.seek(0)
+            raise RuntimeError(f'{mode} server exited: ' + log.read().decode('utf-8', 'replace')[-2000:])
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+            return server, description
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'{mode} server did not start within 30 seconds')
+
+def slow_upload(port, body, content_type, rate, stop_at):
+    """Send one upload at rate bytes/second; return True if it got a 200."""
+    head = (f'POST /upload-lists HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n').encode('latin-1')
+    step = max(1, int(rate / 10))
+    try:
+        with socket.create_connection(('127.0.0.1', port), timeout=60) as sock:
+            sock.sendall(head)
+            for offset in range(0, len(body), step):
+                if time.perf_counter() > stop_at + 30:
+                    return False
+                sock.sendall(body[offset:offset + step])
+                time.sleep(0.1)
+            response = b''
+            while b'\r\n' not in response:
+                data = sock.recv(4096)
+                if not data:
+                    break
+                response += data
+            return response.startswith(b'HTTP/1.1 200') or response.startswith(b'HTTP/1.0 200')
+    except OSError:
+        return False
+
+def run_mode(mode, args, lists):
+    port = free_port()
+    server, description = start_server(mode, port, args.threads)
+    base_url = f'http://127.0.0.1:{port}'
+    results = {'mode': mode, 'server': description, 'latencies': [], 'errors': 0, 'uploads': 0, 'failed_uploads': 0}
+    lock = threading.Lock()
+    try:
+        # One small session for the fast clients
+        body, content_type = encode_multipart({'session_id': 'fast'}, [('files', 'fast_list.txt', lists['small'])])
+        urllib.request.urlopen(urllib.request.Request(base_url + '/upload-lists', data=body,
+                                                      headers={'Content-Type': content_type}), timeout=30).read()
+        search = json.dumps({'search_terms': lists['terms'], 'session_id': 'fast'}).encode('utf-8')
+
+        start = time.perf_counter()
+        stop_at = start + args.duration
+
+        def fast_client():
+            while time.perf_counter() < stop_at:
+                request = urllib.request.Request(base_url + '/search-medicines', data=search,
+                                                 headers={'Content-Type': 'application/json'})
+                began = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request, timeout=30) as response:
+                        response.read()
+                    ok = True
+                except (urllib.error.HTTPError, OSError):
+                    ok = False
+                with lock:
+                    if ok:
+                        results['latencies'].append(time.perf_counter() - began)
+                    else:
+                        results['errors'] += 1
+
+        def slow_client(number):
+            body, content_type = encode_multipart({'session_id': f'slow-{number}'},
+                                                  [('files', f'slow_{number}.htm', lists['upload'])])
+            while time.perf_counter() < stop_at:
+                ok = slow_upload(port, body, content_type, args.rate * 1024, stop_at)
+                with lock:
+                    results['uploads' if ok else 'failed_uploads'] += 1
+
+        clients = [threading.Thread(target=slow_client, args=(n,), daemon=True) for n in range(args.slow)]
+        # Let the uploads take the server's threads first
+        for client in clients:
+            client.start()
+        time.sleep(0.5)
+        fast = [threading.Thread(target=fast_client, daemon=True) for _ in range(args.fast)]
+        for client in fast:
+            client.start()
+        for client in fast + clients:
+            client.join()
+        results['seconds'] = time.perf_counter() - start
+        results['peak_rss_bytes'] = peak_rss(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+def report(all_results):
+    print(f"\n{'mode':<6} {'fast req/s':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7} {'uploads':>8} {'failed':>7} {'RSS':>7}  server")
+    summary = {}
+    for results in all_results:
+        values = sorted(results['latencies'])
+        row = {
+            'server': results['server'],
+            'fast_per_second': len(values) / results['seconds'],
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'errors': results['errors'],
+            'uploads': results['uploads'],
+            'failed_uploads': results['failed_uploads'],
+            'peak_rss_bytes': results['peak_rss_bytes']
+        }
+        summary[results['mode']] = row
+        rss = f"{row['peak_rss_bytes'] / 1048576:.0f}MB" if row['peak_rss_bytes'] else '-'
+        print(f"{results['mode']:<6} {row['fast_per_second']:>10.1f} {row['p50_ms']:>6.0f}ms {row['p95_ms']:>6.0f}ms "
+              f"{row['p99_ms']:>6.0f}ms {row['errors']:>7} {row['uploads']:>8} {row['failed_uploads']:>7} {rss:>7}  {row['server']}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare WSGI and ASGI serving under slow uploads')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--threads', type=int, default=4, help='request threads of either server (default 4)')
+    parser.add_argument('--slow', type=int, default=8, help='clients uploading slowly (default 8)')
+    parser.add_argument('--fast', type=int, default=4, help='clients sending small searches (default 4)')
+    parser.add_argument('--rate', type=float, default=32, help='KB/s of each slow upload (default 32)')
+    parser.add_argument('--list-size', type=int, default=1000, help='items of the uploaded list (default 1000)')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per mode (default 20)')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    items = corpus.make_items(args.list_size)
+    lists = {
+        'upload': gzip.compress(corpus.default_htm(items).encode('utf-8'), 6),
+        'small': corpus.text_list(items[:50]).encode('utf-8'),
+        'terms': corpus.order_terms(items[:50], 5)
+    }
+    print(f"Slow uploads of {len(lists['upload']) / 1024:.0f}KB at {args.rate:g}KB/s "
+          f"(about {len(lists['upload']) / 1024 / args.rate:.0f}s each)")
+
+    all_results = []
+    for mode in args.modes:
+        print(f'Running {mode} for {args.duration:.0f}s...')
+        all_results.append(run_mode(mode, args, lists))
+    summary = report(all_results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': summary}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark offer list generation for large catalogs.
+
+Compares building the whole list as one string (generate_html_from_template)
+with writing it to a file chunk by chunk (write_html_from_template), in full
+and compact mode. Prints the time and the tracemalloc peak for each size.
+
+Usage: python benchmarks/bench_generation.py [sizes...]   (default 1000 10000 50000)
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app import generate_html_from_template, write_html_from_template, LIST_TEMPLATE_PATH
+
+VALUES = ['12.5', '8%', 'TP', 'TP,/5+1', '140 NET', '330 NET/2+1', '10/10+1', '5%extra', '0', '7.25/']
+
+def make_items(count, seed=1):
+    """Return count synthetic (item_name, value) pairs."""
+    rng = random.Random(seed)
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return [(f'{rng.choice(letters)}{rng.choice(letters)}MED {i:05d} TAB', rng.choice(VALUES))
+            for i in range(count)]
+
+def run_string(items, compact):
+    content, error = generate_html_from_template(items, LIST_TEMPLATE_PATH, compact=compact)
+    return len(content)
+
+def run_stream(items, compact):
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as f:
+        write_html_from_template(f, items, LIST_TEMPLATE_PATH, compact=compact)
+        return f.tell()
+
+def measure(fn, items, compact):
+    """Return (seconds, peak bytes, output size) for one run of fn."""
+    # Time without tracemalloc, it slows allocation down a lot
+    start = time.perf_counter()
+    size = fn(items, compact)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn(items, compact)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, size
+
+def main(sizes):
+    # Compile the template before timing anything
+    generate_html_from_template(make_items(10), LIST_TEMPLATE_PATH)
+
+    print(f"{'items':>7}  {'mode':<8} {'output':<7} {'time':>9} {'peak':>10} {'size':>10}")
+    for count in sizes:
+        items = make_items(count)
+        for compact in (False, True):
+            for name, fn in (('string', run_string), ('stream', run_stream)):
+                seconds, peak, size = measure(fn, items, compact)
+                print(f"{count:>7}  {'compact' if compact else 'full':<8} {name:<7} "
+                      f"{seconds * 1000:>7.0f}ms {peak / 1048576:>8.1f}MB {size / 1048576:>8.1f}MB")
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,214 @@
+"""Repeatable benchmarks of parsing, search, conversion and list generation.
+
+Runs every case on a synthetic corpus (see corpus.py) and prints the median
+and best wall time of --repeat runs, the tracemalloc peak of one more run and
+the number of rows or matches produced. --save writes the results as JSON;
+--compare reads such a file and marks cases whose median time or peak memory
+moved by more than --threshold, exiting with 1 if any got slower. A case whose
+runs scatter more than that needs a bigger change before it is marked (see
+noise_threshold), so a noisy case does not fail the comparison by chance.
+
+    python benchmarks/bench_suite.py --save baseline.json
+    ... change search_medicines.py ...
+    python benchmarks/bench_suite.py --compare baseline.json
+
+Compare runs of the same --size on the same machine; timings of other sizes
+or Pythons are not comparable and are reported as such.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import corpus
+from app import (
+    process_htm_content, convert_htm_content, detect_list_format, parse_text_content,
+    generate_html_from_template, LIST_TEMPLATE_PATH
+)
+from search_medicines import MedicineSearcher, medicine_name_matches
+
+RESULTS_VERSION = 2
+# Changes smaller than this are timer noise, whatever the ratio
+MIN_DELTA_S = 0.001
+# A time change must be this many times the runs' relative spread to count
+NOISE_FACTOR = 3
+
+def build_cases(directory, size, seed):
+    """Write the corpus to directory and return [(name, fn)], fn returning a row/match count."""
+    paths = corpus.write_corpus(directory, size, seed)
+    items = corpus.make_items(size, seed)
+    contents = {kind: open(paths[kind], encoding='utf-8').read() for kind in ('default', 'stock', 'new', 'text')}
+    with open(paths['terms'], encoding='utf-8') as f:
+        terms = [line for line in f.read().split('\n') if line]
+    search_files = [paths['default'], paths['stock'], paths['text'], paths['pdf']]
+    parsed = [med for path in search_files for med in MedicineSearcher().process_file(path)]
+
+    def match_only():
+        count = 0
+        for term in terms:
+            term_lower = term.lower().strip()
+            words = term_lower.split()
+            count += sum(1 for med in parsed if medicine_name_matches(term_lower, words, med['name'].lower()))
+        return count
+
+    cases = [
+        ('detect/default', lambda: 1 if detect_list_format(contents['default']) else 0),
+        ('convert/default', lambda: len(convert_htm_content(contents['default'])[0])),
+        ('text/parse', lambda: len(parse_text_content(contents['text']))),
+        ('search/match', match_only),
+        ('search/all', lambda: sum(len(result['matches']) for result in
+                                   MedicineSearcher().search_medicines(search_files, terms))),
+    ]
+    for kind in ('default', 'stock', 'new'):
+        cases.append((f'parse/{kind}', lambda kind=kind: len(process_htm_content(contents[kind], list_format='auto'))))
+    for kind in ('default', 'text', 'pdf'):
+        cases.append((f'search_parse/{kind}', lambda kind=kind: len(MedicineSearcher().process_file(paths[kind]))))
+    for mode in ('full', 'compact', 'virtual'):
+        def generate(mode=mode):
+            content, error = generate_html_from_template(items, LIST_TEMPLATE_PATH,
+                                                         compact=mode == 'compact', virtual=mode == 'virtual')
+            return len(content)
+        cases.append((f'generate/{mode}', generate))
+    return sorted(cases)
+
+def measure(fn, repeat):
+    """Return the timings, tracemalloc peak and count of fn."""
+    # The first run compiles templates and fills OS caches
+    count = fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    # Separate run, tracemalloc slows allocation down a lot
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'runs': repeat,
+        'samples_s': times,
+        'peak_bytes': peak,
+        'count': count
+    }
+
+def run(size, seed, repeat, only=None, corpus_dir=None):
+    """Run the cases (those containing one of the only substrings) and return the results dict."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = build_cases(corpus_dir or tmp, size, seed)
+        results = {}
+        for name, fn in cases:
+            if only and not any(part in name for part in only):
+                continue
+            results[name] = measure(fn, repeat)
+            print_result(name, results[name])
+    return {
+        'version': RESULTS_VERSION,
+        'meta': {
+            'size': size,
+            'seed': seed,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S')
+        },
+        'results': results
+    }
+
+def print_result(name, result):
+    print(f"{name:<22} {result['median_s'] * 1000:>9.1f}ms  (best {result['min_s'] * 1000:>8.1f}ms)"
+          f"  peak {result['peak_bytes'] / 1048576:>7.1f}MB  count {result['count']}")
+
+def relative_spread(result):
+    """Median absolute deviation of a case's runs, relative to their median."""
+    median = result['median_s']
+    if not median:
+        return 0.0
+    samples = result.get('samples_s')
+    if not samples:
+        # Version 1 results only kept the median and the best run
+        return (median - result['min_s']) / median
+    return statistics.median(abs(sample - median) for sample in samples) / median
+
+def noise_threshold(current, base, threshold):
+    """Relative time change needed to mark a case: threshold, or more for a noisy one."""
+    return max(threshold, NOISE_FACTOR * max(relative_spread(current), relative_spread(base)))
+
+def compare(current, baseline, threshold):
+    """Print current against baseline and return the names of cases that got slower."""
+    for key in ('size', 'seed', 'python'):
+        if current['meta'][key] != baseline['meta'].get(key):
+            print(f"Note: baseline {key} is {baseline['meta'].get(key)}, this run {current['meta'][key]}; "
+                  f"results are not comparable")
+
+    slower = []
+    print(f"\n{'case':<22} {'baseline':>10} {'now':>10} {'time':>7} {'noise':>6} {'peak':>7}")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<22} {'-':>10} {result['median_s'] * 1000:>8.1f}ms   new")
+            continue
+        time_ratio = result['median_s'] / base['median_s'] if base['median_s'] else 1.0
+        peak_ratio = result['peak_bytes'] / base['peak_bytes'] if base['peak_bytes'] else 1.0
+        flags = []
+        noticeable = abs(result['median_s'] - base['median_s']) >= MIN_DELTA_S
+        time_threshold = noise_threshold(result, base, threshold)
+        if noticeable and time_ratio > 1 + time_threshold:
+            flags.append('SLOWER')
+            slower.append(name)
+        elif noticeable and time_ratio < 1 - time_threshold:
+            flags.append('faster')
+        if peak_ratio > 1 + threshold:
+            flags.append('MORE MEMORY')
+        elif peak_ratio < 1 - threshold:
+            flags.append('less memory')
+        if result['count'] != base['count']:
+            flags.append(f"count {base['count']} -> {result['count']}")
+        print(f"{name:<22} {base['median_s'] * 1000:>8.1f}ms {result['median_s'] * 1000:>8.1f}ms "
+              f"{time_ratio:>6.2f}x {time_threshold:>5.0%} {peak_ratio:>6.2f}x  {' '.join(flags)}")
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parsing, search, conversion and list generation')
+    parser.add_argument('--size', type=int, default=2000, help='items per synthetic list (default 2000)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per case (default 10)')
+    parser.add_argument('--only', nargs='+', help='run only cases whose name contains one of these')
+    parser.add_argument('--corpus', help='keep the generated lists in this directory')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='compare with results saved by --save')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative change reported as slower/faster; noisy cases need more (default 0.10)')
+    args = parser.parse_args()
+
+    # Read the baseline first, so a bad path fails before the long run
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    current = run(args.size, args.seed, args.repeat, args.only, args.corpus)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"\nSaved {len(current['results'])} results to {args.save}")
+
+    if baseline is not None:
+        slower = compare(current, baseline, args.threshold)
+        if slower:
+            print(f"\n{len(slower)} case(s) slower than the baseline: {', '.join(slower)}")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
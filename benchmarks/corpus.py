@@ -0,0 +1,192 @@
+"""Synthetic medicine lists for the benchmarks.
+
+Everything is generated from a seed, so the same size and seed always give
+the same files. Names look like real list entries ("AZOMAX 500MG TAB",
+"CAFLAM 50MG SACHET 10S") and values use the offer formats seen in
+distributor lists (12.5, 8%, TP, 140 NET, 10/10+1, ...).
+
+    make_items(count)        [(name, value), ...] for update_htm / parse_text_content
+    default_htm(items)       a full offer list from list_to_htm/list.HTM (<tr class="item">)
+    stock_htm(items)         stock layout, name in td[2]
+    new_htm(items)           new_pattern.HTM layout (<tr class="item-row" data-disc=...>)
+    text_list(items)         "name----- value" lines
+    pdf_list(items)          a PDF with the same lines as text_list
+    order_terms(items, n)    search terms like a pasted order: full names,
+                             name + strength, partial words and misses
+
+Usage: python benchmarks/corpus.py OUT_DIR [--size 5000] [--seed 1]
+writes one file per format to OUT_DIR.
+"""
+import os
+import sys
+import random
+import argparse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+NEW_PATTERN_PATH = os.path.join(ROOT, 'new_pattern.HTM')
+
+SYLLABLES = ['AZO', 'MAX', 'CAF', 'LAM', 'BRU', 'FEN', 'PANA', 'DOL', 'RISEK', 'GANA', 'TON',
+             'CEC', 'LOR', 'EZO', 'MOL', 'VEN', 'TOLIN', 'AUG', 'MENTIN', 'NEXUM', 'FLA', 'GYL',
+             'ZIN', 'CIP', 'ROX', 'SURB', 'EX', 'ARI', 'NAC', 'MOX', 'AL', 'TEC', 'LEXO', 'TANIL']
+FORMS = ['TAB', 'CAP', 'SYP', 'INJ', 'DROPS', 'CREAM', 'SACHET', 'SUSP', 'GEL']
+STRENGTHS = ['5MG', '10MG', '20', '40MG', '50', '100MG', '250', '500', '500MG', '1G', '60ML', '120ML', '']
+PACKS = ['', '', '', '10S', '14S', '20S', '30S', 'PLAIN', 'DS', 'XR']
+VALUES = ['12.5', '8%', '15.00%', 'TP', 'TP,/5+1', '140 NET', '330 NET/2+1', '10/10+1',
+          '5%extra', '0', '7.25/', '18%', '3.5']
+COMPANIES = ['ABBOTT', 'ATCO LABORATORIES', 'GETZ PHARMA', 'SEARLE', 'HILTON PHARMA',
+             'FEROZSONS', 'SAMI PHARMA', 'MARTIN DOW', 'HIGH-Q', 'BOSCH PHARMA']
+SHOPS = ['ALI MEDICOS', 'MEHRAN MEDICOS', 'S.S.D PHARMA', 'AL-NOOR PHARMACY', 'CITY MEDICAL STORE']
+# Search terms that match nothing
+MISSES = ['zzyzx', 'qwerty 99', 'no such med']
+
+def make_items(count, seed=1):
+    """Return count (name, value) pairs in random (unsorted) order."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        name = rng.choice(SYLLABLES) + rng.choice(SYLLABLES)
+        parts = [name, rng.choice(STRENGTHS), rng.choice(FORMS), rng.choice(PACKS)]
+        # A serial keeps names unique in big lists, like the batch codes some lists carry
+        if i >= len(SYLLABLES) ** 2:
+            parts.append(f'B{i:05d}')
+        items.append((' '.join(part for part in parts if part), rng.choice(VALUES)))
+    return items
+
+def default_htm(items, shop='S.S.D PHARMA'):
+    """Return a full offer list as /generate-html makes it."""
+    from app import generate_html_from_template, LIST_TEMPLATE_PATH
+    content, error = generate_html_from_template(items, LIST_TEMPLATE_PATH, title=shop)
+    if error:
+        raise RuntimeError(error)
+    return content
+
+def stock_htm(items, shop='ALI MEDICOS', seed=1):
+    """Return a stock-layout list: code, company, name, discount, bonus, TP."""
+    rng = random.Random(seed)
+    rows = []
+    for i, (name, value) in enumerate(items, 1):
+        discount = value if value.endswith('%') else '0.00%'
+        bonus = '' if value.endswith('%') else value
+        rows.append(f'<tr class="item"><td>{rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ")}{i:04d}</td>'
+                    f'<td>{rng.choice(COMPANIES)}</td><td>{name}</td><td>{discount}</td>'
+                    f'<td>{bonus}</td><td>{rng.uniform(50, 2500):.2f}</td></tr>')
+    return ('<!DOCTYPE html>\n<html><head><meta charset="UTF-8"><title>Stock List</title>\n'
+            f'<script>var TITLETOTO = "{shop}" ;</script></head>\n<body>\n'
+            f'<h2 class="shop-name">{shop}</h2>\n<table id="stock">\n'
+            '<tr><th>Code</th><th>Company</th><th>Item</th><th>Disc</th><th>Bonus</th><th>TP</th></tr>\n'
+            + '\n'.join(rows) + '\n</table>\n</body></html>\n')
+
+def new_htm(items, shop='MEHRAN MEDICOS', seed=1):
+    """Return items in the new_pattern.HTM layout, inside that file's page."""
+    with open(NEW_PATTERN_PATH, encoding='utf-8', errors='ignore') as f:
+        page = f.read()
+    body_start = page.index('<tbody id="itemsBody">') + len('<tbody id="itemsBody">')
+    body_end = page.index('</tbody>', body_start)
+    head = page[:body_start].replace('MEHRAN MEDICOS', shop)
+    tail = page[body_end:].replace('MEHRAN MEDICOS', shop)
+
+    rng = random.Random(seed)
+    rows = []
+    company = None
+    for i, (name, value) in enumerate(sorted(items, key=lambda item: item[0]), 1):
+        if company is None or rng.random() < 0.05:
+            company = rng.choice(COMPANIES)
+            rows.append(f'<tr class="company-head"><td colspan="7">{company:<30}</td></tr>')
+        disc = value.rstrip('%') if value.endswith('%') else ''
+        bonus = '' if disc else value
+        tp = f'{rng.uniform(50, 2500):.2f}'
+        rows.append(
+            f'            <tr class="item-row" data-id="{i:08d}" data-tp="{tp}" data-disc="{disc}" data-bonus="{bonus}" data-tax="0.00">\n'
+            f'              <td class="first-col"> {i:04d} </td><td class="cell-name">          {name:<28}</td>'
+            '<td><div class="qty-wrap"><input class="qty-input" type="number" min="0" max="5000" step="1" placeholder="0" inputmode="numeric"></div>\n'
+            f'              </td><td class="num">{(disc + "%") if disc else "0.00%"}\n         </td>     <td>{bonus}\n'
+            f'              </td><td class="num">{tp}\n</td><td align="center">      0.00\n</td></tr>')
+    return head + '\n' + '\n'.join(rows) + '\n' + tail
+
+def text_list(items, shop='CITY MEDICAL STORE'):
+    """Return a data.txt style list with a shop line on top."""
+    return shop + '\n' + ''.join(f'{name}----- {value}\n' for name, value in items)
+
+def _pdf_string(text):
+    return '(' + text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+
+def pdf_list(items, shop='AL-NOOR PHARMACY', lines_per_page=60):
+    """Return the bytes of a PDF with one "name----- value" line per item."""
+    lines = [shop] + [f'{name}----- {value}' for name, value in items]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    objects = [None, None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    page_ids = []
+    for page_lines in pages:
+        text = ' T*\n'.join(_pdf_string(line) + ' Tj' for line in page_lines)
+        stream = f'BT /F1 10 Tf 12 TL 40 800 Td\n{text}\nET'.encode('latin-1', 'replace')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        content_id = len(objects)
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_id)
+        page_ids.append(len(objects))
+    objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+    objects[1] = (b'<< /Type /Pages /Kids [' + b' '.join(b'%d 0 R' % i for i in page_ids)
+                  + b'] /Count %d >>' % len(page_ids))
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+def order_terms(items, count=50, seed=1):
+    """Return count search terms like the lines of a customer's order."""
+    rng = random.Random(seed)
+    terms = []
+    for _ in range(count):
+        name = rng.choice(items)[0]
+        words = name.split()
+        kind = rng.random()
+        if kind < 0.3:
+            terms.append(name.lower())
+        elif kind < 0.6:
+            terms.append(' '.join(words[:2]).lower())
+        elif kind < 0.85:
+            # A partial first word, as typed in a hurry
+            terms.append(words[0][:rng.randint(3, max(3, len(words[0])))].lower())
+        else:
+            terms.append(rng.choice(MISSES))
+    return terms
+
+def write_corpus(directory, size=5000, seed=1):
+    """Write one list per format to directory and return {format: path}."""
+    os.makedirs(directory, exist_ok=True)
+    items = make_items(size, seed)
+    files = {
+        'default': ('default_list.htm', default_htm(items, SHOPS[2])),
+        'stock': ('stock_list.htm', stock_htm(items, SHOPS[0], seed)),
+        'new': ('new_list.htm', new_htm(items, SHOPS[1], seed)),
+        'text': ('text_list.txt', text_list(items, SHOPS[4])),
+        'pdf': ('pdf_list.pdf', pdf_list(items, SHOPS[3])),
+        'terms': ('order_terms.txt', '\n'.join(order_terms(items, seed=seed)) + '\n'),
+    }
+    paths = {}
+    for kind, (name, content) in files.items():
+        path = os.path.join(directory, name)
+        with open(path, 'wb') as f:
+            f.write(content if isinstance(content, bytes) else content.encode('utf-8'))
+        paths[kind] = path
+    return paths
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic medicine lists for benchmarking')
+    parser.add_argument('out_dir')
+    parser.add_argument('--size', type=int, default=5000, help='items per list (default 5000)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    for kind, path in write_corpus(args.out_dir, args.size, args.seed).items():
+        print(f'{kind:<8} {os.path.getsize(path):>10} bytes  {path}')
@@ -0,0 +1,294 @@
+"""Load test of the upload and search flow against a real server.
+
+Starts app.py on a local port in a subprocess (or uses --url) and runs
+--sessions concurrent clients for --duration seconds. Each client is one
+pharmacy: it uploads its distributor lists with /upload-lists, then keeps
+picking a request from the --mix:
+
+    search    /search-medicines with --terms order terms from its session
+    upload    /upload of an HTM list (conversion to text)
+    generate  /generate-html of a text list; a new list number every time,
+              so the HTML cache doesn't answer it
+
+Sessions upload again after --reupload searches, like a pharmacy loading the
+next day's lists. At the end it prints throughput, p50/p95/p99 latency per
+route, 503 (pool busy) and other error counts, and the server's peak RSS.
+
+    python benchmarks/load_test.py --sessions 8 --duration 30
+    python benchmarks/load_test.py --mix search=1 --sessions 16 --json out.json
+
+The lists come from corpus.py (--list-size items each). Server settings such
+as CPU_WORKERS and CPU_QUEUE_LIMIT are passed on from the environment.
+"""
+import os
+import sys
+import json
+import time
+import gzip
+import uuid
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, ROOT)
+import corpus
+
+DEFAULT_MIX = 'search=6,upload=2,generate=2'
+# Seconds to wait for a request; a bit more than the server's CPU_JOB_TIMEOUT
+REQUEST_TIMEOUT = 40
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(port):
+    """Start app.py on port in a subprocess and return it once it answers."""
+    code = ('import sys; sys.path.insert(0, sys.argv[1]); import app; '
+            'from werkzeug.serving import run_simple; '
+            'run_simple("127.0.0.1", int(sys.argv[2]), app.app, threaded=True)')
+    # The request log goes to a file; a pipe nobody reads would fill up and block the server
+    log = tempfile.TemporaryFile()
+    server = subprocess.Popen([sys.executable, '-c', code, ROOT, str(port)],
+                              stdout=subprocess.DEVNULL, stderr=log)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if server.poll() is not None:
+            log.seek(0)
+            raise RuntimeError('Server exited: ' + log.read().decode('utf-8', 'replace')[-2000:])
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('Server did not start within 30 seconds')
+
+def peak_rss(pid):
+    """Peak resident memory of pid in bytes (Linux /proc), or None."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def encode_multipart(fields, files):
+    """Return (body, content type) for form fields and (field, filename, bytes) files."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+    for field, filename, data in files:
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                     'Content-Type: application/octet-stream\r\n\r\n'.encode('utf-8') + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+class Stats:
+    """Latencies and errors per route, shared by all sessions."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.busy = {}
+        self.errors = {}
+
+    def record(self, route, seconds, status):
+        with self.lock:
+            if status == 200:
+                self.latencies.setdefault(route, []).append(seconds)
+            elif status == 503:
+                self.busy[route] = self.busy.get(route, 0) + 1
+            else:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+class Session(threading.Thread):
+    """One simulated pharmacy."""
+
+    def __init__(self, number, base_url, lists, stats, mix, args, stop_at):
+        super().__init__(name=f'session-{number}', daemon=True)
+        self.number = number
+        self.base_url = base_url
+        self.lists = lists
+        self.stats = stats
+        self.mix = mix
+        self.args = args
+        self.stop_at = stop_at
+        self.rng = random.Random(args.seed + number)
+        self.session_id = f'load-{number}-{uuid.uuid4().hex[:8]}'
+        self.searches = 0
+        self.generated = 0
+
+    def request(self, route, body, content_type):
+        req = urllib.request.Request(self.base_url + route, data=body, method='POST',
+                                     headers={'Content-Type': content_type})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        except OSError:
+            status = 0
+        self.stats.record(route, time.perf_counter() - start, status)
+        return status
+
+    def upload_lists(self):
+        # Like the search page, which gzips lists before uploading them. Uploads
+        # share one directory, so each pharmacy gets its own file names
+        files = [('files', f'{self.number}_{name}', gzip.compress(data, 6)) for name, data in self.lists['search']]
+        body, content_type = encode_multipart({'session_id': self.session_id}, files)
+        self.searches = 0
+        return self.request('/upload-lists', body, content_type)
+
+    def search(self):
+        terms = self.rng.sample(self.lists['terms'], min(self.args.terms, len(self.lists['terms'])))
+        body = json.dumps({'search_terms': terms, 'session_id': self.session_id}).encode('utf-8')
+        self.searches += 1
+        return self.request('/search-medicines', body, 'application/json')
+
+    def upload(self):
+        name, data = self.rng.choice(self.lists['htm'])
+        body, content_type = encode_multipart({'decrease_value': '1', 'list_format': 'auto'}, [('file', name, data)])
+        return self.request('/upload', body, content_type)
+
+    def generate(self):
+        self.generated += 1
+        list_no = f'{self.number:03d}{self.generated:05d}'
+        fields = {'list_no': list_no, 'title': 'LOAD TEST PHARMA', 'compact': 'true'}
+        body, content_type = encode_multipart(fields, [('file', 'data.txt', self.lists['text'])])
+        return self.request('/generate-html', body, content_type)
+
+    def run(self):
+        actions = {'search': self.search, 'upload': self.upload, 'generate': self.generate}
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        self.upload_lists()
+        while time.perf_counter() < self.stop_at:
+            action = self.rng.choices(names, weights)[0]
+            if action == 'search' and self.searches >= self.args.reupload:
+                self.upload_lists()
+            actions[action]()
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ('search', 'upload', 'generate'):
+            raise SystemExit(f'Unknown mix entry {name!r}, use search, upload and generate')
+        mix[name] = float(weight or 1)
+    return mix
+
+def build_lists(size, seed):
+    """Return the files every session sends: search lists, HTM lists, a text list and order terms."""
+    items = corpus.make_items(size, seed)
+    default = corpus.default_htm(items, corpus.SHOPS[2]).encode('utf-8')
+    stock = corpus.stock_htm(corpus.make_items(size, seed + 1), corpus.SHOPS[0], seed).encode('utf-8')
+    new = corpus.new_htm(corpus.make_items(size, seed + 2), corpus.SHOPS[1], seed).encode('utf-8')
+    return {
+        'search': [('ssd_pharma.htm', default), ('ali_medicos.htm', stock),
+                   ('city_medical.txt', corpus.text_list(items, corpus.SHOPS[4]).encode('utf-8')),
+                   ('al_noor.pdf', corpus.pdf_list(items[:size // 4], corpus.SHOPS[3]))],
+        'htm': [('ssd_pharma.htm', default), ('ali_medicos.htm', stock), ('mehran_medicos.htm', new)],
+        'text': corpus.text_list(items).encode('utf-8'),
+        'terms': corpus.order_terms(items, 200, seed)
+    }
+
+def report(stats, elapsed, rss, sessions):
+    """Print the summary and return it as a dict."""
+    routes = {}
+    total = 0
+    print(f"\n{'route':<20} {'ok':>6} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'503':>5} {'err':>5}")
+    for route in sorted(set(stats.latencies) | set(stats.busy) | set(stats.errors)):
+        values = sorted(stats.latencies.get(route, []))
+        total += len(values)
+        routes[route] = {
+            'ok': len(values),
+            'per_second': len(values) / elapsed,
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'max_ms': (values[-1] if values else 0) * 1000,
+            'busy': stats.busy.get(route, 0),
+            'errors': stats.errors.get(route, 0)
+        }
+        r = routes[route]
+        print(f"{route:<20} {r['ok']:>6} {r['per_second']:>7.1f} {r['p50_ms']:>6.0f}ms {r['p95_ms']:>6.0f}ms "
+              f"{r['p99_ms']:>6.0f}ms {r['max_ms']:>6.0f}ms {r['busy']:>5} {r['errors']:>5}")
+    print(f"\n{sessions} sessions, {elapsed:.1f}s: {total} ok requests, {total / elapsed:.1f} req/s")
+    print(f"Server peak RSS: {rss / 1048576:.0f}MB" if rss else "Server peak RSS: unknown")
+    return {'sessions': sessions, 'seconds': elapsed, 'requests': total,
+            'per_second': total / elapsed, 'peak_rss_bytes': rss, 'routes': routes}
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the upload and search flow')
+    parser.add_argument('--sessions', type=int, default=4, help='concurrent clients (default 4)')
+    parser.add_argument('--duration', type=float, default=20, help='seconds to run (default 20)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'request weights (default {DEFAULT_MIX})')
+    parser.add_argument('--terms', type=int, default=10, help='search terms per search (default 10)')
+    parser.add_argument('--reupload', type=int, default=20, help='searches before a session uploads again (default 20)')
+    parser.add_argument('--list-size', type=int, default=1000, help='items per list (default 1000)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--url', help='test a running server instead of starting one')
+    parser.add_argument('--pid', type=int, help='process id of the --url server, for its peak RSS')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    print(f'Generating lists of {args.list_size} items...')
+    lists = build_lists(args.list_size, args.seed)
+
+    server = None
+    if args.url:
+        base_url, pid = args.url.rstrip('/'), args.pid
+    else:
+        port = free_port()
+        server = start_server(port)
+        base_url, pid = f'http://127.0.0.1:{port}', server.pid
+
+    try:
+        stats = Stats()
+        print(f'Running {args.sessions} sessions for {args.duration:.0f}s against {base_url}...')
+        start = time.perf_counter()
+        sessions = [Session(n, base_url, lists, stats, mix, args, start + args.duration)
+                    for n in range(args.sessions)]
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+        # Requests in flight at the deadline finish after it
+        elapsed = time.perf_counter() - start
+        rss = peak_rss(pid) if pid else None
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results = report(stats, elapsed, rss, args.sessions)
+    results['args'] = vars(args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
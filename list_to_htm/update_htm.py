@@ -1,4 +1,15 @@
+import os
 import re
+import sys
+import csv
+import json
+import time
+import hashlib
+import datetime
+import tempfile
+from collections import namedtuple
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 def parse_data_txt(filepath):
     """Parse data.txt and return list of (item_name, discount_or_bonus)"""
@@ -89,12 +100,26 @@ def parse_discount_value(value):
         except:
             return 0.0, value
 
-def generate_item_row(serial, item_name, value):
-    """Generate HTML for a single item row"""
-    display_name = '          ' + item_name.upper().ljust(28)
-    hidden_name = item_name.upper().ljust(50)
-    discount, bonus = parse_discount_value(value)
+# ============ ITEM RECORDS ============
+# Every generator needs the same facts about an item: the parsed discount and
+# bonus, whether the value is TP, NET or a number, and the strings to show.
+# build_item_records() works them out once per item and the generators below
+# only format them.
 
+ItemRecord = namedtuple('ItemRecord', [
+    'name', 'value', 'discount', 'bonus',
+    'kind',            # 'tp', 'net' or 'number'
+    'row_discount',    # discount column of the table row
+    'row_bonus',       # bonus column of the table row
+    'js_disc',         # ITMDISC text of Printf/myfun (also createRows for TP/NET)
+    'js_bonus',        # ITMBONUS text of Printf/myfun/createRows
+    'simple_disc',     # ITMDISC JS literal of mywht
+    'simple_bonus',    # ITMBONUS text of mywht
+    'pdf_disc',        # ITMDISC text of createRows
+])
+
+def _row_display_strings(value, discount, bonus):
+    """Discount and bonus column text of the table row for one item value."""
     # Check if '/' was used in original value (bonus separator)
     has_slash_separator = '/' in value
 
@@ -136,6 +161,55 @@ def generate_item_row(serial, item_name, value):
         discount_str = f'{discount:.2f}%'.rjust(9)
         bonus_str = ' ' * 44
 
+    return discount_str, bonus_str
+
+def build_item_record(item_name, value):
+    """Parse one (item_name, value) pair into an ItemRecord."""
+    discount, bonus = parse_discount_value(value)
+    has_slash = '/' in value
+    row_discount, row_bonus = _row_display_strings(value, discount, bonus)
+
+    if 'TP' in value.upper():
+        # Special handling for "TP" and similar non-numeric values
+        kind = 'tp'
+        if has_slash and '/' in bonus:
+            # TP with bonus separator like "TP,/5+5"
+            js_disc, js_bonus = bonus.split('/', 1)
+        else:
+            # Plain TP or TP with comma
+            js_disc, js_bonus = value, ""
+        simple_disc = f'"{js_disc}"'
+        simple_bonus = js_bonus
+        pdf_disc = js_disc
+    elif 'net' in value.lower():
+        # For NET values like "330 NET", keep the original value (mywht shows the number)
+        kind = 'net'
+        if has_slash:
+            js_disc, js_bonus = value.split('/')[0].strip(), bonus
+        else:
+            js_disc, js_bonus = value, ""
+        simple_disc = f'      {discount:8.2f}    '
+        simple_bonus = bonus
+        pdf_disc = js_disc
+    else:
+        kind = 'number'
+        js_disc, js_bonus = f'{discount:.2f}', bonus
+        simple_disc = f'      {discount:8.2f}    '
+        simple_bonus = bonus
+        pdf_disc = f'{discount:.2f}%'
+
+    return ItemRecord(item_name, value, discount, bonus, kind, row_discount, row_bonus,
+                      js_disc, js_bonus, simple_disc, simple_bonus, pdf_disc)
+
+def build_item_records(data_items):
+    """Turn (item_name, value) pairs into ItemRecords; records are passed through."""
+    return [item if isinstance(item, ItemRecord) else build_item_record(*item) for item in data_items]
+
+def render_item_row(serial, record):
+    """Generate HTML for a single item row from its record"""
+    display_name = '          ' + record.name.upper().ljust(28)
+    hidden_name = record.name.upper().ljust(50)
+
     return f'''<tr class="item"><td align="center">
  {str(serial).ljust(4)}
 </td><td style=" text-align: left;" >
@@ -143,191 +217,110 @@ def generate_item_row(serial, item_name, value):
 <input type="hidden" id="itnameid{serial}" value='{hidden_name}'>
 </td><td align="center">
 <input type="number" min="0" max="1000" class="qty" placeholder="Qty" id="nameid{serial}">
-</td><td align="center">{discount_str}
+</td><td align="center">{record.row_discount}
 </td><td colspan="3" align="center">
-{bonus_str}
+{record.row_bonus}
 </td></tr>
 '''
 
+def generate_item_row(serial, item_name, value):
+    """Generate HTML for a single item row"""
+    return render_item_row(serial, build_item_record(item_name, value))
+
 def generate_section_header(letter):
     return f'<tr><td colspan="7" align="center" style=" background: rgb(12,146,252); background: radial-gradient(circle, rgba(12,146,252,1) 50%, rgba(255,255,255,1) 100%); color:white;" ><b>{letter}</b></td></tr>'
 
-def generate_js_vars_full(data_items):
-    """Generate JS variables for Printf and myfun (with ITMBONUS and ITMDISC)"""
-    js_vars = ""
-    for i, (item_name, value) in enumerate(data_items, 1):
-        discount, bonus = parse_discount_value(value)
-        has_slash = '/' in value
+def iter_table_body(names, rows):
+    """Yield the table body: a letter header before each new first letter, the rendered rows and the total row"""
+    current_letter = ""
+    count = 0
+    for name, row in zip(names, rows):
+        first_letter = name[0].upper() if name else "?"
+        if first_letter != current_letter:
+            current_letter = first_letter
+            yield generate_section_header(current_letter)
+        yield row
+        count += 1
 
-        # Special handling for "TP" and similar non-numeric values
-        if 'TP' in value.upper():
-            if has_slash and '/' in bonus:
-                # TP with bonus separator like "TP,/5+5"
-                tp_part, bonus_after = bonus.split('/', 1)
-                discount_str = f'"{tp_part}"'
-                bonus_str = f'"{bonus_after}"' if bonus_after else '""'
-            else:
-                # Plain TP or TP with comma
-                discount_str = f'"{value}"'
-                bonus_str = '""'
-            js_vars += f'''
-var ITMCODE{i} = "{i}";
-var ITMNAME{i} =document.getElementById("itnameid{i}").value;
-var ITMBONUS{i} = {bonus_str};
-var ITMDISC{i} = {discount_str};
-var namevar{i}=document.getElementById("nameid{i}").value;
-'''
-        elif 'net' in value.lower():
-            # For NET values like "330 NET", keep the original value
-            if has_slash:
-                main_part = value.split('/')[0].strip()
-                discount_str = f'"{main_part}"'
-                bonus_str = f'"{bonus}"' if bonus else '""'
-            else:
-                discount_str = f'"{value}"'
-                bonus_str = '""'
-            js_vars += f'''
-var ITMCODE{i} = "{i}";
-var ITMNAME{i} =document.getElementById("itnameid{i}").value;
-var ITMBONUS{i} = {bonus_str};
-var ITMDISC{i} = {discount_str};
-var namevar{i}=document.getElementById("nameid{i}").value;
+    yield f'''<tr class="heading2"> <td style=" text-align: CENTER; border-radius: 0px 0px 16px 16px; padding-left: 10px;" colspan="5" >Total Products :
+  {count}
+</td></tr>
 '''
-        else:
-            # For numeric values
-            bonus_str = f'"{bonus}"' if bonus else '""'
-            js_vars += f'''
+
+def iter_items_html(data_items):
+    """Yield the table body rows: letter headers, item rows and the total row"""
+    records = build_item_records(data_items)
+    rows = (render_item_row(i, record) for i, record in enumerate(records, 1))
+    return iter_table_body([record.name for record in records], rows)
+
+def render_js_vars_full(i, record):
+    """JS variables of one item for Printf and myfun"""
+    return f'''
 var ITMCODE{i} = "{i}";
 var ITMNAME{i} =document.getElementById("itnameid{i}").value;
-var ITMBONUS{i} = {bonus_str};
-var ITMDISC{i} = "{discount:.2f}";
+var ITMBONUS{i} = "{record.js_bonus}";
+var ITMDISC{i} = "{record.js_disc}";
 var namevar{i}=document.getElementById("nameid{i}").value;
 '''
-    return js_vars
 
-def generate_js_vars_createrows(data_items):
-    """Generate JS variables for createRows function (PDF generation)"""
-    js_vars = ""
-    for i, (item_name, value) in enumerate(data_items, 1):
-        discount, bonus = parse_discount_value(value)
-        has_slash = '/' in value
+def iter_js_vars_full(data_items):
+    """Yield JS variables for Printf and myfun (with ITMBONUS and ITMDISC)"""
+    for i, record in enumerate(build_item_records(data_items), 1):
+        yield render_js_vars_full(i, record)
 
-        # Special handling for "TP" and similar non-numeric values
-        if 'TP' in value.upper():
-            if has_slash and '/' in bonus:
-                # TP with bonus separator like "TP,/5+5"
-                tp_part, bonus_after = bonus.split('/', 1)
-                discount_str = f'"{tp_part}"'
-                bonus_str = f'"{bonus_after}"' if bonus_after else '""'
-            else:
-                discount_str = f'"{value}"'
-                bonus_str = '""'
-            js_vars += f'''var ITMCODE{i} = "{i}";
-var ITMNAME{i} =document.getElementById("itnameid{i}").value;
-var ITMBONUS{i} = {bonus_str};
-var ITMDISC{i} = {discount_str};
-var namevar{i}=document.getElementById("nameid{i}").value;
-
-var namevarr{i} = " ";
-// Don't append % to non-numeric values like TP
-'''
-        elif 'net' in value.lower():
-            # For NET values like "330 NET"
-            if has_slash:
-                main_part = value.split('/')[0].strip()
-                discount_str = f'"{main_part}"'
-                bonus_str = f'"{bonus}"' if bonus else '""'
-            else:
-                discount_str = f'"{value}"'
-                bonus_str = '""'
-            js_vars += f'''var ITMCODE{i} = "{i}";
-var ITMNAME{i} =document.getElementById("itnameid{i}").value;
-var ITMBONUS{i} = {bonus_str};
-var ITMDISC{i} = {discount_str};
-var namevar{i}=document.getElementById("nameid{i}").value;
+def generate_js_vars_full(data_items):
+    """Generate JS variables for Printf and myfun (with ITMBONUS and ITMDISC)"""
+    return ''.join(iter_js_vars_full(data_items))
 
-var namevarr{i} = " ";
-// Don't append % to NET values
-'''
-        else:
-            # For numeric values
-            bonus_str = f'"{bonus}"' if bonus else '""'
-            js_vars += f'''var ITMCODE{i} = "{i}";
+def render_js_vars_createrows(i, record):
+    """JS variables of one item for createRows"""
+    js_vars = f'''var ITMCODE{i} = "{i}";
 var ITMNAME{i} =document.getElementById("itnameid{i}").value;
-var ITMBONUS{i} = {bonus_str};
-var ITMDISC{i} = "{discount:.2f}%";
+var ITMBONUS{i} = "{record.js_bonus}";
+var ITMDISC{i} = "{record.pdf_disc}";
 var namevar{i}=document.getElementById("nameid{i}").value;
 
 var namevarr{i} = " ";
 '''
+    if record.kind == 'tp':
+        js_vars += "// Don't append % to non-numeric values like TP\n"
+    elif record.kind == 'net':
+        js_vars += "// Don't append % to NET values\n"
     return js_vars
 
-def generate_js_vars_simple(data_items):
-    """Generate JS variables for mywht (including ITMCODE, ITMNAME, ITMBONUS, ITMDISC, namevar)"""
-    js_vars = ""
-    for i, (item_name, value) in enumerate(data_items, 1):
-        discount, bonus = parse_discount_value(value)
-        has_slash = '/' in value
+def iter_js_vars_createrows(data_items):
+    """Yield JS variables for createRows function (PDF generation)"""
+    for i, record in enumerate(build_item_records(data_items), 1):
+        yield render_js_vars_createrows(i, record)
 
-        # Special handling for "TP" and similar non-numeric values
-        if 'TP' in value.upper():
-            if has_slash and '/' in bonus:
-                # TP with bonus separator like "TP,/5+5"
-                tp_part, bonus_after = bonus.split('/', 1)
-                discount_str = f'"{tp_part}"'
-                bonus_str = f'"{bonus_after}"' if bonus_after else '""'
-            else:
-                discount_str = f'"{value}"'
-                bonus_str = '""'
-            js_vars += f'''
-var ITMCODE{i} = "{i}";
-var ITMNAME{i} =document.getElementById("itnameid{i}").value;
-var ITMBONUS{i} = {bonus_str};
-var ITMDISC{i} = {discount_str};
-var namevar{i}=document.getElementById("nameid{i}").value;
-'''
-        else:
-            # For numeric values
-            bonus_str = f'"{bonus}"' if bonus else '""'
-            js_vars += f'''
+def generate_js_vars_createrows(data_items):
+    """Generate JS variables for createRows function (PDF generation)"""
+    return ''.join(iter_js_vars_createrows(data_items))
+
+def render_js_vars_simple(i, record):
+    """JS variables of one item for mywht"""
+    return f'''
 var ITMCODE{i} = "{i}";
 var ITMNAME{i} =document.getElementById("itnameid{i}").value;
-var ITMBONUS{i} = {bonus_str};
-var ITMDISC{i} =       {discount:8.2f}    ;
+var ITMBONUS{i} = "{record.simple_bonus}";
+var ITMDISC{i} = {record.simple_disc};
 var namevar{i}=document.getElementById("nameid{i}").value;
 '''
-    return js_vars
 
-def generate_js_if_blocks(data_items, window_var='mywindow'):
-    """Generate JS if blocks for Printf and myfun"""
-    js_blocks = ""
-    for i in range(1, len(data_items) + 1):
-        item_value = data_items[i-1][1]  # Get the original value
-        is_special = 'TP' in item_value.upper() or 'net' in item_value.lower()
+def iter_js_vars_simple(data_items):
+    """Yield JS variables for mywht (including ITMCODE, ITMNAME, ITMBONUS, ITMDISC, namevar)"""
+    for i, record in enumerate(build_item_records(data_items), 1):
+        yield render_js_vars_simple(i, record)
 
-        if is_special:
-            # For TP and NET values, don't append %
-            js_blocks += f'''if(namevar{i}==0 ){{
-}}
-else {{
+def generate_js_vars_simple(data_items):
+    """Generate JS variables for mywht (including ITMCODE, ITMNAME, ITMBONUS, ITMDISC, namevar)"""
+    return ''.join(iter_js_vars_simple(data_items))
 
-var serial = (serial+1);
- {window_var}.document.write('<tr class="item"><td align="center">');
- {window_var}.document.write(ITMCODE{i});
- {window_var}.document.write('</td><td style="text-align:left;">');
- {window_var}.document.write(ITMNAME{i});
- {window_var}.document.write('</td><td align="right">');
- {window_var}.document.write(namevar{i});
- {window_var}.document.write('</td><td align="right">');
- {window_var}.document.write(ITMDISC{i});
- {window_var}.document.write('</td><td align="center">');
- {window_var}.document.write(ITMBONUS{i});
- {window_var}.document.write('</td></tr>');
-}}
-'''
-        else:
-            # For regular percentage values, append %
-            js_blocks += f'''if(namevar{i}==0 ){{
+def render_js_if_block(i, record, window_var='mywindow'):
+    """JS if block of one item for Printf and myfun"""
+    # For TP and NET values, don't append %
+    disc_suffix = '' if record.kind != 'number' else ' %'
+    return f'''if(namevar{i}==0 ){{
 }}
 else {{
 
@@ -340,18 +333,24 @@ var serial = (serial+1);
  {window_var}.document.write(namevar{i});
  {window_var}.document.write('</td><td align="right">');
  {window_var}.document.write(ITMDISC{i});
- {window_var}.document.write(' %</td><td align="center">');
+ {window_var}.document.write('{disc_suffix}</td><td align="center">');
  {window_var}.document.write(ITMBONUS{i});
  {window_var}.document.write('</td></tr>');
 }}
 '''
-    return js_blocks
 
-def generate_js_if_blocks_pdf(data_items):
-    """Generate JS if blocks for myfun PDF (rows.push)"""
-    js_blocks = ""
-    for i in range(1, len(data_items) + 1):
-        js_blocks += f'''if(namevar{i}==0 ){{
+def iter_js_if_blocks(data_items, window_var='mywindow'):
+    """Yield JS if blocks for Printf and myfun"""
+    for i, record in enumerate(build_item_records(data_items), 1):
+        yield render_js_if_block(i, record, window_var)
+
+def generate_js_if_blocks(data_items, window_var='mywindow'):
+    """Generate JS if blocks for Printf and myfun"""
+    return ''.join(iter_js_if_blocks(data_items, window_var))
+
+def render_js_if_block_pdf(i):
+    """JS if block of one item for createRows"""
+    return f'''if(namevar{i}==0 ){{
 }}
 else {{
 
@@ -359,119 +358,721 @@ var serial = (serial+1);
 rows.push([ITMCODE{i}, ITMNAME{i}, namevar{i}, ITMDISC{i}]);
 }}
 '''
-    return js_blocks
-
-def generate_js_if_blocks_whatsapp(data_items):
-    """Generate JS if blocks for mywht (WhatsApp)"""
-    js_blocks = ""
 
+def iter_js_if_blocks_pdf(data_items):
+    """Yield JS if blocks for myfun PDF (rows.push)"""
     for i in range(1, len(data_items) + 1):
-        # Check if this is a special case like "TP" that shouldn't get % appended
-        item_value = data_items[i-1][1]  # Get the original value
-        is_special_value = item_value.upper() == 'TP' or 'TP' in item_value.upper()
-
-        if i <= 3:  # Add header check to first few items to ensure it gets added
-            # For the first few items, add header if it hasn't been added yet
-            if is_special_value:
-                # For special values like TP, don't add % to discText
-                js_blocks += f'''if(namevar{i}==0 ){{
+        yield render_js_if_block_pdf(i)
+
+def generate_js_if_blocks_pdf(data_items):
+    """Generate JS if blocks for myfun PDF (rows.push)"""
+    return ''.join(iter_js_if_blocks_pdf(data_items))
+
+WHATSAPP_HEADER = "*Name* :%0a*List no* :000085(1)%0a--------------------%0a|%20*Code*%20|%20*QTY*%20|%20*ITM*%20|%20*DISC*%20|%20*Bonus*%20|%0a--------------------%0a"
+
+def render_js_if_block_whatsapp(i, record, is_last):
+    """JS if block of one item for mywht"""
+    js_block = f'''if(namevar{i}==0 ){{
 }}
 else {{
-// Add header once at the beginning if it hasn't been added yet
+'''
+    if i <= 3:
+        # Add header check to first few items to ensure it gets added
+        js_block += f'''// Add header once at the beginning if it hasn't been added yet
 if(text == "") {{
- text = "*Name* :%0a*List no* :000085(1)%0a--------------------%0a|%20*Code*%20|%20*QTY*%20|%20*ITM*%20|%20*DISC*%20|%20*Bonus*%20|%0a--------------------%0a";
+ text = "{WHATSAPP_HEADER}";
 }}
-var serial = (serial+1);
+'''
+    js_block += '''var serial = (serial+1);
 
- // For special values like TP, don't append %
+'''
+    if record.kind == 'tp':
+        # For special values like TP, don't add % to discText
+        js_block += f''' // For special values like TP, don't append %
  var discText = ITMDISC{i};
  // Show bonus in bonus column if discount is 0, otherwise show empty
  var bonusText = ITMBONUS{i};
- var text=text+"|"+ITMCODE{i}+"%20|%20"+namevar{i}+"%20|%20"+ITMNAME{i}+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
-}}
 '''
-            else:
-                # For numeric values, use original logic
-                js_blocks += f'''if(namevar{i}==0 ){{
-}}
-else {{
-// Add header once at the beginning if it hasn't been added yet
-if(text == "") {{
- text = "*Name* :%0a*List no* :000085(1)%0a--------------------%0a|%20*Code*%20|%20*QTY*%20|%20*ITM*%20|%20*DISC*%20|%20*Bonus*%20|%0a--------------------%0a";
-}}
-var serial = (serial+1);
-
- // Show discount with % if non-zero, otherwise show empty in discount column
+    else:
+        # For numeric values, use original logic
+        js_block += f''' // Show discount with % if non-zero, otherwise show empty in discount column
  var discText = ITMDISC{i} != 0 ? ITMDISC{i} + "%" : "";
  // Show bonus in bonus column if discount is 0, otherwise show empty
  var bonusText = ITMDISC{i} == 0 ? ITMBONUS{i} : "";
- var text=text+"|"+ITMCODE{i}+"%20|%20"+namevar{i}+"%20|%20"+ITMNAME{i}+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+'''
+    # The last item also adds the total (unless it is one of the first three)
+    total = '+"%0a*Total* *Items* : "+serial' if i > 3 and is_last else ''
+    js_block += f''' var text=text+"|"+ITMCODE{i}+"%20|%20"+namevar{i}+"%20|%20"+ITMNAME{i}+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a"{total};
 }}
 '''
-        elif i == len(data_items):
-            # For the last item, add the item and total
-            if is_special_value:
-                # For special values like TP, don't add % to discText
-                js_blocks += f'''if(namevar{i}==0 ){{
+    return js_block
+
+def iter_js_if_blocks_whatsapp(data_items):
+    """Yield JS if blocks for mywht (WhatsApp)"""
+    records = build_item_records(data_items)
+    for i, record in enumerate(records, 1):
+        yield render_js_if_block_whatsapp(i, record, i == len(records))
+
+def generate_js_if_blocks_whatsapp(data_items):
+    """Generate JS if blocks for mywht (WhatsApp)"""
+    return ''.join(iter_js_if_blocks_whatsapp(data_items))
+
+# ============ COMPACT OUTPUT MODE ============
+# The generators above emit variables and an if block per item for every one of
+# Printf, myfun, mywht and createRows. Compact mode ships the item values once
+# as a JSON array (LIST_ITEMS) and fills those functions with loops over it.
+# Quantities and names are still read from the row inputs, so the generated
+# order, print, WhatsApp and PDF output is the same.
+
+# Positions inside a LIST_ITEMS entry
+#   0 ITMDISC / 1 ITMBONUS of Printf and myfun, 2 ITMDISC / 3 ITMBONUS of mywht,
+#   4 ITMDISC of createRows, 5 = 1 for TP/NET values (no " %" when printing),
+#   6 = 1 for TP values (shown as is in the WhatsApp text)
+
+def compact_item_values(record):
+    """Return the LIST_ITEMS entry for one ItemRecord."""
+    if record.kind == 'tp':
+        simple_disc = record.js_disc
+    else:
+        # mywht uses a number here, NET values included
+        simple_disc = float(f'{record.discount:.2f}')
+    return [record.js_disc, record.js_bonus, simple_disc, record.simple_bonus, record.pdf_disc,
+            int(record.kind != 'number'), int(record.kind == 'tp')]
+
+def generate_compact_items_script(data_items):
+    """Generate the <script> defining LIST_ITEMS, placed at the end of the table body."""
+    return render_compact_items_script([compact_item_values(record) for record in build_item_records(data_items)])
+
+def _script_json(value):
+    # "</" would end the script element early
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+def render_compact_items_script(items):
+    """Generate the LIST_ITEMS <script> from compact_item_values() entries."""
+    return f'<script>\nvar LIST_ITEMS = {_script_json(items)};\n</script>\n'
+
+def _compact_item_lookups(virtual):
+    """JS expressions for the quantity and name of item i in the compact loops."""
+    if virtual:
+        # Virtual lists only have the visible rows, see virtual_list.js
+        return 'listItemQty(i)', 'listItemName(i)'
+    return 'document.getElementById("nameid" + i).value', 'document.getElementById("itnameid" + i).value'
+
+def generate_compact_if_blocks(window_var='mywindow', virtual=False):
+    """Generate the Printf/myfun loop that writes the ordered items."""
+    qty, name = _compact_item_lookups(virtual)
+    return f'''for (var i = 1; i <= LIST_ITEMS.length; i++) {{
+var namevar = {qty};
+if(namevar==0 ){{
+continue;
 }}
-else {{
+var item = LIST_ITEMS[i - 1];
 var serial = (serial+1);
-
- // For special values like TP, don't append %
- var discText = ITMDISC{i};
- // Show bonus in bonus column if discount is 0, otherwise show empty
- var bonusText = ITMBONUS{i};
- var text=text+"|"+ITMCODE{i}+"%20|%20"+namevar{i}+"%20|%20"+ITMNAME{i}+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a"+"%0a*Total* *Items* : "+serial;
+ {window_var}.document.write('<tr class="item"><td align="center">');
+ {window_var}.document.write(String(i));
+ {window_var}.document.write('</td><td style="text-align:left;">');
+ {window_var}.document.write({name});
+ {window_var}.document.write('</td><td align="right">');
+ {window_var}.document.write(namevar);
+ {window_var}.document.write('</td><td align="right">');
+ {window_var}.document.write(item[0]);
+ // TP and NET values don't get a % sign
+ {window_var}.document.write(item[5] ? '</td><td align="center">' : ' %</td><td align="center">');
+ {window_var}.document.write(item[1]);
+ {window_var}.document.write('</td></tr>');
 }}
 '''
-            else:
-                # For numeric values, use original logic
-                js_blocks += f'''if(namevar{i}==0 ){{
-}}
-else {{
-var serial = (serial+1);
 
- // Show discount with % if non-zero, otherwise show empty in discount column
- var discText = ITMDISC{i} != 0 ? ITMDISC{i} + "%" : "";
- // Show bonus in bonus column if discount is 0, otherwise show empty
- var bonusText = ITMDISC{i} == 0 ? ITMBONUS{i} : "";
- var text=text+"|"+ITMCODE{i}+"%20|%20"+namevar{i}+"%20|%20"+ITMNAME{i}+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a"+"%0a*Total* *Items* : "+serial;
+def generate_compact_if_blocks_whatsapp(virtual=False):
+    """Generate the mywht loop that builds the WhatsApp order text."""
+    qty, name = _compact_item_lookups(virtual)
+    return f'''for (var i = 1; i <= LIST_ITEMS.length; i++) {{
+var namevar = {qty};
+if(namevar==0 ){{
+continue;
 }}
-'''
-        else:
-            # For other items, just add the item
-            if is_special_value:
-                # For special values like TP, don't add % to discText
-                js_blocks += f'''if(namevar{i}==0 ){{
+var item = LIST_ITEMS[i - 1];
+// The header is only added by the first three items, as in the full output
+if(i <= 3 && text == "") {{
+ text = "{WHATSAPP_HEADER}";
 }}
-else {{
 var serial = (serial+1);
 
- // For special values like TP, don't append %
- var discText = ITMDISC{i};
- // Show bonus in bonus column if discount is 0, otherwise show empty
- var bonusText = ITMBONUS{i};
- var text=text+"|"+ITMCODE{i}+"%20|%20"+namevar{i}+"%20|%20"+ITMNAME{i}+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+ var ITMDISC = item[2];
+ // TP values are shown as is; numbers get % if non-zero and the bonus only when there is no discount
+ var discText = item[6] ? ITMDISC : (ITMDISC != 0 ? ITMDISC + "%" : "");
+ var bonusText = item[6] ? item[3] : (ITMDISC == 0 ? item[3] : "");
+ var text=text+"|"+i+"%20|%20"+namevar+"%20|%20"+{name}+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+if(i > 3 && i == LIST_ITEMS.length) {{
+ text=text+"%0a*Total* *Items* : "+serial;
+}}
 }}
 '''
-            else:
-                # For numeric values, use original logic
-                js_blocks += f'''if(namevar{i}==0 ){{
+
+def generate_compact_if_blocks_pdf(virtual=False):
+    """Generate the createRows loop that collects the PDF rows."""
+    qty, name = _compact_item_lookups(virtual)
+    return f'''for (var i = 1; i <= LIST_ITEMS.length; i++) {{
+var namevar = {qty};
+if(namevar==0 ){{
+continue;
 }}
-else {{
 var serial = (serial+1);
-
- // Show discount with % if non-zero, otherwise show empty in discount column
- var discText = ITMDISC{i} != 0 ? ITMDISC{i} + "%" : "";
- // Show bonus in bonus column if discount is 0, otherwise show empty
- var bonusText = ITMDISC{i} == 0 ? ITMBONUS{i} : "";
- var text=text+"|"+ITMCODE{i}+"%20|%20"+namevar{i}+"%20|%20"+ITMNAME{i}+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+rows.push([String(i), {name}, namevar, LIST_ITEMS[i - 1][4]]);
 }}
 '''
-    return js_blocks
 
-def update_htm(htm_filepath, data_items, output_filepath):
-    """Update list.HTM with all items from data.txt"""
+def compact_js_parts(virtual=False):
+    """Return the JS slots of the list template in compact mode, the same for every list."""
+    return {
+        'js_vars_full': '',
+        'js_vars_simple': '',
+        'js_vars_createrows': '',
+        'js_if_blocks_printf': generate_compact_if_blocks('mywindow', virtual),
+        'js_if_blocks_myfun': generate_compact_if_blocks('myWindow', virtual),
+        'js_if_whatsapp': generate_compact_if_blocks_whatsapp(virtual),
+        'js_if_blocks_pdf': generate_compact_if_blocks_pdf(virtual)
+    }
+
+# ============ VIRTUAL ROWS ============
+# For very large lists (10k items) even the compact output has a table row per
+# item, and the template's search filter reads the text of every row on every
+# key press. Virtual mode emits no item rows: LIST_ROWS holds what each row
+# shows and LIST_INDEX its lowercase search text, and virtual_list.js draws
+# only the rows near the screen, filters against the index and adds a letter
+# bar to jump between sections. The Printf/myfun/mywht/createRows loops are
+# the compact ones, reading quantities from the script instead of the inputs.
+
+VIRTUAL_LIST_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'virtual_list.js')
+
+_virtual_list_script = None
+
+def load_virtual_list_script():
+    """Return the source of virtual_list.js, read once."""
+    global _virtual_list_script
+    if _virtual_list_script is None:
+        with open(VIRTUAL_LIST_SCRIPT_PATH, 'r', encoding='utf-8') as f:
+            _virtual_list_script = f.read()
+    return _virtual_list_script
+
+def virtual_item_values(record):
+    """Return the LIST_ROWS entry for one ItemRecord: name, offer and bonus column text."""
+    return [record.name.upper(), record.row_discount.strip(), record.row_bonus.strip()]
+
+def virtual_search_text(serial, record):
+    """Return the LIST_INDEX entry for one ItemRecord, the row text the search box matches."""
+    return f'{serial} {record.name} {record.row_discount.strip()} {record.row_bonus.strip()}'.lower()
+
+def generate_virtual_items_script(data_items, inline_runtime=True):
+    """Generate the table body of a virtual list: a placeholder row and the row data scripts.
+
+    With inline_runtime=False virtual_list.js is left out; lists using shared
+    assets load it from its own file (see compile_shared_list_template).
+    """
+    records = build_item_records(data_items)
+    rows = [virtual_item_values(record) for record in records]
+    index = [virtual_search_text(i, record) for i, record in enumerate(records, 1)]
+    return (
+        f'<tr class="item"><td colspan="5" align="center">Loading {len(records)} products...</td></tr>\n'
+        + render_compact_items_script([compact_item_values(record) for record in records])
+        + f'<script>\nvar LIST_ROWS = {_script_json(rows)};\nvar LIST_INDEX = {_script_json(index)};\n</script>\n'
+        + (f'<script>\n{load_virtual_list_script()}</script>\n' if inline_runtime else '')
+    )
+
+_virtual_rows_re = re.compile(r'var LIST_ROWS = (\[.*?\]);\n', re.DOTALL)
+
+def parse_virtual_rows(html_content):
+    """Return the LIST_ROWS entries of a virtual list, or None for other lists.
+
+    A virtual list has no item rows in its HTML, only this data; each entry is
+    what the row would show: [name, offer, bonus], as in td[1], td[3] and td[4]
+    of a full list's rows.
+    """
+    match = _virtual_rows_re.search(html_content)
+    if match is None:
+        return None
+    try:
+        rows = json.loads(match.group(1))
+    except ValueError:
+        return None
+    return [row for row in rows if isinstance(row, list) and len(row) == 3]
+
+# ============ INCREMENTAL REGENERATION ============
+# Daily updates change a few prices in a list of a thousand or more items.
+# build_item_chunks() keeps every item's rendered row and JS code, and a
+# later call given that state only parses and renders the items whose
+# (name, value) or serial changed. Joining the chunks is then all that is
+# left to do for the rest of the list.
+
+# What is rendered per item, in full and compact mode
+FULL_CHUNK_FIELDS = (
+    'row', 'js_vars_full', 'js_vars_simple', 'js_vars_createrows',
+    'js_if_blocks_printf', 'js_if_blocks_myfun', 'js_if_whatsapp', 'js_if_blocks_pdf'
+)
+COMPACT_CHUNK_FIELDS = ('row', 'compact')
+
+def render_item_chunks(i, record, is_last, compact=False):
+    """Render everything one item contributes to the list, in *_CHUNK_FIELDS order."""
+    row = render_item_row(i, record)
+    if compact:
+        return (row, compact_item_values(record))
+    return (
+        row,
+        render_js_vars_full(i, record),
+        render_js_vars_simple(i, record),
+        render_js_vars_createrows(i, record),
+        render_js_if_block(i, record, 'mywindow'),
+        render_js_if_block(i, record, 'myWindow'),
+        render_js_if_block_whatsapp(i, record, is_last),
+        render_js_if_block_pdf(i),
+    )
+
+def build_item_chunks(data_items, previous=None, compact=False):
+    """Render the chunks of every item, reusing the ones in previous that are still valid.
+
+    data_items must already be in list order. An item is reused when previous
+    had the same (name, value) at the same serial, and it was (or wasn't) the
+    last item there too, since the WhatsApp text ends with the last item.
+    Inserting or removing an item renumbers the items after it, so those are
+    rendered again.
+
+    Returns the state for the next call: {'compact', 'items', 'chunks', 'rebuilt'}.
+    """
+    items = [(item[0], item[1]) for item in data_items]
+
+    if previous and previous['compact'] == compact:
+        old_items = previous['items']
+        old_chunks = previous['chunks']
+    else:
+        old_items = old_chunks = []
+
+    count = len(items)
+    old_last = len(old_items) - 1
+    chunks = []
+    rebuilt = 0
+    for index, item in enumerate(items):
+        if index < len(old_items) and old_items[index] == item and (index == old_last) == (index == count - 1):
+            chunks.append(old_chunks[index])
+        else:
+            chunks.append(render_item_chunks(index + 1, build_item_record(*item), index == count - 1, compact))
+            rebuilt += 1
+
+    return {'compact': compact, 'items': items, 'chunks': chunks, 'rebuilt': rebuilt}
+
+def iter_chunk_field(state, field):
+    """Yield one field of every item's chunks."""
+    fields = COMPACT_CHUNK_FIELDS if state['compact'] else FULL_CHUNK_FIELDS
+    index = fields.index(field)
+    for item_chunks in state['chunks']:
+        yield item_chunks[index]
+
+def item_chunk_parts(state):
+    """Return the item slots of the list template (see iter_list_template) filled from state."""
+    names = [name for name, value in state['items']]
+    if state['compact']:
+        def iter_items_html_compact():
+            yield from iter_table_body(names, iter_chunk_field(state, 'row'))
+            yield render_compact_items_script(list(iter_chunk_field(state, 'compact')))
+        parts = compact_js_parts()
+        parts['items_html'] = iter_items_html_compact
+        return parts
+
+    parts = {'items_html': lambda: iter_table_body(names, iter_chunk_field(state, 'row'))}
+    for field in FULL_CHUNK_FIELDS[1:]:
+        parts[field] = partial(iter_chunk_field, state, field)
+    return parts
+
+def save_item_chunks(state, path):
+    """Store a build_item_chunks() state as JSON next to the generated list."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+
+def load_item_chunks(path):
+    """Load a state stored by save_item_chunks(), or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring {path}: {e}")
+        return None
+    # JSON turns tuples into lists
+    state['items'] = [tuple(item) for item in state['items']]
+    state['chunks'] = [tuple(item_chunks) for item_chunks in state['chunks']]
+    return state
+
+# ============ PRECOMPILED LIST TEMPLATE ============
+# list.HTM is large, so instead of running the regex edits below on every
+# generation, they are run once with placeholder markers in place of the real
+# values. The result is split into literal segments and named slots, and a
+# generation is then a single join of segments and slot values.
+
+TEMPLATE_SLOTS = (
+    'title', 'whatsapp_number', 'list_no', 'list_date', 'total_count', 'items_html',
+    'js_vars_full', 'js_vars_simple', 'js_vars_createrows',
+    'js_if_blocks_printf', 'js_if_blocks_myfun', 'js_if_whatsapp', 'js_if_blocks_pdf'
+)
+
+# Extra slots of templates compiled for shared assets (see compile_shared_list_template)
+SHARED_SLOTS = ('asset_base', 'list_meta')
+
+_slot_marker_re = re.compile('\x00(' + '|'.join(TEMPLATE_SLOTS + SHARED_SLOTS) + ')\x00')
+
+# {template_path: (mtime, segments)}
+_compiled_templates = {}
+
+def splice_list_template(content, parts):
+    """Apply the offer list edits to list.HTM content.
+
+    parts maps every name in TEMPLATE_SLOTS to the text to insert. Returns the
+    edited content, or None if the template has no tbody section.
+    """
+    title = parts['title']
+    whatsapp_number = parts['whatsapp_number']
+    list_no = parts['list_no']
+    list_date = parts['list_date']
+    total_count = parts['total_count']
+
+    # Replace title everywhere
+    content = content.replace('S.S.D PHARMA', title)
+
+    # Replace WhatsApp number everywhere
+    content = content.replace('923337068868', whatsapp_number)
+    content = content.replace('%2B923337068868', '%2B' + whatsapp_number)
+
+    # 1. Replace "Code" header with "Sr#"
+    content = re.sub(
+        r'(<td style="text-align: center; border-radius: 16px 0px 0px 0px;">)(Code|Sr#)(</td>)',
+        r'\1Sr#\3',
+        content
+    )
+
+    # 2. Update tbody
+    tbody_start = content.find('<tbody id="myTable">')
+    tbody_end = content.find('</tbody>')
+
+    if tbody_start == -1 or tbody_end == -1:
+        return None
+
+    content = content[:tbody_start + len('<tbody id="myTable">')] + parts['items_html'] + content[tbody_end:]
+
+    # 3. Update list number and date
+    content = re.sub(r'<b>List No : </b>\s*\d+', f'<b>List No : </b>\n{list_no}', content)
+    content = re.sub(r'<b>List Date </b> :\s*[\d/]+', f'<b>List Date </b> :\n{list_date}', content)
+
+    # Update global list number variable for PDF generator
+    content = re.sub(r'var LISTNO_GLOBAL = "[^"]*";', f'var LISTNO_GLOBAL = "{list_no}";', content)
+
+    # Update global WhatsApp number variable
+    content = re.sub(r'var WHATSAPP_GLOBAL = "[^"]*";', f'var WHATSAPP_GLOBAL = "{whatsapp_number}";', content)
+
+    # 4. Update hidden inputs for rows count
+    content = re.sub(r'id="rows" value="\d+"', f'id="rows" value="{total_count}"', content)
+
+    # 5. Update Printf function
+    content = re.sub(
+        r'(function Printf\(\)\{\nvar ITDATE = ")[^"]*(";\nvar LSTNO = ")[^"]*(")',
+        r'\g<1>' + list_date + r'\g<2>' + list_no + r'\g<3>',
+        content
+    )
+    content = re.sub(
+        r'(function Printf\(\)\{\nvar ITDATE = "[^"]*";\nvar LSTNO = "[^"]*";\nvar custname = document\.getElementById\("cstname"\)\.value;\nvar serial = 0;\n)'
+        r'.*?'
+        r'(\n\n\n var mywindow = window\.open)',
+        r'\1' + parts['js_vars_full'] + r'\2',
+        content,
+        flags=re.DOTALL
+    )
+
+    content = re.sub(
+        r"if\(namevar1==0 \)\{\n\}\nelse \{\n\nvar serial = \(serial\+1\);\n mywindow\.document\.write\('<tr class=\"item\">.*?"
+        r"( mywindow\.document\.write\('<tr class=\"heading2\"> <td)",
+        parts['js_if_blocks_printf'] + r'\1',
+        content,
+        flags=re.DOTALL,
+        count=1
+    )
+
+    # 6. Update mywht function
+    content = re.sub(
+        r'(function mywht\(\)\{\nvar ITDATE = ")[^"]*(";\nvar LSTNO = ")[^"]*(")',
+        r'\g<1>' + list_date + r'\g<2>' + list_no + r'\g<3>',
+        content
+    )
+    content = re.sub(
+        r'(function mywht\(\)\{.*?var serial = 0;\n)'
+        r'.*?'
+        r'(\nvar url="https://wa\.me)',
+        r'\1' + parts['js_vars_simple'] + '\n' + parts['js_if_whatsapp'] + r'\2',
+        content,
+        flags=re.DOTALL
+    )
+
+    # 7. Update myfun function
+    content = re.sub(
+        r'(function myfun\(\)\{\nvar ITDATE = ")[^"]*(";\nvar LSTNO = ")[^"]*(")',
+        r'\g<1>' + list_date + r'\g<2>' + list_no + r'\g<3>',
+        content
+    )
+    content = re.sub(
+        r'(function myfun\(\)\{\nvar ITDATE = "[^"]*";\nvar LSTNO = "[^"]*";\nvar custname = document\.getElementById\("cstname"\)\.value;\nvar serial = 0;\n)'
+        r'.*?'
+        r'(\nmyWindow=window\.open)',
+        r'\1' + parts['js_vars_full'] + r'\2',
+        content,
+        flags=re.DOTALL
+    )
+
+    content = re.sub(
+        r"if\(namevar1==0 \)\{\n\}\nelse \{\n\nvar serial = \(serial\+1\);\n myWindow\.document\.write\('<tr class=\"item\">.*?"
+        r"( myWindow\.document\.write\('<tr class=\"heading2\"> <td)",
+        parts['js_if_blocks_myfun'] + r'\1',
+        content,
+        flags=re.DOTALL,
+        count=1
+    )
+
+    # 8. Update createRows function (PDF generation)
+    content = re.sub(
+        r'(function createRows\(count\) \{\n  const rows = \[\];\n\n)'
+        r'.*?'
+        r'(var serial = 0;)',
+        r'\1' + parts['js_vars_createrows'] + r'\2',
+        content,
+        flags=re.DOTALL
+    )
+
+    content = re.sub(
+        r"if\(namevar1==0 \)\{\n\}\nelse \{\n\nvar serial = \(serial\+1\);\nrows\.push.*?"
+        r"(\nvar totitem=)",
+        parts['js_if_blocks_pdf'] + r'\1',
+        content,
+        flags=re.DOTALL,
+        count=1
+    )
+
+    # 9. Update simpleOrder function item count
+    content = re.sub(r'for \(let i = 1; i <= \d+; i\+\+\)', f'for (let i = 1; i <= {total_count}; i++)', content)
+
+    return content
+
+def compile_list_template(content):
+    """Split list.HTM content into literal segments and slot names.
+
+    Returns a list of (is_slot, text) pairs, or None if the template has no
+    tbody section.
+    """
+    markers = {name: f'\x00{name}\x00' for name in TEMPLATE_SLOTS}
+    spliced = splice_list_template(content, markers)
+    if spliced is None:
+        return None
+    return split_template_segments(spliced)
+
+def split_template_segments(text):
+    """Split text with \\x00name\\x00 slot markers into (is_slot, text) pairs."""
+    segments = []
+    # re.split alternates literal text and captured slot names
+    for i, piece in enumerate(_slot_marker_re.split(text)):
+        if i % 2:
+            segments.append((True, piece))
+        elif piece:
+            segments.append((False, piece))
+    return segments
+
+def load_list_template(template_path):
+    """Return the compiled segments of template_path, compiling it only when it changed."""
+    mtime = os.path.getmtime(template_path)
+    cached = _compiled_templates.get(template_path)
+    if cached is None or cached[0] != mtime:
+        with open(template_path, 'r', encoding='utf-8') as f:
+            segments = compile_list_template(f.read())
+        cached = (mtime, segments)
+        _compiled_templates[template_path] = cached
+    return cached[1]
+
+def iter_list_template(segments, parts):
+    """Yield the compiled template segments with the slot values in parts.
+
+    A slot value is either a string or a function returning an iterable of
+    chunks, e.g. functools.partial(iter_js_vars_full, records). Functions are
+    called each time their slot appears (js_vars_full is used twice), so the
+    generated code never has to be held in memory as one string.
+    """
+    for is_slot, text in segments:
+        if not is_slot:
+            yield text
+            continue
+        value = parts[text]
+        if isinstance(value, str):
+            yield value
+        else:
+            yield from value()
+
+def render_list_template(segments, parts):
+    """Join compiled template segments with the slot values in parts."""
+    return ''.join(iter_list_template(segments, parts))
+
+def write_list_template(segments, parts, out):
+    """Write the generated list to the text file object out, chunk by chunk."""
+    for chunk in iter_list_template(segments, parts):
+        out.write(chunk)
+
+# ============ SHARED LIST ASSETS ============
+# Every generated list used to carry its own copy of the template's CSS and
+# scripts. In compact and virtual mode those are the same for every list
+# except for the title, list number, date and item count, so
+# compile_shared_list_template() moves them into content-hashed files served
+# from /static/lists/ (cached for good by browsers and precached by sw.js).
+# The scripts read the per-list values from LIST_META, a small inline script,
+# and the page itself only keeps the markup and the item data.
+
+SHARED_ASSET_DIR = '/static/lists/'
+
+# Slots the shared scripts read from LIST_META instead of having them inlined
+SHARED_META_SLOTS = ('title', 'list_no', 'list_date', 'total_count')
+
+_script_block_re = re.compile(r'<script([^>]*)>(.*?)</script>', re.DOTALL)
+_style_block_re = re.compile(r'<style([^>]*)>(.*?)</style>', re.DOTALL)
+_marker_re = re.compile('\x00(\\w+)\x00')
+
+# {(template_path, virtual): (mtime, segments, assets)}
+_compiled_shared_templates = {}
+
+def shared_asset_name(prefix, text, ext):
+    """Return the file name of a shared asset, e.g. list-3f2a9c0d1e4b.js."""
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+    return f'{prefix}-{digest}.{ext}'
+
+def _list_meta_reference(script, start, name):
+    """Return the JS that reads LIST_META[name] at position start of script.
+
+    The template has the values inside string literals (var TITLETOTO = "...")
+    and as a plain number (i <= 85), so the quote the marker is in, if any,
+    is closed and reopened around the reference. Returns None inside a
+    template literal, where that doesn't work.
+    """
+    line = script[script.rfind('\n', 0, start) + 1:start]
+    quote = None
+    escaped = False
+    for c in line:
+        if escaped:
+            escaped = False
+        elif quote and c == '\\':
+            escaped = True
+        elif c == quote:
+            quote = None
+        elif quote is None and c in '"\'':
+            quote = c
+        elif quote is None and c == '`':
+            return None
+    reference = f'LIST_META.{name}'
+    return f'{quote} + {reference} + {quote}' if quote else reference
+
+def share_script(script):
+    """Return script with its slot markers replaced by LIST_META reads.
+
+    Returns None if the script has a marker that isn't in SHARED_META_SLOTS
+    (item data, the WhatsApp number) and has to stay in the page.
+    """
+    pieces = []
+    end = 0
+    for match in _marker_re.finditer(script):
+        name = match.group(1)
+        reference = _list_meta_reference(script, match.start(), name) if name in SHARED_META_SLOTS else None
+        if reference is None:
+            return None
+        pieces.append(script[end:match.start()])
+        pieces.append(reference)
+        end = match.end()
+    pieces.append(script[end:])
+    return ''.join(pieces)
+
+def compile_shared_list_template(content, virtual=False):
+    """Compile list.HTM for compact (or virtual) lists that load shared assets.
+
+    Returns (segments, assets): segments as in compile_list_template, with the
+    CSS and the scripts that don't depend on the items replaced by links to
+    SHARED_ASSET_DIR, and assets mapping those file names to their text.
+    segments is None if the template has no tbody section. The page needs
+    two more slots: asset_base, the server the assets are loaded from
+    ('' for the same one), and list_meta (see render_list_meta_script).
+    """
+    segments = compile_list_template(content)
+    if segments is None:
+        return None, {}
+
+    # The compact JS slots are the same for every list, so they go with the scripts
+    fixed = compact_js_parts(virtual)
+    page = ''.join(
+        (fixed[text] if text in fixed else f'\x00{text}\x00') if is_slot else text
+        for is_slot, text in segments
+    )
+    assets = {}
+
+    def asset_url(name):
+        return f'\x00asset_base\x00{SHARED_ASSET_DIR}{name}'
+
+    style = _style_block_re.search(page)
+    if style and '\x00' not in style.group(2):
+        name = shared_asset_name('list', style.group(2), 'css')
+        assets[name] = style.group(2)
+        page = page[:style.start()] + f'<link rel="stylesheet" href="{asset_url(name)}">' + page[style.end():]
+
+    pieces = []
+    end = 0
+    meta_added = False
+    for match in _script_block_re.finditer(page):
+        attrs, script = match.groups()
+        if 'src=' in attrs:
+            continue
+        shared = share_script(script)
+        if shared is None:
+            continue
+        name = shared_asset_name('list', shared, 'js')
+        assets[name] = shared
+        pieces.append(page[end:match.start()])
+        if not meta_added:
+            # LIST_META has to be defined before the first shared script runs
+            pieces.append('\x00list_meta\x00')
+            meta_added = True
+        pieces.append(f'<script{attrs} src="{asset_url(name)}"></script>')
+        end = match.end()
+    pieces.append(page[end:])
+    page = ''.join(pieces)
+
+    if virtual:
+        # Loaded after the LIST_ROWS script in items_html, where it was inlined
+        runtime = load_virtual_list_script()
+        name = shared_asset_name('virtual', runtime, 'js')
+        assets[name] = runtime
+        page = page.replace('\x00items_html\x00', f'\x00items_html\x00<script src="{asset_url(name)}"></script>\n', 1)
+
+    return split_template_segments(page), assets
+
+def load_shared_list_template(template_path, virtual=False):
+    """Return (segments, assets) of template_path for shared assets, compiling it only when it changed."""
+    mtime = os.path.getmtime(template_path)
+    cached = _compiled_shared_templates.get((template_path, virtual))
+    if cached is None or cached[0] != mtime:
+        with open(template_path, 'r', encoding='utf-8') as f:
+            segments, assets = compile_shared_list_template(f.read(), virtual)
+        cached = (mtime, segments, assets)
+        _compiled_shared_templates[(template_path, virtual)] = cached
+    return cached[1], cached[2]
+
+def render_list_meta_script(title, list_no, list_date, total_count):
+    """Return the inline script with the values the shared scripts read from LIST_META."""
+    meta = {'title': title, 'list_no': list_no, 'list_date': list_date, 'total_count': total_count}
+    return f'<script>\nvar LIST_META = {_script_json(meta)};\n</script>\n'
+
+def update_htm(htm_filepath, data_items, output_filepath, incremental=None):
+    """Update list.HTM with all items from data.txt
+
+    incremental is an optional dict whose 'state' holds the items rendered by
+    a previous run (see build_item_chunks); only changed items are rendered
+    again, and 'state' is replaced with the new one.
+    """
     with open(htm_filepath, 'r', encoding='utf-8') as f:
         content = f.read()
 
@@ -492,28 +1093,21 @@ def update_htm(htm_filepath, data_items, output_filepath):
         print("ERROR: Could not find tbody section")
         return
 
-    items_html = ""
-    current_letter = ""
-    for i, (item_name, value) in enumerate(data_items, 1):
-        first_letter = item_name[0].upper() if item_name else "?"
-        if first_letter != current_letter:
-            current_letter = first_letter
-            items_html += generate_section_header(current_letter)
-        items_html += generate_item_row(i, item_name, value)
-
-    items_html += f'''<tr class="heading2"> <td style=" text-align: CENTER; border-radius: 0px 0px 16px 16px; padding-left: 10px;" colspan="5" >Total Products :
-  {total_count}
-</td></tr>
-'''
+    # Render the items, reusing the unchanged ones of the previous run
+    state = build_item_chunks(data_items, incremental.get('state') if incremental is not None else None)
+    if incremental is not None:
+        incremental['state'] = state
+    parts = item_chunk_parts(state)
+    items_html = ''.join(parts['items_html']())
 
     content = content[:tbody_start + len('<tbody id="myTable">')] + items_html + content[tbody_end:]
 
     # 3. Generate new JS content
-    js_vars_full = generate_js_vars_full(data_items)
-    js_vars_simple = generate_js_vars_simple(data_items)
-    js_if_blocks_printf = generate_js_if_blocks(data_items, 'mywindow')
-    js_if_blocks_myfun = generate_js_if_blocks(data_items, 'myWindow')
-    js_if_whatsapp = generate_js_if_blocks_whatsapp(data_items)
+    js_vars_full = ''.join(parts['js_vars_full']())
+    js_vars_simple = ''.join(parts['js_vars_simple']())
+    js_if_blocks_printf = ''.join(parts['js_if_blocks_printf']())
+    js_if_blocks_myfun = ''.join(parts['js_if_blocks_myfun']())
+    js_if_whatsapp = ''.join(parts['js_if_whatsapp']())
 
     # 4. Update Printf function
     # Variables: from "var serial = 0;" to "var mywindow = window.open"
@@ -579,8 +1173,8 @@ def update_htm(htm_filepath, data_items, output_filepath):
     )
 
     # 7. Update createRows function (PDF generation)
-    js_vars_createrows = generate_js_vars_createrows(data_items)
-    js_if_blocks_pdf = generate_js_if_blocks_pdf(data_items)
+    js_vars_createrows = ''.join(parts['js_vars_createrows']())
+    js_if_blocks_pdf = ''.join(parts['js_if_blocks_pdf']())
 
     # Update createRows variables: from "const rows = [];" to "var serial = 0;"
     content = re.sub(
@@ -605,11 +1199,206 @@ def update_htm(htm_filepath, data_items, output_filepath):
     with open(output_filepath, 'w', encoding='utf-8') as f:
         f.write(content)
 
-    print(f"Generated {total_count} items in table")
+    print(f"Generated {total_count} items in table ({state['rebuilt']} rendered, {total_count - state['rebuilt']} unchanged)")
     print(f"Updated Printf, mywht, myfun, createRows functions")
     print(f"Total Products: {total_count}")
 
+# ============ BULK GENERATION ============
+# python update_htm.py bulk manifest.csv  writes one list per manifest row,
+# e.g. the same data.txt for several customers with their own title, WhatsApp
+# number and list number. The template is compiled once and handed to every
+# worker process, and each job parses its input file once and renders its
+# items once for all the lists it writes.
+
+# Manifest columns; only input is required
+MANIFEST_DEFAULTS = {
+    'list_no': '000001',
+    'title': 'S.S.D PHARMA',
+    'whatsapp': '923337068868',
+    'list_date': '',
+    'output': '',
+}
+
+# Compiled template of the worker process, set by _init_bulk_worker
+_bulk_segments = None
+
+def read_manifest(manifest_path, output_dir=None):
+    """Read a CSV or JSON manifest and return a list of list settings.
+
+    JSON manifests are a list of objects, CSV manifests have a header row.
+    input and output paths are relative to the manifest; output defaults to
+    offer_list_<list_no>.htm in output_dir (or next to the manifest). Entries
+    that cannot be generated get an 'error' instead of stopping the run.
+    """
+    with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+        if manifest_path.lower().endswith('.json'):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    output_dir = output_dir or base_dir
+
+    jobs = []
+    by_output = {}
+    for line_no, row in enumerate(rows, 1):
+        job = dict(MANIFEST_DEFAULTS)
+        job.update({key.strip().lower(): str(value).strip() for key, value in row.items() if key and value is not None})
+        job['entry'] = line_no
+        job['error'] = None
+        job['whatsapp'] = ''.join(filter(str.isdigit, job['whatsapp']))
+        job['output'] = os.path.join(output_dir, job['output'] or f"offer_list_{job['list_no']}.htm")
+        if job.get('input'):
+            job['input'] = os.path.join(base_dir, job['input'])
+        else:
+            job['error'] = "no input file"
+        by_output.setdefault(os.path.normcase(os.path.abspath(job['output'])), []).append(job)
+        jobs.append(job)
+
+    # Two entries writing the same file would silently overwrite each other,
+    # so none of them is generated and the manifest has to be fixed
+    for same_output in by_output.values():
+        if len(same_output) > 1:
+            entries = ', '.join(str(job['entry']) for job in same_output)
+            for job in same_output:
+                job['error'] = job['error'] or f"entries {entries} write the same output file"
+    return jobs
+
+def write_file_atomic(path, chunks):
+    """Write text chunks to path through a temporary file, so readers never see a partial list."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.splitext(path)[1])
+    size = 0
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for chunk in chunks:
+                size += f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return size
+
+def _init_bulk_worker(segments):
+    global _bulk_segments
+    _bulk_segments = segments
+
+def generate_bulk_lists(input_path, jobs, compact=False):
+    """Write every list in jobs from one input file; runs in a worker process.
+
+    Returns a list of (output, item count, characters written, error).
+    """
+    try:
+        data_items = parse_data_txt(input_path)
+        # Same order as /generate-html
+        data_items.sort(key=lambda x: x[0].upper() if x[0] else "")
+        state = build_item_chunks(data_items, compact=compact)
+    except Exception as e:
+        # A bad input file only fails its own lists
+        return [(job['output'], 0, 0, f"{input_path}: {e}") for job in jobs]
+    today = datetime.datetime.now().strftime("%d/%m/%Y")
+
+    results = []
+    for job in jobs:
+        parts = {
+            'title': job['title'],
+            'whatsapp_number': job['whatsapp'],
+            'list_no': job['list_no'],
+            'list_date': job['list_date'] or today,
+            'total_count': str(len(data_items)),
+        }
+        parts.update(item_chunk_parts(state))
+        try:
+            size = write_file_atomic(job['output'], iter_list_template(_bulk_segments, parts))
+            results.append((job['output'], len(data_items), size, None))
+        except Exception as e:
+            results.append((job['output'], len(data_items), 0, str(e) or type(e).__name__))
+    return results
+
+def bulk_generate(manifest_path, template_path='list.HTM', output_dir=None, workers=None, compact=False):
+    """Generate every list in a manifest across a process pool and print a summary.
+
+    A failing entry is reported and the other lists are still generated.
+    Returns the number of lists that failed.
+    """
+    start = time.perf_counter()
+    jobs = read_manifest(manifest_path, output_dir)
+    rejected = [job for job in jobs if job['error']]
+    jobs = [job for job in jobs if not job['error']]
+    for job in rejected:
+        print(f"  FAILED entry {job['entry']} ({job['output']}): {job['error']}")
+
+    with open(template_path, 'r', encoding='utf-8') as f:
+        segments = compile_list_template(f.read())
+    if segments is None:
+        print("ERROR: Could not find tbody section in template")
+        return len(jobs) + len(rejected)
+
+    workers = workers or os.cpu_count() or 1
+
+    # Lists sharing an input file are generated together so the file is parsed
+    # and rendered once, but a big group is still split over the workers
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job['input'], []).append(job)
+    batch_size = max(1, -(-len(jobs) // workers))
+    tasks = []
+    for input_path, group in groups.items():
+        for i in range(0, len(group), batch_size):
+            tasks.append((input_path, group[i:i + batch_size]))
+
+    print(f"Generating {len(jobs)} lists from {len(groups)} input files with {workers} workers...")
+
+    lists = items = size = 0
+    failed = len(rejected)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_bulk_worker, initargs=(segments,)) as executor:
+        futures = {executor.submit(generate_bulk_lists, input_path, batch, compact): batch for input_path, batch in tasks}
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                # e.g. a worker process that died; only its lists fail
+                results = [(job['output'], 0, 0, str(e) or type(e).__name__) for job in futures[future]]
+            for output, count, written, error in results:
+                if error:
+                    failed += 1
+                    print(f"  FAILED {output}: {error}")
+                    continue
+                lists += 1
+                items += count
+                size += written
+                print(f"  {output}: {count} items")
+
+    seconds = time.perf_counter() - start
+    print(f"\nGenerated {lists} lists ({items} items, {size / 1048576:.1f} MB) in {seconds:.2f}s")
+    if seconds > 0:
+        print(f"Throughput: {lists / seconds:.1f} lists/s, {items / seconds:.0f} items/s, {size / 1048576 / seconds:.1f} MB/s")
+    if failed:
+        print(f"{failed} lists failed")
+    return failed
+
+def bulk_main(argv):
+    """Command line entry for: python update_htm.py bulk manifest.csv"""
+    import argparse
+    parser = argparse.ArgumentParser(prog='update_htm.py bulk', description='Generate offer lists for every row of a CSV/JSON manifest (columns: input, list_no, title, whatsapp, list_date, output)')
+    parser.add_argument('manifest')
+    parser.add_argument('--template', default='list.HTM', help='list template (default: list.HTM)')
+    parser.add_argument('--output-dir', help='directory for outputs without a path (default: next to the manifest)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: number of CPUs)')
+    parser.add_argument('--compact', action='store_true', help='emit the item data once as JSON, like the Compact option of /make-html')
+    args = parser.parse_args(argv)
+    try:
+        failed = bulk_generate(args.manifest, args.template, args.output_dir, args.workers, args.compact)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}")
+        return 1
+    return 1 if failed else 0
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'bulk':
+        sys.exit(bulk_main(sys.argv[2:]))
+
     data_file = 'data.txt'
     htm_file = 'list.HTM'
 
@@ -617,7 +1406,14 @@ if __name__ == '__main__':
     data_items = parse_data_txt(data_file)
     print(f"Found {len(data_items)} items in data.txt")
 
+    # The rendered items are kept next to list.HTM so the next run only
+    # renders the items that changed
+    state_file = htm_file + '.items.json'
+    incremental = {'state': load_item_chunks(state_file)}
+
     print("\nUpdating list.HTM...")
-    update_htm(htm_file, data_items, htm_file)
+    update_htm(htm_file, data_items, htm_file, incremental)
+    if 'state' in incremental and incremental['state'] is not None:
+        save_item_chunks(incremental['state'], state_file)
 
     print("\nDone!")
@@ -0,0 +1,266 @@
+// Virtual rows for large offer lists (the "virtual" option of /make-html).
+// Instead of thousands of <tr class="item"> rows the list ships LIST_ROWS
+// (name, offer, bonus of every item) and LIST_INDEX (the lowercase search
+// text of every item). Only the rows near the visible part of the page are
+// put in the table; spacer rows keep the scroll height of the whole list.
+// Quantities live in LIST_QTY, so they survive rows being scrolled away, and
+// Printf/myfun/mywht/createRows read them through listItemQty/listItemName.
+var LIST_QTY = [];
+
+function listItemQty(i) {
+  return LIST_QTY[i - 1] || "";
+}
+
+function listItemName(i) {
+  // Same as the value of the itnameid inputs of the full list
+  return LIST_ROWS[i - 1][0].padEnd(50);
+}
+
+(function () {
+  var OVERSCAN = 10;          // rows rendered above and below the screen
+  var SEARCH_DELAY = 150;     // ms after the last key press before filtering
+  var HEADER_STYLE = ' background: rgb(12,146,252); background: radial-gradient(circle, rgba(12,146,252,1) 50%, rgba(255,255,255,1) 100%); color:white;';
+
+  var tbody = null;
+  var letters = [];           // section letter of every item
+  var allItems = [];          // 0 .. LIST_ROWS.length - 1
+  var view = [];              // what is shown: item index, or a section letter (string) for a header
+  var offsets = [0];          // offsets[n] = height of view[0 .. n - 1]
+  var heights = { item: 62, header: 30 };
+  var measured = { item: false, header: false };
+  var first = -1, last = -1;  // rendered part of view
+  var pending = false;
+  var searchTimer = null;
+
+  function escapeHtml(text) {
+    return String(text).replace(/[&<>"']/g, function (c) { return '&#' + c.charCodeAt(0) + ';'; });
+  }
+
+  function headerHtml(letter) {
+    return '<tr class="list-section"><td colspan="7" align="center" style="' + HEADER_STYLE + '" ><b>' + escapeHtml(letter) + '</b></td></tr>';
+  }
+
+  function rowHtml(k) {
+    var row = LIST_ROWS[k], i = k + 1;
+    return '<tr class="item"><td align="center">\n ' + String(i).padEnd(4) +
+      '\n</td><td style=" text-align: left;" >\n          ' + escapeHtml(row[0]) +
+      '\n</td><td align="center">\n<input type="number" min="0" max="1000" class="qty" placeholder="Qty" id="nameid' + i + '" value="' + escapeHtml(listItemQty(i)) + '">' +
+      '\n</td><td align="center">' + escapeHtml(row[1]) +
+      '\n</td><td colspan="3" align="center">\n' + escapeHtml(row[2]) + '\n</td></tr>';
+  }
+
+  function spacerHtml(height) {
+    return height > 0 ? '<tr class="list-spacer"><td colspan="5" style="height:' + height + 'px;padding:0;border:0;"></td></tr>' : '';
+  }
+
+  function totalHtml() {
+    return '<tr class="heading2"> <td style=" text-align: CENTER; border-radius: 0px 0px 16px 16px; padding-left: 10px;" colspan="5" >Total Products :\n  ' + LIST_ROWS.length + '\n</td></tr>';
+  }
+
+  function computeOffsets() {
+    offsets = new Float64Array(view.length + 1);
+    for (var n = 0; n < view.length; n++) {
+      offsets[n + 1] = offsets[n] + (typeof view[n] === 'string' ? heights.header : heights.item);
+    }
+  }
+
+  // Index of the view row at height y (view.length if y is past the end)
+  function rowAt(y) {
+    var lo = 0, hi = view.length;
+    while (lo < hi) {
+      var mid = (lo + hi) >> 1;
+      if (offsets[mid + 1] <= y) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+  }
+
+  // Show the given items (in list order) with a header before each section
+  function setView(items) {
+    view = [];
+    var current = null;
+    for (var n = 0; n < items.length; n++) {
+      var k = items[n];
+      if (letters[k] !== current) {
+        current = letters[k];
+        view.push(current);
+      }
+      view.push(k);
+    }
+    computeOffsets();
+    first = last = -1;
+    render();
+  }
+
+  function schedule() {
+    if (!pending) {
+      pending = true;
+      window.requestAnimationFrame(render);
+    }
+  }
+
+  function render() {
+    pending = false;
+    var top = -tbody.getBoundingClientRect().top;
+    // After a search the list can end above the screen until the browser
+    // clamps the scroll position; show its end meanwhile
+    top = Math.min(top, Math.max(0, offsets[view.length] - window.innerHeight));
+    var from = Math.max(0, rowAt(top) - OVERSCAN);
+    var to = Math.min(view.length, rowAt(top + window.innerHeight) + 1 + OVERSCAN);
+    if (from === first && to === last) return;
+    first = from;
+    last = to;
+
+    // Keep typing in a quantity box that stays on screen
+    var active = document.activeElement;
+    var focusId = active && active.id && active.id.indexOf('nameid') === 0 ? active.id : null;
+
+    var html = [spacerHtml(offsets[from])];
+    for (var n = from; n < to; n++) {
+      html.push(typeof view[n] === 'string' ? headerHtml(view[n]) : rowHtml(view[n]));
+    }
+    html.push(spacerHtml(offsets[view.length] - offsets[to]));
+    html.push(totalHtml());
+    tbody.innerHTML = html.join('');
+
+    if (focusId) {
+      var input = document.getElementById(focusId);
+      if (input) input.focus();
+    }
+    measure();
+  }
+
+  // Replace the estimated row heights with the real ones once rows are on screen
+  function measure() {
+    var changed = false;
+    var row = !measured.item && tbody.querySelector('tr.item');
+    if (row && row.offsetHeight) {
+      heights.item = row.offsetHeight;
+      measured.item = changed = true;
+    }
+    var header = !measured.header && tbody.querySelector('tr.list-section');
+    if (header && header.offsetHeight) {
+      heights.header = header.offsetHeight;
+      measured.header = changed = true;
+    }
+    if (changed) {
+      computeOffsets();
+      first = last = -1;
+      schedule();
+    }
+  }
+
+  function search(value) {
+    var query = value.toLowerCase();
+    if (!query) {
+      setView(allItems);
+      return;
+    }
+    var hits = [];
+    for (var k = 0; k < LIST_INDEX.length; k++) {
+      if (LIST_INDEX[k].indexOf(query) > -1) hits.push(k);
+    }
+    setView(hits);
+  }
+
+  function jumpTo(letter) {
+    var box = document.getElementById('myinputs');
+    if (box && box.value) {
+      box.value = '';
+      setView(allItems);
+    }
+    var n = view.indexOf(letter);
+    if (n > -1) {
+      window.scrollTo(0, window.pageYOffset + tbody.getBoundingClientRect().top + offsets[n]);
+    }
+  }
+
+  function addJumpBar(box) {
+    var bar = document.createElement('div');
+    bar.className = 'list-jump';
+    bar.style.cssText = 'display:flex;flex-wrap:wrap;justify-content:center;gap:6px;margin:8px 0;';
+    var seen = {};
+    letters.forEach(function (letter) {
+      if (seen[letter]) return;
+      seen[letter] = true;
+      var link = document.createElement('a');
+      link.textContent = letter;
+      link.href = '#';
+      link.style.cssText = 'padding:4px 8px;border-radius:8px;background:rgb(12,146,252);color:white;text-decoration:none;font-size:18px;';
+      link.addEventListener('click', function (e) {
+        e.preventDefault();
+        jumpTo(letter);
+      });
+      bar.appendChild(link);
+    });
+    var container = box.closest('.box') || box;
+    container.parentNode.insertBefore(bar, container.nextSibling);
+  }
+
+  // Same text as simpleOrder() of the full list, read from LIST_QTY instead of the inputs
+  function simpleOrder() {
+    var today = new Date();
+    var dateStr = today.getDate().toString().padStart(2, '0') + '/' + (today.getMonth() + 1).toString().padStart(2, '0') + '/' + today.getFullYear();
+    var orderText = "Date: " + dateStr + "\n Order from :\n ";
+    var hasItems = false;
+
+    for (var i = 1; i <= LIST_ROWS.length; i++) {
+      var qtyValue = String(listItemQty(i)).trim();
+      if (qtyValue !== "" && parseFloat(qtyValue) > 0) {
+        orderText += listItemName(i).trim() + " (qty) " + qtyValue + "\n";
+        hasItems = true;
+      }
+    }
+
+    if (!hasItems) {
+      alert("Please enter quantities for at least one item.");
+      return;
+    }
+
+    orderText = orderText.slice(0, -1);
+    var whatsappUrl = "https://api.whatsapp.com/send/?phone=%2B" + WHATSAPP_GLOBAL + "&text=" + encodeURIComponent(orderText) + "&type=phone_number&app_absent=0";
+    window.open(whatsappUrl, '_blank');
+  }
+
+  function init() {
+    tbody = document.getElementById('myTable');
+    for (var k = 0; k < LIST_ROWS.length; k++) {
+      var name = LIST_ROWS[k][0];
+      letters.push(name ? name[0].toUpperCase() : "?");
+      allItems.push(k);
+    }
+
+    tbody.addEventListener('input', function (e) {
+      var id = e.target.id || '';
+      if (id.indexOf('nameid') === 0) {
+        LIST_QTY[parseInt(id.slice(6), 10) - 1] = e.target.value;
+      }
+    });
+    window.addEventListener('scroll', schedule, { passive: true });
+    window.addEventListener('resize', schedule);
+
+    var box = document.getElementById('myinputs');
+    if (box) {
+      // Replace the row-by-row jQuery filter of the template
+      if (window.jQuery) window.jQuery(box).off('keyup');
+      box.addEventListener('input', function () {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(function () { search(box.value); }, SEARCH_DELAY);
+      });
+      addJumpBar(box);
+    }
+
+    // The template's simpleOrder() reads the quantity inputs, most of which don't exist here
+    window.simpleOrder = simpleOrder;
+
+    setView(allItems);
+  }
+
+  // Run after the template's own ready handlers (the jQuery filter is bound there)
+  if (window.jQuery) {
+    window.jQuery(init);
+  } else if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', init);
+  } else {
+    init();
+  }
+})();
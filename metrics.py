@@ -0,0 +1,212 @@
+"""In-process metrics, exposed by app.py at /metrics in the Prometheus text format.
+
+Counters and histograms are kept in plain dicts under one lock; recording a
+value is a dict lookup, a bisect and an addition, so the helpers can be used
+on the request path and inside parsing loops. Values that are cheap to read
+but expensive to track (session counts, cache sizes) are registered as gauge
+functions and only computed when /metrics is scraped.
+
+    import metrics
+    metrics.inc('medlist_cache_requests_total', cache='html', result='hit')
+    with metrics.timed('medlist_stage_seconds', stage='parse', format='.htm'):
+        ...
+"""
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Seconds; from a fast cache hit to a large PDF
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+
+# {name: {'type', 'help', 'buckets', 'samples': {labels: value}}}, labels being
+# a sorted tuple of (name, value) pairs. Histogram samples are
+# [bucket counts..., sum, count].
+_metrics = {}
+
+# {name: (help, fn)}, fn returns a number or {labels dict as tuple: number}
+_gauges = {}
+
+def _register(name, kind, help_text, buckets=None):
+    if name not in _metrics:
+        _metrics[name] = {'type': kind, 'help': help_text, 'buckets': buckets, 'samples': {}}
+
+def counter(name, help_text):
+    """Declare a counter with its help text."""
+    with _lock:
+        _register(name, 'counter', help_text)
+
+def histogram(name, help_text, buckets=DEFAULT_BUCKETS):
+    """Declare a histogram with its help text and upper bucket bounds."""
+    with _lock:
+        _register(name, 'histogram', help_text, tuple(buckets))
+
+def gauge(name, help_text, fn):
+    """Register a gauge whose value fn() returns at scrape time.
+
+    fn returns a number, or a dict mapping label tuples (see labels()) to numbers.
+    """
+    _gauges[name] = (help_text, fn)
+
+def labels(**values):
+    """Return the label tuple used as sample key."""
+    return tuple(sorted((key, str(value)) for key, value in values.items()))
+
+def inc(name, amount=1, **label_values):
+    """Add amount to a counter."""
+    key = labels(**label_values)
+    with _lock:
+        _register(name, 'counter', '')
+        samples = _metrics[name]['samples']
+        samples[key] = samples.get(key, 0) + amount
+
+def value(name, **label_values):
+    """Return the current value of a counter (0 if never counted)."""
+    key = labels(**label_values)
+    with _lock:
+        metric = _metrics.get(name)
+        return metric['samples'].get(key, 0) if metric else 0
+
+def observe(name, value, **label_values):
+    """Record one value (usually seconds) in a histogram."""
+    key = labels(**label_values)
+    with _lock:
+        _register(name, 'histogram', '', DEFAULT_BUCKETS)
+        metric = _metrics[name]
+        sample = metric['samples'].get(key)
+        if sample is None:
+            # One count per bucket and for +Inf, then sum and count
+            sample = metric['samples'][key] = [0] * (len(metric['buckets']) + 3)
+        # Buckets are stored non-cumulative and summed up when rendered
+        sample[bisect.bisect_left(metric['buckets'], value)] += 1
+        sample[-2] += value
+        sample[-1] += 1
+
+@contextmanager
+def timed(name, **label_values):
+    """Observe the time spent in the with block, also when it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **label_values)
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _header_escape(value):
+    """Make a file name or term safe inside a quoted header parameter."""
+    # Header values must be printable ASCII here: file names and terms may hold
+    # anything, and a CR/LF would end the header
+    value = ''.join(char for char in str(value) if ' ' <= char <= '~' or char > '\x7f')
+    value = value.encode('ascii', 'replace').decode('ascii')
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def render():
+    """Return every metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    with _lock:
+        snapshot = {
+            name: dict(metric, samples={key: list(value) if isinstance(value, list) else value
+                                        for key, value in metric['samples'].items()})
+            for name, metric in _metrics.items()
+        }
+
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        if metric['help']:
+            lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for key in sorted(metric['samples']):
+            value = metric['samples'][key]
+            if metric['type'] == 'counter':
+                lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric['buckets'] + (float('inf'),), value[:-2]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', _format_value(float(bound)))])} {cumulative}")
+            lines.append(f'{name}_sum{_format_labels(key)} {_format_value(value[-2])}')
+            lines.append(f'{name}_count{_format_labels(key)} {value[-1]}')
+
+    for name in sorted(_gauges):
+        help_text, fn = _gauges[name]
+        try:
+            value = fn()
+        except Exception as e:
+            print(f"Error reading gauge {name}: {e}")
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        if isinstance(value, dict):
+            for key in sorted(value):
+                lines.append(f'{name}{_format_labels(key)} {_format_value(value[key])}')
+        else:
+            lines.append(f'{name} {_format_value(value)}')
+
+    return '\n'.join(lines) + '\n'
+
+class RequestTimings:
+    """Stage timings of one request, for a Server-Timing header.
+
+    Stages are kept in the order they finish, each with a name (a
+    Server-Timing metric name), a duration and an optional description;
+    details holds anything else a route wants to report with them (per-file
+    row counts, per-term times). The object is only touched by the request
+    and the CPU job it waits for, so it needs no lock.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = []
+        self.details = {}
+
+    def add(self, name, seconds, desc=None):
+        self.stages.append((name, seconds, desc))
+
+    @contextmanager
+    def stage(self, name, desc=None):
+        """Add the time spent in the with block as a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, desc)
+
+    def wrap(self, name, fn):
+        """Return fn timed as stage name, e.g. to time a job on the CPU pool without its queue wait."""
+        def timed_fn(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return timed_fn
+
+    def header(self):
+        """Return the Server-Timing header value, ending with the total so far."""
+        items = []
+        for name, seconds, desc in self.stages + [('total', time.perf_counter() - self.start, None)]:
+            item = f'{name};dur={seconds * 1000:.1f}'
+            if desc:
+                item += f';desc="{_header_escape(desc)}"'
+            items.append(item)
+        return ', '.join(items)
+
+    def as_dict(self):
+        """Return the stages (in ms) and details for the optional timings object of a response."""
+        return dict(self.details,
+                    stages=[{'name': name, 'ms': round(seconds * 1000, 2), 'desc': desc} for name, seconds, desc in self.stages],
+                    total_ms=round((time.perf_counter() - self.start) * 1000, 2))
@@ -0,0 +1,166 @@
+"""On-demand profiling of single requests, used by app.py.
+
+Off unless MEDLIST_PROFILE_DIR is set. A request that asks for it (see
+app.py) is profiled on its own thread and on the CPU pool thread running
+its job, and written to MEDLIST_PROFILE_DIR as
+
+    <time>-<route>-<id>.pstats     cProfile stats (mode 'cprofile', the default)
+    <time>-<route>-<id>.collapsed  sampled stacks, one "a;b;c count" line per
+                                   stack (mode 'sample'), for flamegraph.pl or
+                                   speedscope
+    <time>-<route>-<id>.json       the request parameters, status and duration
+
+Read a .pstats file with python -m pstats or snakeviz. Only one request is
+profiled at a time; others asking for it while one runs are served as usual.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import cProfile
+import pstats
+import threading
+from contextlib import contextmanager
+
+PROFILE_DIR = os.environ.get('MEDLIST_PROFILE_DIR')
+# Seconds between stack samples in 'sample' mode
+SAMPLE_INTERVAL = float(os.environ.get('MEDLIST_PROFILE_INTERVAL', 0.005))
+MODES = ('cprofile', 'sample')
+
+_active = threading.Lock()
+
+def enabled():
+    return bool(PROFILE_DIR)
+
+def frame_stack(frame):
+    """Return the stack of frame as 'file:function:line' entries, outermost first."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+class RequestProfile:
+    """Profile of one request and the CPU jobs it runs.
+
+    start() begins on the calling (request) thread; other threads join with
+    the thread() context manager. stop() ends it, write() saves it.
+    """
+
+    def __init__(self, mode='cprofile'):
+        self.mode = mode if mode in MODES else 'cprofile'
+        self.started = None
+        self.seconds = None
+        self.running = False
+        # cprofile: one cProfile.Profile per thread, merged when written
+        self.profiles = []
+        # sample: thread ids to sample and the count of every stack seen
+        self.threads = set()
+        self.stacks = {}
+        self._sampler = None
+
+    def start(self):
+        """Start profiling the calling thread; False if another request is being profiled."""
+        if not _active.acquire(blocking=False):
+            return False
+        self.running = True
+        self.started = time.perf_counter()
+        if self.mode == 'sample':
+            self._sampler = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+            self.threads.add(threading.get_ident())
+            self._sampler.start()
+        else:
+            self._enable()
+        return True
+
+    def _enable(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler, which already sees this thread
+            return None
+        self.profiles.append(profile)
+        return profile
+
+    @contextmanager
+    def thread(self):
+        """Profile the calling thread (a CPU pool worker) during the with block."""
+        if not self.running:
+            yield
+            return
+        if self.mode == 'sample':
+            ident = threading.get_ident()
+            self.threads.add(ident)
+            try:
+                yield
+            finally:
+                self.threads.discard(ident)
+            return
+        profile = self._enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+
+    def _sample(self):
+        while self.running:
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    key = ';'.join(frame_stack(frame))
+                    self.stacks[key] = self.stacks.get(key, 0) + 1
+            time.sleep(SAMPLE_INTERVAL)
+
+    def stop(self):
+        """Stop profiling; safe to call more than once."""
+        if not self.running:
+            return
+        self.running = False
+        self.seconds = time.perf_counter() - self.started
+        if self.mode == 'sample':
+            self._sampler.join()
+        elif self.profiles:
+            # The request thread's profiler; job profilers stop with their job
+            self.profiles[0].disable()
+        _active.release()
+
+    def write(self, route, params, directory=None):
+        """Save the profile and params to directory (default PROFILE_DIR) and return the profile's file name."""
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        name = '-'.join([time.strftime('%Y%m%d-%H%M%S'), route.strip('/').replace('/', '_') or 'root', uuid.uuid4().hex[:6]])
+        base = os.path.join(directory, name)
+
+        if self.mode == 'sample':
+            profile_file = base + '.collapsed'
+            with open(profile_file, 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self.stacks.items()):
+                    f.write(f'{stack} {count}\n')
+        else:
+            profile_file = base + '.pstats'
+            stats = None
+            for profile in self.profiles:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            if stats is not None:
+                stats.dump_stats(profile_file)
+
+        info = dict(params,
+                    route=route,
+                    mode=self.mode,
+                    seconds=round(self.seconds or 0, 4),
+                    samples=sum(self.stacks.values()) if self.mode == 'sample' else None,
+                    sample_interval=SAMPLE_INTERVAL if self.mode == 'sample' else None,
+                    python=sys.version.split()[0],
+                    profile=os.path.basename(profile_file))
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(info, f, indent=2, ensure_ascii=False, default=str)
+        return os.path.basename(profile_file)
@@ -1,11 +1,88 @@
 import os
 import json
+import time
 from bs4 import BeautifulSoup
 try:
     import PyPDF2
 except ImportError:
     PyPDF2 = None
 import re
+import sys
+import metrics
+
+# update_htm reads the row data of virtual lists
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'list_to_htm'))
+from update_htm import parse_virtual_rows
+
+# Time spent in each step of parsing and searching lists, see metrics.py
+STAGE_SECONDS = 'medlist_search_stage_seconds'
+metrics.histogram(STAGE_SECONDS, 'Time spent parsing and searching medicine lists, by stage and file format')
+
+# Bumped when the format returned by MedicineSearcher.build_list_index changes,
+# so pages drop indexes they stored in an older format
+LIST_INDEX_VERSION = 1
+
+def medicine_name_matches(term_lower, search_words, med_name_lower):
+    """Return True if a medicine name matches a search term.
+
+    term_lower is the lowercased, stripped term and search_words its words.
+    static/search_worker.js does the same matching for offline search, so
+    keep the two in step.
+    """
+    # Split medicine name into words
+    med_words = [word.strip() for word in med_name_lower.split() if word.strip()]
+
+    # 1. Exact match
+    if term_lower == med_name_lower:
+        return True
+
+    # 2. If searching for a specific medicine name with strength (like "azomax 500")
+    # only match if the medicine name contains all the words from the search term
+    # but be careful not to match "500" alone with unrelated medicines
+    if len(search_words) == 1:
+        # Single word search (like "500") - need to be careful
+        search_word = search_words[0]
+        if len(search_word) < 3:
+            # If it's a very short word (likely a strength like "500"), it should be part of a specific medicine
+            # Match only if it's part of a larger name where we expect that strength
+            for med_word in med_words:
+                if search_word == med_word or (search_word in med_word and any(char.isalpha() for char in med_word)):
+                    return True
+            return False
+        # If it's a longer word, it might be a medicine name part - allow partial matching
+        return search_word in med_name_lower
+
+    # Multiple word search (like "azomax 500")
+    # All words should appear in the medicine name
+    for search_word in search_words:
+        word_found = False
+
+        # For each word in the search term, check if it appears in the medicine name
+        if len(search_word) < 3:
+            # Short word like "500" - should match as part of medicine name or be adjacent to letters
+            for med_word in med_words:
+                if search_word in med_word and any(c.isalpha() for c in med_word):
+                    word_found = True
+                    break
+        else:
+            # Longer words should match as complete words or as parts of medicine names
+            for med_word in med_words:
+                if search_word in med_word.lower():
+                    word_found = True
+                    break
+
+        if not word_found:
+            return False
+
+    return True
+
+def parse_discount_percent(discount):
+    """Return the discount of a list entry as a number of percent, or None (TP, NET, N/A, ...)."""
+    match = re.search(r'(\d+(?:\.\d+)?)\s*%', discount) or re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*', discount)
+    if not match:
+        return None
+    value = float(match.group(1))
+    return value if value <= 100 else None
 
 class MedicineSearcher:
     def __init__(self):
@@ -103,11 +180,79 @@ class MedicineSearcher:
 
         return company_name or os.path.basename(file_path)
 
+    def medicine_from_columns(self, texts):
+        """Return (name, discount) guessed from the stripped cell texts of an item row."""
+        # Need to intelligently identify which column contains the medicine name and discount
+        medicine_name = ""
+        discount = ""
+
+        # Look for the most likely name column (should contain alphabetic characters, not just numbers)
+        name_col_idx = -1
+
+        # Look through columns to find the one that looks like a medicine name
+        for i in range(min(len(texts), 5)):  # Check first few columns
+            col_text = texts[i]
+            # A medicine name usually contains letters and is typically longer descriptive text
+            if col_text and any(c.isalpha() for c in col_text):
+                # Avoid columns that are purely numbers, short codes, or single characters
+                # Medicine codes are typically short (3-6 chars) with letters and numbers,
+                # while medicine names are longer descriptive names
+                if not (col_text.isdigit() or
+                        col_text.replace('-', '').isdigit() or
+                        (len(col_text.strip()) <= 6 and
+                         col_text.replace('-', '').replace('.', '').replace(' ', '').isalnum() and
+                         any(c.isalpha() for c in col_text) and
+                         any(c.isdigit() for c in col_text)) or  # This checks for short codes like 'Y138', 'F410'
+                        (col_text.replace('.', '').replace('-', '').isdigit() and len(col_text) <= 10)):
+                    name_col_idx = i
+                    medicine_name = col_text.title()
+                    break
+
+        # If we still don't have a good name, try default positions (1 or 2)
+        if not medicine_name and len(texts) > 1:
+            for i in [1, 2]:
+                if i < len(texts):
+                    col_text = texts[i]
+                    if col_text and any(c.isalpha() for c in col_text):
+                        medicine_name = col_text.title()
+                        name_col_idx = i
+                        break
+
+        # Extract discount intelligently as well
+        for i in range(len(texts)):
+            if i == name_col_idx:  # Skip the name column
+                continue
+            col_text = texts[i]
+            # Check if this looks like a discount (contains % or looks like a percentage)
+            if col_text and ('%' in col_text.lower() or
+                (col_text.replace('.', '').replace('-', '').isdigit() and
+                 col_text.replace('.', '').replace('-', '') != '' and
+                 0 <= float(col_text.replace('-', '')) <= 100)):
+                # Prefer columns with % sign
+                if '%' in col_text.lower():
+                    discount = col_text
+                    break
+                elif not discount:  # Use first numerical discount if no % found yet
+                    discount = col_text
+
+        return medicine_name, discount
+
     def extract_medicines_from_html(self, file_path):
         """Extract medicines from HTML file"""
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
             html_content = file.read()
 
+        # Virtual lists made by /generate-html have their rows in a script;
+        # match them as the full rows (serial, name, qty, offer, bonus) they stand for
+        virtual_rows = parse_virtual_rows(html_content)
+        if virtual_rows is not None:
+            medicines = []
+            for serial, (name, offer, bonus) in enumerate(virtual_rows, 1):
+                medicine_name, discount = self.medicine_from_columns([str(serial), name.strip(), '', offer, bonus])
+                if medicine_name:
+                    medicines.append({'name': medicine_name, 'discount': discount, 'raw_data': json.dumps([name, offer, bonus])})
+            return medicines
+
         soup = BeautifulSoup(html_content, "html.parser")
         items = soup.find_all("tr", class_="item")
 
@@ -115,59 +260,7 @@ class MedicineSearcher:
         for item in items:
             columns = item.find_all("td")
             if len(columns) >= 3:  # Need at least name column
-                # Need to intelligently identify which column contains the medicine name and discount
-                medicine_name = ""
-                discount = ""
-
-                # Look for the most likely name column (should contain alphabetic characters, not just numbers)
-                name_col_idx = -1
-
-                # Look through columns to find the one that looks like a medicine name
-                for i in range(min(len(columns), 5)):  # Check first few columns
-                    col_text = columns[i].text.strip()
-                    # A medicine name usually contains letters and is typically longer descriptive text
-                    if col_text and any(c.isalpha() for c in col_text):
-                        # Avoid columns that are purely numbers, short codes, or single characters
-                        # Medicine codes are typically short (3-6 chars) with letters and numbers,
-                        # while medicine names are longer descriptive names
-                        if not (col_text.isdigit() or
-                                col_text.replace('-', '').isdigit() or
-                                (len(col_text.strip()) <= 6 and
-                                 col_text.replace('-', '').replace('.', '').replace(' ', '').isalnum() and
-                                 any(c.isalpha() for c in col_text) and
-                                 any(c.isdigit() for c in col_text)) or  # This checks for short codes like 'Y138', 'F410'
-                                (col_text.replace('.', '').replace('-', '').isdigit() and len(col_text) <= 10)):
-                            name_col_idx = i
-                            medicine_name = col_text.title()
-                            break
-
-                # If we still don't have a good name, try default positions (1 or 2)
-                if not medicine_name and len(columns) > 1:
-                    for i in [1, 2]:
-                        if i < len(columns):
-                            col_text = columns[i].text.strip()
-                            if col_text and any(c.isalpha() for c in col_text):
-                                medicine_name = col_text.title()
-                                name_col_idx = i
-                                break
-
-                # Extract discount intelligently as well
-                for i in range(len(columns)):
-                    if i == name_col_idx:  # Skip the name column
-                        continue
-                    col_text = columns[i].text.strip()
-                    # Check if this looks like a discount (contains % or looks like a percentage)
-                    if col_text and ('%' in col_text.lower() or
-                        (col_text.replace('.', '').replace('-', '').isdigit() and
-                         col_text.replace('.', '').replace('-', '') != '' and
-                         0 <= float(col_text.replace('-', '')) <= 100)):
-                        # Prefer columns with % sign
-                        if '%' in col_text.lower():
-                            discount = col_text
-                            break
-                        elif not discount:  # Use first numerical discount if no % found yet
-                            discount = col_text
-
+                medicine_name, discount = self.medicine_from_columns([column.text.strip() for column in columns])
                 if medicine_name:
                     medicines.append({
                         'name': medicine_name,
@@ -303,10 +396,15 @@ class MedicineSearcher:
             # Fallback to filename
             return os.path.basename(file_path)
 
-    def process_file(self, file_path):
-        """Process a single file and extract medicines"""
+    def process_file(self, file_path, timings=None):
+        """Process a single file and extract medicines
+
+        timings (a metrics.RequestTimings) gets parse and shop name stages and
+        a details['files'] entry for the file.
+        """
         file_ext = os.path.splitext(file_path)[1].lower()
 
+        start = time.perf_counter()
         if file_ext in ['.htm', '.html']:
             medicines = self.extract_medicines_from_html(file_path)
         elif file_ext in ['.txt', '.text']:
@@ -315,9 +413,29 @@ class MedicineSearcher:
             medicines = self.extract_medicines_from_pdf(file_path)
         else:
             return []
+        parse_seconds = time.perf_counter() - start
+        metrics.observe(STAGE_SECONDS, parse_seconds, stage='parse', format=file_ext)
 
         # Get shop name for this file
+        start = time.perf_counter()
         shop_name = self.get_shop_name_from_file(file_path)
+        shop_seconds = time.perf_counter() - start
+        metrics.observe(STAGE_SECONDS, shop_seconds, stage='shop_name', format=file_ext)
+
+        if timings is not None:
+            files = timings.details.setdefault('files', [])
+            file_name = os.path.basename(file_path)
+            number = len(files) + 1
+            timings.add(f'parse-{number}', parse_seconds, f'{file_name} ({len(medicines)} rows)')
+            timings.add(f'shop-{number}', shop_seconds, file_name)
+            files.append({
+                'file': file_name,
+                'format': file_ext,
+                'bytes': os.path.getsize(file_path),
+                'parse_ms': round(parse_seconds * 1000, 2),
+                'shop_name_ms': round(shop_seconds * 1000, 2),
+                'rows': len(medicines)
+            })
 
         # Add shop name to each medicine entry
         for med in medicines:
@@ -326,21 +444,46 @@ class MedicineSearcher:
 
         return medicines
 
-    def search_medicines(self, file_paths, search_terms):
-        """Search for medicines across all provided files"""
+    def build_list_index(self, file_path, file_name=None):
+        """Return the compact search index of one list file.
+
+        {'file', 'shop', 'items': [[name, discount, percent], ...]}, where
+        percent is parse_discount_percent(discount). This is what the search
+        page stores in IndexedDB to search offline.
+        """
+        medicines = self.process_file(file_path)
+        return {
+            'file': file_name or os.path.basename(file_path),
+            'shop': medicines[0]['shop'] if medicines else self.get_shop_name_from_file(file_path),
+            'items': [[med['name'], med['discount'], parse_discount_percent(med['discount'])] for med in medicines]
+        }
+
+    def search_medicines(self, file_paths, search_terms, timings=None):
+        """Search for medicines across all provided files
+
+        timings (a metrics.RequestTimings) gets the per-file stages of
+        process_file, an index stage for reading all files, a match stage and
+        the time and match count of every term in details['terms'].
+        """
         all_medicines = []
 
         # Process all files
+        index_start = time.perf_counter()
         for file_path in file_paths:
             try:
-                medicines = self.process_file(file_path)
+                with metrics.timed(STAGE_SECONDS, stage='process_file', format=os.path.splitext(file_path)[1].lower()):
+                    medicines = self.process_file(file_path, timings)
                 all_medicines.extend(medicines)
             except Exception as e:
                 print(f"Error processing file {file_path}: {str(e)}")
+        if timings is not None:
+            timings.add('index', time.perf_counter() - index_start, f'{len(all_medicines)} rows')
 
         # Search for the requested medicines with improved algorithm
+        match_start = time.perf_counter()
         results = []
         for term in search_terms:
+            term_start = time.perf_counter()
             term_lower = term.lower().strip()
             found_medicines = []
 
@@ -348,67 +491,25 @@ class MedicineSearcher:
             search_words = [word.strip() for word in term_lower.split() if word.strip()]
 
             for med in all_medicines:
-                med_name_lower = med['name'].lower()
-
-                # Split medicine name into words
-                med_words = [word.strip() for word in med_name_lower.split() if word.strip()]
-
-                # 1. Exact match
-                if term_lower == med_name_lower:
+                if medicine_name_matches(term_lower, search_words, med['name'].lower()):
                     found_medicines.append(med)
-                    continue
-
-                # 2. If searching for a specific medicine name with strength (like "azomax 500")
-                # only match if the medicine name contains all the words from the search term
-                # but be careful not to match "500" alone with unrelated medicines
-                if len(search_words) == 1:
-                    # Single word search (like "500") - need to be careful
-                    search_word = search_words[0]
-                    if len(search_word) < 3:
-                        # If it's a very short word (likely a strength like "500"), it should be part of a specific medicine
-                        # Match only if it's part of a larger name where we expect that strength
-                        for med_word in med_words:
-                            if search_word == med_word or (search_word in med_word and any(char.isalpha() for char in med_word)):
-                                found_medicines.append(med)
-                                break
-                    else:
-                        # If it's a longer word, it might be a medicine name part - allow partial matching
-                        if search_word in med_name_lower:
-                            found_medicines.append(med)
-                else:
-                    # Multiple word search (like "azomax 500")
-                    # All words should appear in the medicine name
-                    all_search_words_found = True
-                    for search_word in search_words:
-                        word_found = False
-
-                        # For each word in the search term, check if it appears in the medicine name
-                        if len(search_word) < 3:
-                            # Short word like "500" - should match as part of medicine name or be adjacent to letters
-                            for med_word in med_words:
-                                if search_word in med_word and any(c.isalpha() for c in med_word):
-                                    word_found = True
-                                    break
-                        else:
-                            # Longer words should match as complete words or as parts of medicine names
-                            for med_word in med_words:
-                                if search_word in med_word.lower():
-                                    word_found = True
-                                    break
-
-                        if not word_found:
-                            all_search_words_found = False
-                            break
-
-                    if all_search_words_found:
-                        found_medicines.append(med)
 
             # Add this search term and its results
             results.append({
                 'search_term': term,
                 'matches': found_medicines
             })
-
+            if timings is not None:
+                timings.details.setdefault('terms', []).append({
+                    'term': term,
+                    'ms': round((time.perf_counter() - term_start) * 1000, 2),
+                    'matches': len(found_medicines)
+                })
+
+        match_seconds = time.perf_counter() - match_start
+        metrics.observe(STAGE_SECONDS, match_seconds, stage='match', format='')
+        if timings is not None:
+            timings.add('match', match_seconds, f'{len(search_terms)} terms')
         return results
 
 # Example usage
@@ -0,0 +1,140 @@
+// Offline search for templates/search.html.
+// The page gets a compact index of every uploaded list from /list-index and
+// hands it to this worker, which keeps it in IndexedDB and searches it
+// without the server. Messages (each answered with the same id):
+//   {id, type: 'store', version, lists}  save indexes, replacing lists with the same file name
+//   {id, type: 'lists'}                  file, shop and item count of the saved lists
+//   {id, type: 'search', terms}          results in the /search-medicines format
+//   {id, type: 'clear'}                  forget every saved list
+const DB_NAME = 'medlist-search';
+const STORE = 'lists';
+// LIST_INDEX_VERSION of search_medicines.py
+const INDEX_VERSION = 1;
+
+let dbPromise = null;
+// Saved lists with lowercased names, loaded once
+let lists = null;
+
+function openDb() {
+  if (!dbPromise) {
+    dbPromise = new Promise((resolve, reject) => {
+      const request = indexedDB.open(DB_NAME, 1);
+      request.onupgradeneeded = () => request.result.createObjectStore(STORE, { keyPath: 'file' });
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => reject(request.error);
+    });
+  }
+  return dbPromise;
+}
+
+// Run fn on the store and resolve with its request's result once the transaction is done
+async function withStore(mode, fn) {
+  const db = await openDb();
+  return new Promise((resolve, reject) => {
+    const tx = db.transaction(STORE, mode);
+    const request = fn(tx.objectStore(STORE));
+    tx.oncomplete = () => resolve(request ? request.result : undefined);
+    tx.onerror = () => reject(tx.error);
+  });
+}
+
+function prepare(list) {
+  return {
+    file: list.file,
+    shop: list.shop,
+    items: list.items,
+    names: list.items.map(item => item[0].toLowerCase())
+  };
+}
+
+async function loadLists() {
+  if (!lists) {
+    const saved = await withStore('readonly', store => store.getAll());
+    lists = saved.filter(list => list.version === INDEX_VERSION).map(prepare);
+  }
+  return lists;
+}
+
+function hasLetter(word) {
+  return /\p{L}/u.test(word);
+}
+
+function splitWords(text) {
+  return text.split(/\s+/).filter(word => word);
+}
+
+// Same rules as medicine_name_matches() in search_medicines.py
+function nameMatches(termLower, searchWords, nameLower) {
+  const medWords = splitWords(nameLower);
+
+  if (termLower === nameLower) return true;
+
+  if (searchWords.length === 1) {
+    const word = searchWords[0];
+    if (word.length < 3) {
+      // Short words (a strength like "50") only match inside a name word
+      return medWords.some(medWord => word === medWord || (medWord.includes(word) && hasLetter(medWord)));
+    }
+    return nameLower.includes(word);
+  }
+
+  return searchWords.every(word => word.length < 3
+    ? medWords.some(medWord => medWord.includes(word) && hasLetter(medWord))
+    : medWords.some(medWord => medWord.includes(word)));
+}
+
+async function search(terms) {
+  const saved = await loadLists();
+  let totalMatches = 0;
+  const results = terms.map(term => {
+    const termLower = term.toLowerCase().trim();
+    const searchWords = splitWords(termLower);
+    const matches = [];
+    for (const list of saved) {
+      for (let i = 0; i < list.names.length; i++) {
+        if (nameMatches(termLower, searchWords, list.names[i])) {
+          const item = list.items[i];
+          matches.push({ name: item[0], discount: item[1], percent: item[2], shop: list.shop, file: list.file });
+        }
+      }
+    }
+    totalMatches += matches.length;
+    return { search_term: term, matches };
+  });
+  return { success: true, results, total_files: saved.length, total_matches: totalMatches };
+}
+
+async function store(version, indexes) {
+  if (version !== INDEX_VERSION) throw new Error('Unsupported list index version ' + version);
+  await withStore('readwrite', objectStore => {
+    for (const list of indexes) objectStore.put(Object.assign({ version }, list));
+  });
+  lists = null;
+  return summary();
+}
+
+async function summary() {
+  const saved = await loadLists();
+  return saved.map(list => ({ file: list.file, shop: list.shop, count: list.items.length }));
+}
+
+async function clear() {
+  await withStore('readwrite', objectStore => objectStore.clear());
+  lists = null;
+  return [];
+}
+
+self.onmessage = async event => {
+  const { id, type } = event.data;
+  try {
+    let result;
+    if (type === 'store') result = await store(event.data.version, event.data.lists);
+    else if (type === 'lists') result = await summary();
+    else if (type === 'search') result = await search(event.data.terms);
+    else if (type === 'clear') result = await clear();
+    else throw new Error('Unknown message ' + type);
+    self.postMessage({ id, result });
+  } catch (error) {
+    self.postMessage({ id, error: String(error && error.message || error) });
+  }
+};
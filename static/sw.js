@@ -1,21 +1,159 @@
-const CACHE_NAME = 'medlist-v6';
-const urlsToCache = [
-  '/',
-  '/static/manifest.json'
-];
+// Replaced by app.py with a hash of the precached files, so any change to
+// them changes this file and the browser installs the new worker
+const PRECACHE_VERSION = 'dev';
+const PRECACHE = 'medlist-precache-' + PRECACHE_VERSION;
+// The app's pages, served from cache and refreshed in the background
+const PAGES = ['/', '/search', '/make-html'];
+const PRECACHE_URLS = PAGES.concat([
+  '/static/manifest.json',
+  '/static/icon-192.png',
+  '/static/icon-512.png',
+  '/static/search_worker.js'
+]);
+
+// Runtime caches, each trimmed to its newest maxEntries entries; entries
+// older than maxAge (ms) are not served and get deleted
+const RUNTIME = {
+  pages: { name: 'medlist-pages', maxEntries: 20, maxAge: 7 * 24 * 3600 * 1000 },
+  assets: { name: 'medlist-assets', maxEntries: 60, maxAge: 30 * 24 * 3600 * 1000 },
+  lists: { name: 'medlist-lists', maxEntries: 5, maxAge: 24 * 3600 * 1000 }
+};
+
+// CSS and scripts shared by generated lists; names carry a content hash
+const LIST_ASSETS_PATH = '/static/lists/';
+const LIST_ASSETS_MANIFEST = '/static/lists/assets.json';
+
+// The last generated list, shown again when offline
+const LIST_PAGES = ['/preview-html', '/download-html'];
+
+const CACHED_AT = 'sw-cached-at';
+
+// Fetch the current shared list assets and add the ones not cached yet
+async function precacheListAssets(cache) {
+  const response = await fetch(LIST_ASSETS_MANIFEST, { cache: 'no-store' });
+  if (!response.ok) return;
+  const { assets } = await response.json();
+  const missing = [];
+  for (const url of assets) {
+    if (!(await caches.match(url))) missing.push(url);
+  }
+  await cache.addAll(missing);
+}
+
+function isExpired(response, config, now) {
+  const cachedAt = Number(response.headers.get(CACHED_AT));
+  // Opaque (cross-origin) responses can't carry the header; maxEntries limits them
+  return cachedAt > 0 && now - cachedAt > config.maxAge;
+}
+
+// Drop the oldest entries past maxEntries and the expired ones
+async function trimCache(config) {
+  const cache = await caches.open(config.name);
+  const requests = await cache.keys();
+  const now = Date.now();
+  // Keys are in the order they were (last) put
+  let excess = requests.length - config.maxEntries;
+  for (const request of requests) {
+    if (excess > 0) {
+      excess--;
+      await cache.delete(request);
+      continue;
+    }
+    const response = await cache.match(request);
+    if (response && isExpired(response, config, now)) await cache.delete(request);
+  }
+}
+
+// Store a response with the time it was cached
+async function putCache(config, request, response) {
+  let stored = response;
+  if (response.type !== 'opaque') {
+    const headers = new Headers(response.headers);
+    headers.set(CACHED_AT, String(Date.now()));
+    // The body read here is already decoded
+    headers.delete('Content-Encoding');
+    headers.delete('Content-Length');
+    stored = new Response(await response.blob(), {
+      status: response.status,
+      statusText: response.statusText,
+      headers
+    });
+  }
+  const cache = await caches.open(config.name);
+  await cache.put(request, stored);
+  await trimCache(config);
+}
+
+// Cached response from config's cache that isn't expired, else from the precache
+async function matchCache(config, request) {
+  const cache = await caches.open(config.name);
+  const cached = await cache.match(request);
+  if (cached && !isExpired(cached, config, Date.now())) return cached;
+  if (cached) await cache.delete(request);
+  const precache = await caches.open(PRECACHE);
+  // The share target opens /?shared=true
+  return precache.match(request, { ignoreSearch: request.mode === 'navigate' });
+}
+
+// Fetch the request, resolving as soon as the response headers arrive; a
+// usable response is cached in the background while the page reads its body
+function fetchAndCache(event, config) {
+  const request = event.request;
+  return fetch(request).then(response => {
+    if (response.ok || response.type === 'opaque') {
+      event.waitUntil(putCache(config, request, response.clone()).catch(() => {}));
+    }
+    return response;
+  });
+}
+
+// Serve the cached copy at once and refresh it in the background; without a
+// cached copy, wait for the network
+async function staleWhileRevalidate(event, config) {
+  const network = fetchAndCache(event, config);
+  event.waitUntil(network.catch(() => {}));
+  const cached = await matchCache(config, event.request);
+  return cached || network;
+}
+
+// Use the network, however slow; the cached copy is only served when the
+// request fails (offline). A generated list must never be answered with the
+// previous one while the new one is still on its way.
+async function networkFirst(event, config) {
+  try {
+    return await fetchAndCache(event, config);
+  } catch (e) {
+    const cached = await matchCache(config, event.request);
+    if (cached) return cached;
+    throw e;
+  }
+}
+
+// Content-hashed files never change, so a cached copy is always right
+async function cacheFirst(event, config) {
+  const cached = await caches.match(event.request);
+  return cached || fetchAndCache(event, config);
+}
 
 // Install service worker
 self.addEventListener('install', event => {
   event.waitUntil(
-    caches.open(CACHE_NAME)
-      .then(cache => cache.addAll(urlsToCache))
+    caches.open(PRECACHE)
+      .then(cache => cache.addAll(PRECACHE_URLS)
+        // Lists still work without the precache, the assets are cached on first use
+        .then(() => precacheListAssets(cache).catch(() => {})))
   );
   self.skipWaiting();
 });
 
 // Activate service worker
 self.addEventListener('activate', event => {
-  event.waitUntil(clients.claim());
+  const keep = [PRECACHE].concat(Object.values(RUNTIME).map(config => config.name));
+  event.waitUntil(
+    caches.keys()
+      .then(names => Promise.all(names.filter(name => !keep.includes(name)).map(name => caches.delete(name))))
+      .then(() => clients.claim())
+  );
 });
 
 // Fetch event
@@ -39,8 +177,30 @@ self.addEventListener('fetch', event => {
     return;
   }
 
-  // Normal fetch
-  event.respondWith(
-    fetch(event.request).catch(() => caches.match(event.request))
-  );
+  // Uploads and generation always go to the server
+  if (event.request.method !== 'GET') return;
+
+  const url = new URL(event.request.url);
+  const destination = event.request.destination;
+
+  if (url.origin !== self.location.origin) {
+    // CDN scripts, styles and fonts of the pages and generated lists
+    if (['script', 'style', 'font'].includes(destination)) {
+      event.respondWith(staleWhileRevalidate(event, RUNTIME.assets));
+    }
+    return;
+  }
+
+  if (url.pathname.startsWith(LIST_ASSETS_PATH) && url.pathname !== LIST_ASSETS_MANIFEST) {
+    event.respondWith(cacheFirst(event, RUNTIME.assets));
+  } else if (LIST_PAGES.includes(url.pathname)) {
+    // Replaced by every generation, so the network comes first and the
+    // cached copy is only for offline use
+    event.respondWith(networkFirst(event, RUNTIME.lists));
+  } else if (PAGES.includes(url.pathname)) {
+    event.respondWith(staleWhileRevalidate(event, RUNTIME.pages));
+  } else if (url.pathname.startsWith('/static/') && url.pathname !== LIST_ASSETS_MANIFEST) {
+    event.respondWith(staleWhileRevalidate(event, RUNTIME.assets));
+  }
+  // Everything else (downloads, search results) goes to the network
 });
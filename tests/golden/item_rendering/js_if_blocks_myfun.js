@@ -0,0 +1,187 @@
+if(namevar1==0 ){
+}
+else {
+
+var serial = (serial+1);
+ myWindow.document.write('<tr class="item"><td align="center">');
+ myWindow.document.write(ITMCODE1);
+ myWindow.document.write('</td><td style="text-align:left;">');
+ myWindow.document.write(ITMNAME1);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(namevar1);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(ITMDISC1);
+ myWindow.document.write(' %</td><td align="center">');
+ myWindow.document.write(ITMBONUS1);
+ myWindow.document.write('</td></tr>');
+}
+if(namevar2==0 ){
+}
+else {
+
+var serial = (serial+1);
+ myWindow.document.write('<tr class="item"><td align="center">');
+ myWindow.document.write(ITMCODE2);
+ myWindow.document.write('</td><td style="text-align:left;">');
+ myWindow.document.write(ITMNAME2);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(namevar2);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(ITMDISC2);
+ myWindow.document.write(' %</td><td align="center">');
+ myWindow.document.write(ITMBONUS2);
+ myWindow.document.write('</td></tr>');
+}
+if(namevar3==0 ){
+}
+else {
+
+var serial = (serial+1);
+ myWindow.document.write('<tr class="item"><td align="center">');
+ myWindow.document.write(ITMCODE3);
+ myWindow.document.write('</td><td style="text-align:left;">');
+ myWindow.document.write(ITMNAME3);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(namevar3);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(ITMDISC3);
+ myWindow.document.write('</td><td align="center">');
+ myWindow.document.write(ITMBONUS3);
+ myWindow.document.write('</td></tr>');
+}
+if(namevar4==0 ){
+}
+else {
+
+var serial = (serial+1);
+ myWindow.document.write('<tr class="item"><td align="center">');
+ myWindow.document.write(ITMCODE4);
+ myWindow.document.write('</td><td style="text-align:left;">');
+ myWindow.document.write(ITMNAME4);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(namevar4);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(ITMDISC4);
+ myWindow.document.write('</td><td align="center">');
+ myWindow.document.write(ITMBONUS4);
+ myWindow.document.write('</td></tr>');
+}
+if(namevar5==0 ){
+}
+else {
+
+var serial = (serial+1);
+ myWindow.document.write('<tr class="item"><td align="center">');
+ myWindow.document.write(ITMCODE5);
+ myWindow.document.write('</td><td style="text-align:left;">');
+ myWindow.document.write(ITMNAME5);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(namevar5);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(ITMDISC5);
+ myWindow.document.write('</td><td align="center">');
+ myWindow.document.write(ITMBONUS5);
+ myWindow.document.write('</td></tr>');
+}
+if(namevar6==0 ){
+}
+else {
+
+var serial = (serial+1);
+ myWindow.document.write('<tr class="item"><td align="center">');
+ myWindow.document.write(ITMCODE6);
+ myWindow.document.write('</td><td style="text-align:left;">');
+ myWindow.document.write(ITMNAME6);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(namevar6);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(ITMDISC6);
+ myWindow.document.write('</td><td align="center">');
+ myWindow.document.write(ITMBONUS6);
+ myWindow.document.write('</td></tr>');
+}
+if(namevar7==0 ){
+}
+else {
+
+var serial = (serial+1);
+ myWindow.document.write('<tr class="item"><td align="center">');
+ myWindow.document.write(ITMCODE7);
+ myWindow.document.write('</td><td style="text-align:left;">');
+ myWindow.document.write(ITMNAME7);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(namevar7);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(ITMDISC7);
+ myWindow.document.write(' %</td><td align="center">');
+ myWindow.document.write(ITMBONUS7);
+ myWindow.document.write('</td></tr>');
+}
+if(namevar8==0 ){
+}
+else {
+
+var serial = (serial+1);
+ myWindow.document.write('<tr class="item"><td align="center">');
+ myWindow.document.write(ITMCODE8);
+ myWindow.document.write('</td><td style="text-align:left;">');
+ myWindow.document.write(ITMNAME8);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(namevar8);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(ITMDISC8);
+ myWindow.document.write(' %</td><td align="center">');
+ myWindow.document.write(ITMBONUS8);
+ myWindow.document.write('</td></tr>');
+}
+if(namevar9==0 ){
+}
+else {
+
+var serial = (serial+1);
+ myWindow.document.write('<tr class="item"><td align="center">');
+ myWindow.document.write(ITMCODE9);
+ myWindow.document.write('</td><td style="text-align:left;">');
+ myWindow.document.write(ITMNAME9);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(namevar9);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(ITMDISC9);
+ myWindow.document.write(' %</td><td align="center">');
+ myWindow.document.write(ITMBONUS9);
+ myWindow.document.write('</td></tr>');
+}
+if(namevar10==0 ){
+}
+else {
+
+var serial = (serial+1);
+ myWindow.document.write('<tr class="item"><td align="center">');
+ myWindow.document.write(ITMCODE10);
+ myWindow.document.write('</td><td style="text-align:left;">');
+ myWindow.document.write(ITMNAME10);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(namevar10);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(ITMDISC10);
+ myWindow.document.write(' %</td><td align="center">');
+ myWindow.document.write(ITMBONUS10);
+ myWindow.document.write('</td></tr>');
+}
+if(namevar11==0 ){
+}
+else {
+
+var serial = (serial+1);
+ myWindow.document.write('<tr class="item"><td align="center">');
+ myWindow.document.write(ITMCODE11);
+ myWindow.document.write('</td><td style="text-align:left;">');
+ myWindow.document.write(ITMNAME11);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(namevar11);
+ myWindow.document.write('</td><td align="right">');
+ myWindow.document.write(ITMDISC11);
+ myWindow.document.write(' %</td><td align="center">');
+ myWindow.document.write(ITMBONUS11);
+ myWindow.document.write('</td></tr>');
+}
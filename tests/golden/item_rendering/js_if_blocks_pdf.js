@@ -0,0 +1,77 @@
+if(namevar1==0 ){
+}
+else {
+
+var serial = (serial+1);
+rows.push([ITMCODE1, ITMNAME1, namevar1, ITMDISC1]);
+}
+if(namevar2==0 ){
+}
+else {
+
+var serial = (serial+1);
+rows.push([ITMCODE2, ITMNAME2, namevar2, ITMDISC2]);
+}
+if(namevar3==0 ){
+}
+else {
+
+var serial = (serial+1);
+rows.push([ITMCODE3, ITMNAME3, namevar3, ITMDISC3]);
+}
+if(namevar4==0 ){
+}
+else {
+
+var serial = (serial+1);
+rows.push([ITMCODE4, ITMNAME4, namevar4, ITMDISC4]);
+}
+if(namevar5==0 ){
+}
+else {
+
+var serial = (serial+1);
+rows.push([ITMCODE5, ITMNAME5, namevar5, ITMDISC5]);
+}
+if(namevar6==0 ){
+}
+else {
+
+var serial = (serial+1);
+rows.push([ITMCODE6, ITMNAME6, namevar6, ITMDISC6]);
+}
+if(namevar7==0 ){
+}
+else {
+
+var serial = (serial+1);
+rows.push([ITMCODE7, ITMNAME7, namevar7, ITMDISC7]);
+}
+if(namevar8==0 ){
+}
+else {
+
+var serial = (serial+1);
+rows.push([ITMCODE8, ITMNAME8, namevar8, ITMDISC8]);
+}
+if(namevar9==0 ){
+}
+else {
+
+var serial = (serial+1);
+rows.push([ITMCODE9, ITMNAME9, namevar9, ITMDISC9]);
+}
+if(namevar10==0 ){
+}
+else {
+
+var serial = (serial+1);
+rows.push([ITMCODE10, ITMNAME10, namevar10, ITMDISC10]);
+}
+if(namevar11==0 ){
+}
+else {
+
+var serial = (serial+1);
+rows.push([ITMCODE11, ITMNAME11, namevar11, ITMDISC11]);
+}
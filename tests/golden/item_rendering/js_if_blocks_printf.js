@@ -0,0 +1,187 @@
+if(namevar1==0 ){
+}
+else {
+
+var serial = (serial+1);
+ mywindow.document.write('<tr class="item"><td align="center">');
+ mywindow.document.write(ITMCODE1);
+ mywindow.document.write('</td><td style="text-align:left;">');
+ mywindow.document.write(ITMNAME1);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(namevar1);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(ITMDISC1);
+ mywindow.document.write(' %</td><td align="center">');
+ mywindow.document.write(ITMBONUS1);
+ mywindow.document.write('</td></tr>');
+}
+if(namevar2==0 ){
+}
+else {
+
+var serial = (serial+1);
+ mywindow.document.write('<tr class="item"><td align="center">');
+ mywindow.document.write(ITMCODE2);
+ mywindow.document.write('</td><td style="text-align:left;">');
+ mywindow.document.write(ITMNAME2);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(namevar2);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(ITMDISC2);
+ mywindow.document.write(' %</td><td align="center">');
+ mywindow.document.write(ITMBONUS2);
+ mywindow.document.write('</td></tr>');
+}
+if(namevar3==0 ){
+}
+else {
+
+var serial = (serial+1);
+ mywindow.document.write('<tr class="item"><td align="center">');
+ mywindow.document.write(ITMCODE3);
+ mywindow.document.write('</td><td style="text-align:left;">');
+ mywindow.document.write(ITMNAME3);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(namevar3);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(ITMDISC3);
+ mywindow.document.write('</td><td align="center">');
+ mywindow.document.write(ITMBONUS3);
+ mywindow.document.write('</td></tr>');
+}
+if(namevar4==0 ){
+}
+else {
+
+var serial = (serial+1);
+ mywindow.document.write('<tr class="item"><td align="center">');
+ mywindow.document.write(ITMCODE4);
+ mywindow.document.write('</td><td style="text-align:left;">');
+ mywindow.document.write(ITMNAME4);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(namevar4);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(ITMDISC4);
+ mywindow.document.write('</td><td align="center">');
+ mywindow.document.write(ITMBONUS4);
+ mywindow.document.write('</td></tr>');
+}
+if(namevar5==0 ){
+}
+else {
+
+var serial = (serial+1);
+ mywindow.document.write('<tr class="item"><td align="center">');
+ mywindow.document.write(ITMCODE5);
+ mywindow.document.write('</td><td style="text-align:left;">');
+ mywindow.document.write(ITMNAME5);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(namevar5);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(ITMDISC5);
+ mywindow.document.write('</td><td align="center">');
+ mywindow.document.write(ITMBONUS5);
+ mywindow.document.write('</td></tr>');
+}
+if(namevar6==0 ){
+}
+else {
+
+var serial = (serial+1);
+ mywindow.document.write('<tr class="item"><td align="center">');
+ mywindow.document.write(ITMCODE6);
+ mywindow.document.write('</td><td style="text-align:left;">');
+ mywindow.document.write(ITMNAME6);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(namevar6);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(ITMDISC6);
+ mywindow.document.write('</td><td align="center">');
+ mywindow.document.write(ITMBONUS6);
+ mywindow.document.write('</td></tr>');
+}
+if(namevar7==0 ){
+}
+else {
+
+var serial = (serial+1);
+ mywindow.document.write('<tr class="item"><td align="center">');
+ mywindow.document.write(ITMCODE7);
+ mywindow.document.write('</td><td style="text-align:left;">');
+ mywindow.document.write(ITMNAME7);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(namevar7);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(ITMDISC7);
+ mywindow.document.write(' %</td><td align="center">');
+ mywindow.document.write(ITMBONUS7);
+ mywindow.document.write('</td></tr>');
+}
+if(namevar8==0 ){
+}
+else {
+
+var serial = (serial+1);
+ mywindow.document.write('<tr class="item"><td align="center">');
+ mywindow.document.write(ITMCODE8);
+ mywindow.document.write('</td><td style="text-align:left;">');
+ mywindow.document.write(ITMNAME8);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(namevar8);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(ITMDISC8);
+ mywindow.document.write(' %</td><td align="center">');
+ mywindow.document.write(ITMBONUS8);
+ mywindow.document.write('</td></tr>');
+}
+if(namevar9==0 ){
+}
+else {
+
+var serial = (serial+1);
+ mywindow.document.write('<tr class="item"><td align="center">');
+ mywindow.document.write(ITMCODE9);
+ mywindow.document.write('</td><td style="text-align:left;">');
+ mywindow.document.write(ITMNAME9);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(namevar9);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(ITMDISC9);
+ mywindow.document.write(' %</td><td align="center">');
+ mywindow.document.write(ITMBONUS9);
+ mywindow.document.write('</td></tr>');
+}
+if(namevar10==0 ){
+}
+else {
+
+var serial = (serial+1);
+ mywindow.document.write('<tr class="item"><td align="center">');
+ mywindow.document.write(ITMCODE10);
+ mywindow.document.write('</td><td style="text-align:left;">');
+ mywindow.document.write(ITMNAME10);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(namevar10);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(ITMDISC10);
+ mywindow.document.write(' %</td><td align="center">');
+ mywindow.document.write(ITMBONUS10);
+ mywindow.document.write('</td></tr>');
+}
+if(namevar11==0 ){
+}
+else {
+
+var serial = (serial+1);
+ mywindow.document.write('<tr class="item"><td align="center">');
+ mywindow.document.write(ITMCODE11);
+ mywindow.document.write('</td><td style="text-align:left;">');
+ mywindow.document.write(ITMNAME11);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(namevar11);
+ mywindow.document.write('</td><td align="right">');
+ mywindow.document.write(ITMDISC11);
+ mywindow.document.write(' %</td><td align="center">');
+ mywindow.document.write(ITMBONUS11);
+ mywindow.document.write('</td></tr>');
+}
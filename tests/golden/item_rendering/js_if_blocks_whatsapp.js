@@ -0,0 +1,133 @@
+if(namevar1==0 ){
+}
+else {
+// Add header once at the beginning if it hasn't been added yet
+if(text == "") {
+ text = "*Name* :%0a*List no* :000085(1)%0a--------------------%0a|%20*Code*%20|%20*QTY*%20|%20*ITM*%20|%20*DISC*%20|%20*Bonus*%20|%0a--------------------%0a";
+}
+var serial = (serial+1);
+
+ // Show discount with % if non-zero, otherwise show empty in discount column
+ var discText = ITMDISC1 != 0 ? ITMDISC1 + "%" : "";
+ // Show bonus in bonus column if discount is 0, otherwise show empty
+ var bonusText = ITMDISC1 == 0 ? ITMBONUS1 : "";
+ var text=text+"|"+ITMCODE1+"%20|%20"+namevar1+"%20|%20"+ITMNAME1+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+}
+if(namevar2==0 ){
+}
+else {
+// Add header once at the beginning if it hasn't been added yet
+if(text == "") {
+ text = "*Name* :%0a*List no* :000085(1)%0a--------------------%0a|%20*Code*%20|%20*QTY*%20|%20*ITM*%20|%20*DISC*%20|%20*Bonus*%20|%0a--------------------%0a";
+}
+var serial = (serial+1);
+
+ // Show discount with % if non-zero, otherwise show empty in discount column
+ var discText = ITMDISC2 != 0 ? ITMDISC2 + "%" : "";
+ // Show bonus in bonus column if discount is 0, otherwise show empty
+ var bonusText = ITMDISC2 == 0 ? ITMBONUS2 : "";
+ var text=text+"|"+ITMCODE2+"%20|%20"+namevar2+"%20|%20"+ITMNAME2+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+}
+if(namevar3==0 ){
+}
+else {
+// Add header once at the beginning if it hasn't been added yet
+if(text == "") {
+ text = "*Name* :%0a*List no* :000085(1)%0a--------------------%0a|%20*Code*%20|%20*QTY*%20|%20*ITM*%20|%20*DISC*%20|%20*Bonus*%20|%0a--------------------%0a";
+}
+var serial = (serial+1);
+
+ // For special values like TP, don't append %
+ var discText = ITMDISC3;
+ // Show bonus in bonus column if discount is 0, otherwise show empty
+ var bonusText = ITMBONUS3;
+ var text=text+"|"+ITMCODE3+"%20|%20"+namevar3+"%20|%20"+ITMNAME3+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+}
+if(namevar4==0 ){
+}
+else {
+var serial = (serial+1);
+
+ // For special values like TP, don't append %
+ var discText = ITMDISC4;
+ // Show bonus in bonus column if discount is 0, otherwise show empty
+ var bonusText = ITMBONUS4;
+ var text=text+"|"+ITMCODE4+"%20|%20"+namevar4+"%20|%20"+ITMNAME4+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+}
+if(namevar5==0 ){
+}
+else {
+var serial = (serial+1);
+
+ // Show discount with % if non-zero, otherwise show empty in discount column
+ var discText = ITMDISC5 != 0 ? ITMDISC5 + "%" : "";
+ // Show bonus in bonus column if discount is 0, otherwise show empty
+ var bonusText = ITMDISC5 == 0 ? ITMBONUS5 : "";
+ var text=text+"|"+ITMCODE5+"%20|%20"+namevar5+"%20|%20"+ITMNAME5+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+}
+if(namevar6==0 ){
+}
+else {
+var serial = (serial+1);
+
+ // Show discount with % if non-zero, otherwise show empty in discount column
+ var discText = ITMDISC6 != 0 ? ITMDISC6 + "%" : "";
+ // Show bonus in bonus column if discount is 0, otherwise show empty
+ var bonusText = ITMDISC6 == 0 ? ITMBONUS6 : "";
+ var text=text+"|"+ITMCODE6+"%20|%20"+namevar6+"%20|%20"+ITMNAME6+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+}
+if(namevar7==0 ){
+}
+else {
+var serial = (serial+1);
+
+ // Show discount with % if non-zero, otherwise show empty in discount column
+ var discText = ITMDISC7 != 0 ? ITMDISC7 + "%" : "";
+ // Show bonus in bonus column if discount is 0, otherwise show empty
+ var bonusText = ITMDISC7 == 0 ? ITMBONUS7 : "";
+ var text=text+"|"+ITMCODE7+"%20|%20"+namevar7+"%20|%20"+ITMNAME7+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+}
+if(namevar8==0 ){
+}
+else {
+var serial = (serial+1);
+
+ // Show discount with % if non-zero, otherwise show empty in discount column
+ var discText = ITMDISC8 != 0 ? ITMDISC8 + "%" : "";
+ // Show bonus in bonus column if discount is 0, otherwise show empty
+ var bonusText = ITMDISC8 == 0 ? ITMBONUS8 : "";
+ var text=text+"|"+ITMCODE8+"%20|%20"+namevar8+"%20|%20"+ITMNAME8+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+}
+if(namevar9==0 ){
+}
+else {
+var serial = (serial+1);
+
+ // Show discount with % if non-zero, otherwise show empty in discount column
+ var discText = ITMDISC9 != 0 ? ITMDISC9 + "%" : "";
+ // Show bonus in bonus column if discount is 0, otherwise show empty
+ var bonusText = ITMDISC9 == 0 ? ITMBONUS9 : "";
+ var text=text+"|"+ITMCODE9+"%20|%20"+namevar9+"%20|%20"+ITMNAME9+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+}
+if(namevar10==0 ){
+}
+else {
+var serial = (serial+1);
+
+ // Show discount with % if non-zero, otherwise show empty in discount column
+ var discText = ITMDISC10 != 0 ? ITMDISC10 + "%" : "";
+ // Show bonus in bonus column if discount is 0, otherwise show empty
+ var bonusText = ITMDISC10 == 0 ? ITMBONUS10 : "";
+ var text=text+"|"+ITMCODE10+"%20|%20"+namevar10+"%20|%20"+ITMNAME10+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a";
+}
+if(namevar11==0 ){
+}
+else {
+var serial = (serial+1);
+
+ // Show discount with % if non-zero, otherwise show empty in discount column
+ var discText = ITMDISC11 != 0 ? ITMDISC11 + "%" : "";
+ // Show bonus in bonus column if discount is 0, otherwise show empty
+ var bonusText = ITMDISC11 == 0 ? ITMBONUS11 : "";
+ var text=text+"|"+ITMCODE11+"%20|%20"+namevar11+"%20|%20"+ITMNAME11+"%20|%20"+discText+"%20|%20"+bonusText+"%20|%0a--------------------%0a"+"%0a*Total* *Items* : "+serial;
+}
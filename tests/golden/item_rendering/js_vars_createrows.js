@@ -0,0 +1,81 @@
+var ITMCODE1 = "1";
+var ITMNAME1 =document.getElementById("itnameid1").value;
+var ITMBONUS1 = "";
+var ITMDISC1 = "12.50%";
+var namevar1=document.getElementById("nameid1").value;
+
+var namevarr1 = " ";
+var ITMCODE2 = "2";
+var ITMNAME2 =document.getElementById("itnameid2").value;
+var ITMBONUS2 = "";
+var ITMDISC2 = "8.00%";
+var namevar2=document.getElementById("nameid2").value;
+
+var namevarr2 = " ";
+var ITMCODE3 = "3";
+var ITMNAME3 =document.getElementById("itnameid3").value;
+var ITMBONUS3 = "";
+var ITMDISC3 = "TP";
+var namevar3=document.getElementById("nameid3").value;
+
+var namevarr3 = " ";
+// Don't append % to non-numeric values like TP
+var ITMCODE4 = "4";
+var ITMNAME4 =document.getElementById("itnameid4").value;
+var ITMBONUS4 = "5+1";
+var ITMDISC4 = "TP,";
+var namevar4=document.getElementById("nameid4").value;
+
+var namevarr4 = " ";
+// Don't append % to non-numeric values like TP
+var ITMCODE5 = "5";
+var ITMNAME5 =document.getElementById("itnameid5").value;
+var ITMBONUS5 = "";
+var ITMDISC5 = "140 NET";
+var namevar5=document.getElementById("nameid5").value;
+
+var namevarr5 = " ";
+// Don't append % to NET values
+var ITMCODE6 = "6";
+var ITMNAME6 =document.getElementById("itnameid6").value;
+var ITMBONUS6 = "2+1";
+var ITMDISC6 = "330 NET";
+var namevar6=document.getElementById("nameid6").value;
+
+var namevarr6 = " ";
+// Don't append % to NET values
+var ITMCODE7 = "7";
+var ITMNAME7 =document.getElementById("itnameid7").value;
+var ITMBONUS7 = "10+1";
+var ITMDISC7 = "10.00%";
+var namevar7=document.getElementById("nameid7").value;
+
+var namevarr7 = " ";
+var ITMCODE8 = "8";
+var ITMNAME8 =document.getElementById("itnameid8").value;
+var ITMBONUS8 = "extra";
+var ITMDISC8 = "5.00%";
+var namevar8=document.getElementById("nameid8").value;
+
+var namevarr8 = " ";
+var ITMCODE9 = "9";
+var ITMNAME9 =document.getElementById("itnameid9").value;
+var ITMBONUS9 = "";
+var ITMDISC9 = "0.00%";
+var namevar9=document.getElementById("nameid9").value;
+
+var namevarr9 = " ";
+var ITMCODE10 = "10";
+var ITMNAME10 =document.getElementById("itnameid10").value;
+var ITMBONUS10 = "";
+var ITMDISC10 = "7.25%";
+var namevar10=document.getElementById("nameid10").value;
+
+var namevarr10 = " ";
+var ITMCODE11 = "11";
+var ITMNAME11 =document.getElementById("itnameid11").value;
+var ITMBONUS11 = "";
+var ITMDISC11 = "15.00%";
+var namevar11=document.getElementById("nameid11").value;
+
+var namevarr11 = " ";
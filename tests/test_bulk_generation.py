@@ -0,0 +1,41 @@
+"""A bad manifest entry fails on its own; the rest of the lists are still written."""
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'list_to_htm'))
+
+from update_htm import bulk_main, read_manifest
+
+TEMPLATE = os.path.join(ROOT, 'list_to_htm', 'list.HTM')
+
+def write_manifest(tmp_path, rows):
+    (tmp_path / 'data.txt').write_text('PANADOL TAB-----10%\nBRUFEN 400MG TAB-----5+1\n', encoding='utf-8')
+    (tmp_path / 'broken.txt').write_bytes(b'\xff\xfe not utf-8')
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text('input,list_no,output\n' + ''.join(f'{row}\n' for row in rows), encoding='utf-8')
+    return str(manifest)
+
+def test_failing_entries_do_not_stop_the_run(tmp_path, capsys):
+    manifest = write_manifest(tmp_path, [
+        'data.txt,1,',
+        'missing.txt,2,',
+        'broken.txt,3,',
+        ',4,',
+        'data.txt,5,',
+    ])
+    assert bulk_main([manifest, '--template', TEMPLATE, '--workers', '2']) == 1
+
+    written = sorted(name for name in os.listdir(tmp_path) if name.endswith('.htm'))
+    assert written == ['offer_list_1.htm', 'offer_list_5.htm']
+    assert '3 lists failed' in capsys.readouterr().out
+
+def test_duplicate_outputs_are_rejected(tmp_path):
+    manifest = write_manifest(tmp_path, ['data.txt,1,same.htm', 'data.txt,2,same.htm', 'data.txt,3,'])
+    jobs = read_manifest(manifest)
+    assert [job['error'] is not None for job in jobs] == [True, True, False]
+    assert 'entries 1, 2' in jobs[0]['error']
+
+    assert bulk_main([manifest, '--template', TEMPLATE, '--workers', '1']) == 1
+    assert not (tmp_path / 'same.htm').exists()
+    assert (tmp_path / 'offer_list_3.htm').exists()
@@ -0,0 +1,67 @@
+"""Golden-file tests for the generated item rows and per-item JS of offer lists.
+
+tests/golden/item_rendering/ holds what each generator produced for ITEMS
+before items were parsed once into ItemRecords; the generators must keep
+producing exactly that. After an intended output change, rewrite the files
+with UPDATE_GOLDEN=1 python -m pytest tests/test_item_rendering.py and
+review the diff.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'list_to_htm'))
+
+from update_htm import (
+    generate_item_row, generate_section_header, iter_items_html,
+    generate_js_vars_full, generate_js_vars_simple, generate_js_vars_createrows,
+    generate_js_if_blocks, generate_js_if_blocks_pdf, generate_js_if_blocks_whatsapp,
+    generate_compact_items_script
+)
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden', 'item_rendering')
+
+# Sorted like generate_html_from_template sorts them; one of each value format
+ITEMS = [
+    ('AZOMAX 500MG TAB', '12.5'),
+    ('AUGMENTIN 625MG TAB', '8%'),
+    ('CAFLAM 50MG SACHET', 'TP'),
+    ('CECLOR 250MG SUSP', 'TP,/5+1'),
+    ('DISPRIN 300MG TAB', '140 NET'),
+    ('EZOMOL 20MG CAP', '330 NET/2+1'),
+    ('FLAGYL 400MG TAB', '10/10+1'),
+    ('GANATON 50MG TAB', '5%extra'),
+    ('GRAVINATE 50MG TAB', '0'),
+    ('LEXOTANIL 3MG TAB', '7.25/'),
+    ('RISEK 40MG CAP', '15.00%'),
+]
+
+def items_html(items):
+    return ''.join(iter_items_html(items))
+
+GENERATORS = {
+    'item_rows.html': lambda items: ''.join(generate_item_row(i, name, value) for i, (name, value) in enumerate(items, 1)),
+    'section_header.html': lambda items: generate_section_header('A'),
+    'items_html.html': items_html,
+    'js_vars_full.js': generate_js_vars_full,
+    'js_vars_simple.js': generate_js_vars_simple,
+    'js_vars_createrows.js': generate_js_vars_createrows,
+    'js_if_blocks_printf.js': lambda items: generate_js_if_blocks(items, 'mywindow'),
+    'js_if_blocks_myfun.js': lambda items: generate_js_if_blocks(items, 'myWindow'),
+    'js_if_blocks_pdf.js': generate_js_if_blocks_pdf,
+    'js_if_blocks_whatsapp.js': generate_js_if_blocks_whatsapp,
+    'compact_items.html': generate_compact_items_script,
+}
+
+@pytest.mark.parametrize('name', sorted(GENERATORS))
+def test_matches_golden(name):
+    output = GENERATORS[name](ITEMS).encode('utf-8')
+    path = os.path.join(GOLDEN_DIR, name)
+    if os.environ.get('UPDATE_GOLDEN'):
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(output)
+    with open(path, 'rb') as f:
+        assert output == f.read()
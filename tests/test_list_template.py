@@ -0,0 +1,96 @@
+"""The precompiled list.HTM template must give the same bytes as editing the template directly.
+
+generate_html_from_template joins compiled segments and slots; here the same
+lists are also made with splice_list_template, the regex edits the template
+is compiled from, fed the generated code as plain strings.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'list_to_htm'))
+
+from app import generate_html_from_template, LIST_TEMPLATE_PATH
+from update_htm import (
+    splice_list_template, generate_item_row, generate_section_header,
+    generate_js_vars_full, generate_js_vars_simple, generate_js_vars_createrows,
+    generate_js_if_blocks, generate_js_if_blocks_pdf, generate_js_if_blocks_whatsapp,
+    generate_compact_items_script, compact_js_parts
+)
+
+# Every value format of the distributor lists
+ITEMS = [
+    ('AZOMAX 500MG TAB', '12.5'),
+    ('augmentin 625mg tab', '8%'),
+    ('BRUFEN 400MG TAB', '15.00%'),
+    ('CAFLAM 50MG SACHET 10S', 'TP'),
+    ('CECLOR 250MG SUSP', 'TP,/5+1'),
+    ('DISPRIN 300MG TAB', '140 NET'),
+    ('EZOMOL 20MG CAP', '330 NET/2+1'),
+    ('FLAGYL 400MG TAB', '10/10+1'),
+    ('GANATON 50MG TAB', '5%extra'),
+    ('GRAVINATE 50MG TAB', '0'),
+    ('LEXOTANIL 3MG TAB', '7.25/'),
+    ('PANADOL EXTRA TAB', '18%'),
+    ('RISEK 40MG CAP', '3.5'),
+    ('ZYRTEC 10MG TAB', '1.50%'),
+]
+
+LISTS = {
+    'sample': ITEMS,
+    'single': ITEMS[3:4],
+    # More rows than letters, so sections hold several items
+    'repeated': [(f'{name} {n}', value) for n in range(1, 4) for name, value in ITEMS],
+}
+
+SETTINGS = {'list_no': '000123', 'list_date': '05/06/2024', 'title': 'ALI MEDICOS', 'whatsapp_number': '923001234567'}
+
+def items_html(items):
+    """The table body as the generator built it before the template was compiled."""
+    html = ''
+    current_letter = ''
+    for i, (name, value) in enumerate(items, 1):
+        first_letter = name[0].upper() if name else '?'
+        if first_letter != current_letter:
+            current_letter = first_letter
+            html += generate_section_header(current_letter)
+        html += generate_item_row(i, name, value)
+    html += f'''<tr class="heading2"> <td style=" text-align: CENTER; border-radius: 0px 0px 16px 16px; padding-left: 10px;" colspan="5" >Total Products :
+  {len(items)}
+</td></tr>
+'''
+    return html
+
+def spliced_list(items, compact):
+    with open(LIST_TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+        content = f.read()
+    items = sorted(items, key=lambda x: x[0].upper() if x[0] else '')
+    parts = dict(SETTINGS, total_count=str(len(items)))
+    if compact:
+        parts.update(compact_js_parts())
+        parts['items_html'] = items_html(items) + generate_compact_items_script(items)
+    else:
+        parts.update({
+            'items_html': items_html(items),
+            'js_vars_full': generate_js_vars_full(items),
+            'js_vars_simple': generate_js_vars_simple(items),
+            'js_vars_createrows': generate_js_vars_createrows(items),
+            'js_if_blocks_printf': generate_js_if_blocks(items, 'mywindow'),
+            'js_if_blocks_myfun': generate_js_if_blocks(items, 'myWindow'),
+            'js_if_whatsapp': generate_js_if_blocks_whatsapp(items),
+            'js_if_blocks_pdf': generate_js_if_blocks_pdf(items),
+        })
+    return splice_list_template(content, parts)
+
+@pytest.mark.parametrize('compact', [False, True], ids=['full', 'compact'])
+@pytest.mark.parametrize('name', sorted(LISTS))
+def test_compiled_template_matches_splice(name, compact):
+    items = LISTS[name]
+    content, error = generate_html_from_template(items, LIST_TEMPLATE_PATH, compact=compact, **SETTINGS)
+    assert error is None
+    expected = spliced_list(items, compact)
+    assert expected is not None
+    assert content.encode('utf-8') == expected.encode('utf-8')
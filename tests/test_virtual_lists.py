@@ -0,0 +1,74 @@
+"""Virtual lists keep their items in a script, not in table rows; they must still read back.
+
+A virtual list uploaded to /upload or searched must give the same items as the
+full list generated from the same data.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from app import app, generate_html_from_template, process_htm_content, LIST_TEMPLATE_PATH
+from search_medicines import MedicineSearcher
+
+ITEMS = [
+    ('AZOMAX 500MG TAB', '12.5'),
+    ('AUGMENTIN 625MG TAB', '8%'),
+    ('CAFLAM 50MG SACHET', 'TP'),
+    ('CECLOR 250MG SUSP', 'TP,/5+1'),
+    ('DISPRIN 300MG TAB', '140 NET'),
+    ('EZOMOL 20MG CAP', '330 NET/2+1'),
+    ('FLAGYL 400MG TAB', '10/10+1'),
+    ('GANATON 50MG TAB', '5%extra'),
+    ('GRAVINATE 50MG TAB', '0'),
+    ('LEXOTANIL 3MG TAB', '7.25/'),
+    ('PANADOL EXTRA TAB', '18%'),
+]
+
+def generate(**options):
+    content, error = generate_html_from_template(ITEMS, LIST_TEMPLATE_PATH, **options)
+    assert error is None
+    return content
+
+@pytest.fixture(scope='module')
+def lists():
+    return {
+        'full': generate(),
+        'virtual': generate(virtual=True),
+        'virtual_shared': generate(virtual=True, asset_base=''),
+    }
+
+@pytest.mark.parametrize('kind', ['virtual', 'virtual_shared'])
+@pytest.mark.parametrize('decrease_value', [0, 1])
+def test_converter_reads_virtual_rows(lists, kind, decrease_value):
+    # No item rows in the HTML
+    assert 'id="nameid1"' in lists['full'] and 'id="nameid1"' not in lists[kind]
+    expected = process_htm_content(lists['full'], decrease_value, list_format='auto')
+    assert len(expected) == len(ITEMS)
+    assert process_htm_content(lists[kind], decrease_value, list_format='auto') == expected
+
+@pytest.mark.parametrize('kind', ['virtual', 'virtual_shared'])
+def test_search_reads_virtual_rows(lists, kind, tmp_path):
+    def medicines(content):
+        path = tmp_path / 'list.htm'
+        path.write_text(content, encoding='utf-8')
+        return [(med['name'], med['discount']) for med in MedicineSearcher().extract_medicines_from_html(str(path))]
+
+    expected = medicines(lists['full'])
+    assert len(expected) == len(ITEMS)
+    assert medicines(lists[kind]) == expected
+
+def test_upload_virtual_list(lists):
+    import io
+    client = app.test_client()
+    responses = {}
+    for kind in ('full', 'virtual'):
+        response = client.post('/upload', data={'file': (io.BytesIO(lists[kind].encode('utf-8')), 'list.htm')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        responses[kind] = response.get_json()
+    assert responses['virtual']['count'] == len(ITEMS)
+    assert responses['virtual']['text_output'] == responses['full']['text_output']